@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 try:
     from playlist.model.Platform import Platform
@@ -19,6 +20,21 @@ SPOTIFY_SCOPES: list[str] = [
 ]
 MAX_SPOTIFY_RECOMMENDATION_CHUNK_SIZE: int = 5
 MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE: int = 100
+# YouTube has no documented limit, but big `create_playlist` calls get slow & fail, so tracks are added in chunks.
+MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE: int = 50
+# Max amount of simultaneous playlist writes & amount of attempts per chunk.
+PLAYLIST_WRITE_CONCURRENCY: int = int(os.getenv("PLAYLIST_WRITE_CONCURRENCY", "4"))
+PLAYLIST_WRITE_RETRIES: int = 3
+
+# Max amount of simultaneous search requests per platform, used when resolving tracks on the other platform.
+SPOTIFY_SEARCH_CONCURRENCY: int = int(os.getenv("SPOTIFY_SEARCH_CONCURRENCY", "8"))
+YOUTUBE_SEARCH_CONCURRENCY: int = int(os.getenv("YOUTUBE_SEARCH_CONCURRENCY", "4"))
+# Max amount of generation stages running at the same time.
+PIPELINE_MAX_WORKERS: int = int(os.getenv("PIPELINE_MAX_WORKERS", "6"))
+# Publish playlist right after seeds are known & append recommendations while they're resolved.
+PROGRESSIVE_PUBLISHING: bool = os.getenv("PROGRESSIVE_PUBLISHING", "1") == "1"
+# Amount of tracks appended to the playlist(and reported to the user) at a time, in progressive mode.
+PROGRESSIVE_BATCH_SIZE: int = int(os.getenv("PROGRESSIVE_BATCH_SIZE", "20"))
 
 # LastFM
 lastFMUrl: str = "https://ws.audioscrobbler.com/2.0/?method=track.getsimilar&artist={artist}&track={title}&api_key={apiKey}&format=json&limit=5"
@@ -27,6 +43,125 @@ lastFMUrl: str = "https://ws.audioscrobbler.com/2.0/?method=track.getsimilar&art
 # Timeouts
 DEFAULT_TIMEOUT = 5
 
+# HTTP connection pools.
+# Amount of hosts kept in the pool per session & amount of keep-alive connections per host.
+HTTP_POOL_CONNECTIONS: int = int(os.getenv("HTTP_POOL_CONNECTIONS", "4"))
+HTTP_POOL_MAXSIZE: int = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_MAX_RETRIES: int = 3
+
+# Rate limits
+# `(requests per second, burst size)` per provider, shared by all generations of the process.
+RATE_LIMITS: dict[str, tuple[float, int]] = {
+    "spotify": (float(os.getenv("SPOTIFY_RATE_LIMIT", "10")), 20),
+    "youtube": (float(os.getenv("YOUTUBE_RATE_LIMIT", "5")), 10),
+    "lastfm": (float(os.getenv("LASTFM_RATE_LIMIT", "5")), 5),
+}
+# Pause(in seconds) after 429 response without `Retry-After` header.
+DEFAULT_RETRY_AFTER: float = 1
+
+# Call budgets
+# Max amount of upstream calls per generation & per user per day, `0` disables the limit.
+# Once budget is spent, optional work(extra LastFM lookups, resolution of recommendations) is skipped.
+GENERATION_CALL_BUDGET: int = int(os.getenv("GENERATION_CALL_BUDGET", "1000"))
+DAILY_USER_CALL_BUDGET: int = int(os.getenv("DAILY_USER_CALL_BUDGET", "5000"))
+
+# Metrics
+# Upper bounds(in seconds) of latency histogram buckets.
+METRICS_BUCKETS: tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Caches
+# SQLite file shared by all caches, lives in tmp dir by default, since the cloud function workspace is read-only.
+CACHE_PATH: str = os.getenv(
+    "CACHE_PATH", f"{tempfile.gettempdir()}/.playlist_cache.sqlite"
+)
+# Cross-platform matches hardly ever change, while "not found" tracks might get uploaded later.
+MATCH_CACHE_TTL: int = 30 * 24 * 60 * 60
+MATCH_CACHE_NEGATIVE_TTL: int = 24 * 60 * 60
+# Recommendation endpoints which responses are cached & their TTLs(in seconds).
+RESPONSE_CACHE_TTL: dict[str, int] = {
+    "lastfm.track.getsimilar": 12 * 60 * 60,
+    "spotify.recommendations": 6 * 60 * 60,
+    "youtube.get_watch_playlist": 6 * 60 * 60,
+}
+# Max amount of responses kept in memory, on top of the on-disk tier.
+RESPONSE_CACHE_MEMORY_SIZE: int = 512
+
+# Client pool
+# Max amount of users which ready-to-use Spotify & YouTube clients are kept for.
+CLIENT_POOL_SIZE: int = int(os.getenv("CLIENT_POOL_SIZE", "64"))
+# Clients that weren't used for this long(in seconds) are dropped.
+CLIENT_POOL_IDLE_TTL: int = int(os.getenv("CLIENT_POOL_IDLE_TTL", "1800"))
+
+# Server
+# `cherrypy` runs every request to completion on the shared loop, `asyncio` serves requests concurrently,
+# `worker` serves no requests & only runs queued jobs.
+SERVER_MODE: str = os.getenv("SERVER_MODE", "cherrypy")
+SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8081"))
+# Seconds idle keep-alive connection is kept open & max size of request body, in bytes.
+SERVER_KEEP_ALIVE: int = 75
+SERVER_MAX_BODY_SIZE: int = 1024 * 1024
+
+# Jobs
+# With `JOB_QUEUE`, generations are queued & run by `JOB_WORKERS` threads, while webhook is answered right away.
+# `SERVER_MODE=worker` runs only the workers, e.g. in separate processes sharing `JOBS_PATH`.
+JOB_QUEUE: bool = os.getenv("JOB_QUEUE", "0") == "1"
+JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+JOBS_PATH: str = os.getenv(
+    "JOBS_PATH", f"{tempfile.gettempdir()}/.playlist_jobs.sqlite"
+)
+# Failed jobs are retried after `JOB_RETRY_DELAY * attempts` seconds, jobs running longer than `JOB_TIMEOUT` are
+# considered abandoned(i.e. worker died) & are picked up again.
+JOB_MAX_ATTEMPTS: int = 2
+JOB_RETRY_DELAY: float = 30
+JOB_TIMEOUT: float = 10 * 60
+# Seconds idle worker waits before polling the queue again.
+JOB_POLL_INTERVAL: float = 0.5
+# Nothing renews the lease of a queued generation, so its TTL covers the wait in the queue.
+# Worker renews the lease as usual once the job is running.
+JOB_LEASE_TTL: int = 15 * 60
+
+# Seconds before `expires_at` OAuth tokens are refreshed at, so generation starts with a ready token.
+TOKEN_REFRESH_MARGIN: int = int(os.getenv("TOKEN_REFRESH_MARGIN", "600"))
+
+# Prefetch
+# Last tracks are fetched & resolved speculatively once the generate menu is opened, with `PREFETCH_LAST_N`
+# being the biggest option of the menu. Prefetch waits for a free worker, results are kept for `PREFETCH_TTL` seconds.
+PREFETCH: bool = os.getenv("PREFETCH", "1") == "1"
+PREFETCH_LAST_N: int = 10
+PREFETCH_MAX_WORKERS: int = int(os.getenv("PREFETCH_MAX_WORKERS", "4"))
+PREFETCH_MAX_USERS: int = 64
+PREFETCH_TTL: float = 2 * 60
+# Max seconds generation waits for the running prefetch, instead of fetching the same tracks again.
+PREFETCH_WAIT: float = 10
+
+# Storage
+# Where users are stored: `firebase` or `sqlite`(single-node deployments & offline load tests).
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "firebase")
+STORAGE_PATH: str = os.getenv(
+    "STORAGE_PATH", f"{tempfile.gettempdir()}/.playlist_storage.sqlite"
+)
+# Seconds user node read from the database is reused between updates, writes invalidate it right away.
+USER_CACHE_TTL: int = int(os.getenv("USER_CACHE_TTL", "10"))
+
+# Max amount of concurrent database calls made by the bot handlers.
+DB_MAX_WORKERS: int = int(os.getenv("DB_MAX_WORKERS", "8"))
+
+# Generation lease
+# Lease of a crashed process is reclaimed after `GENERATION_LEASE_TTL` seconds, live ones are renewed every heartbeat.
+GENERATION_LEASE_TTL: int = int(os.getenv("GENERATION_LEASE_TTL", "90"))
+GENERATION_LEASE_HEARTBEAT: int = int(os.getenv("GENERATION_LEASE_HEARTBEAT", "30"))
+
+# Batch generation
+# `python -m playlist.core.batch` generates playlists of all authorized users on `BATCH_PROCESSES` processes,
+# each generating for `BATCH_CONCURRENCY` users at a time. Users are handed out to processes in shards.
+BATCH_PROCESSES: int = int(os.getenv("BATCH_PROCESSES", "4"))
+BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "2"))
+BATCH_SHARD_SIZE: int = 10
+BATCH_LAST_N: int = 10
+# Batch doesn't renew leases, so TTL covers generation of every platform of a user.
+BATCH_LEASE_TTL: int = 15 * 60
+
 DB_NAME = "playlist"
 DB_URL = "https://datastorage-140b8-default-rtdb.europe-west1.firebasedatabase.app/"
 LOG_CHAT_ID = 2014609673
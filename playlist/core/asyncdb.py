@@ -0,0 +1,71 @@
+"""
+Async facade of the `database` module for the bot handlers.
+Blocking storage calls run on a dedicated bounded executor, so slow storage doesn't stall the event loop,
+while concurrent updates of the same user are merged into a single write.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from telegram import Chat
+
+try:
+    from playlist.model.User import User
+    from playlist.constants import DB_MAX_WORKERS
+except ModuleNotFoundError:
+    from model import User
+    from constants import DB_MAX_WORKERS
+
+import database
+from batcher import WriteBatcher, runInExecutor
+from jobs import getJobQueue
+from lease import GenerationLease
+
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="db")
+_writes = WriteBatcher(database.updateUser, _executor)
+
+
+async def getUser(chat: Chat) -> User:
+    return await runInExecutor(_executor, database.getUser, chat)
+
+
+async def storeUserMessage(user: User) -> None:
+    """Counts generation request of the `user`."""
+    user.messages += 1
+    user.updated = datetime.now()
+    await _writes.update(
+        user.userId, {"messages": user.messages, "_updated": str(user.updated)}
+    )
+
+
+async def storeAuth(userId: str, platform: str, creds: dict) -> None:
+    """Stores OAuth credentials of the `platform`, e.g. after redirect from Spotify / YouTube."""
+    await _writes.update(userId, {platform: creds})
+
+
+async def storeMainYoutubePlaylist(user: User, previous: str | None) -> None:
+    """
+    Stores main YouTube playlist of the `user` if it has changed.
+    Written directly rather than batched, since job workers call it from their own event loops.
+    """
+    await runInExecutor(_executor, database.storeMainYoutubePlaylist, user, previous)
+
+
+def newLease(userId: str, **kwargs) -> GenerationLease:
+    """Generation lease of the user, its heartbeat & release run on the db executor too."""
+    return GenerationLease(userId, database.transactLease, executor=_executor, **kwargs)
+
+
+async def acquireLease(lease: GenerationLease) -> bool:
+    return await runInExecutor(_executor, lease.acquire)
+
+
+async def releaseLease(lease: GenerationLease) -> None:
+    await runInExecutor(_executor, lease.release)
+
+
+async def enqueueJob(kind: str, payload: dict) -> int:
+    return await runInExecutor(_executor, getJobQueue().enqueue, kind, payload)
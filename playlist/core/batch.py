@@ -0,0 +1,286 @@
+"""
+Batch generation of playlists for every authorized user, e.g. overnight by cron.
+Users are read from the storage & handed out in shards to a pool of processes. Processes share match & recommendation
+caches(the same `CACHE_PATH` file) and split every provider's rate limit, so together they stay within it.
+
+Usage:
+    python -m playlist.core.batch --platforms spotify youtube --lastN 10 --processes 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import logging
+import multiprocessing
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import as_completed
+from typing import Callable, Iterable, NamedTuple
+
+from more_itertools import chunked
+
+try:
+    from playlist.core.clients import getClientPool
+    from playlist.core.database import storeMainYoutubePlaylist
+    from playlist.core.generator import PlaylistGenerator
+    from playlist.core.lease import GenerationLease
+    from playlist.core.ratelimit import setShare
+    from playlist.core.storage import Storage, getStorage
+    from playlist.core.tokens import TokenManager
+    from playlist.model.User import User
+    from playlist.model.Platform import Platform
+    from playlist.constants import (
+        BATCH_PROCESSES,
+        BATCH_CONCURRENCY,
+        BATCH_SHARD_SIZE,
+        BATCH_LAST_N,
+        BATCH_LEASE_TTL,
+    )
+except ModuleNotFoundError:
+    from clients import getClientPool
+    from database import storeMainYoutubePlaylist
+    from generator import PlaylistGenerator
+    from lease import GenerationLease
+    from ratelimit import setShare
+    from storage import Storage, getStorage
+    from tokens import TokenManager
+    from model import User, Platform
+    from constants import (
+        BATCH_PROCESSES,
+        BATCH_CONCURRENCY,
+        BATCH_SHARD_SIZE,
+        BATCH_LAST_N,
+        BATCH_LEASE_TTL,
+    )
+
+
+logger: logging.Logger = logging.getLogger()
+
+# Generation statuses.
+DONE: str = "done"
+SKIPPED: str = "skipped"
+FAILED: str = "failed"
+
+
+class Generation(NamedTuple):
+    """Outcome of a single playlist generation, `error` is the exception type it failed with."""
+
+    userId: str
+    platform: str
+    status: str
+    took: float
+    error: str | None = None
+
+
+class BatchReport(NamedTuple):
+    generations: list[Generation]
+    seconds: float
+
+    @property
+    def users(self) -> int:
+        return len({x.userId for x in self.generations})
+
+    @property
+    def usersPerMinute(self) -> float:
+        return self.users / self.seconds * 60 if self.seconds else 0
+
+    @property
+    def statuses(self) -> Counter[str]:
+        """Amount of generations per status."""
+        return Counter(x.status for x in self.generations)
+
+    @property
+    def failures(self) -> Counter[str]:
+        """Amount of failed generations per `platform: error`."""
+        return Counter(
+            f"{x.platform}: {x.error}" for x in self.generations if x.status == FAILED
+        )
+
+    def format(self) -> str:
+        statuses: str = ", ".join(f"{k}={v}" for k, v in sorted(self.statuses.items()))
+        lines: list[str] = [
+            f"{self.users} users in {self.seconds:.1f}s ({self.usersPerMinute:.1f} users/min): {statuses}"
+        ]
+        lines += [
+            f"{count:>6}  {error}" for error, count in self.failures.most_common()
+        ]
+        return "\n".join(lines)
+
+
+def listAuthorizedUsers(
+    storage: Storage, platforms: Iterable[Platform]
+) -> list[tuple[str, dict]]:
+    """Returns `(userId, data)` of the users which authorized at least one of the `platforms`."""
+    platforms = list(platforms)
+    return [
+        (userId, data)
+        for userId, data in storage.iterUsers()
+        if any(platform.isAuthorized(User(**data)) for platform in platforms)
+    ]
+
+
+def generatePlaylist(user: User, platform: Platform, lastN: int) -> str:
+    """Generates playlist of the `user` with pooled clients, so they're built once for all platforms."""
+    playlistGenerator = PlaylistGenerator(user=user, clients=getClientPool().get(user))
+    return asyncio.run(platform.createPlaylist(playlistGenerator, lastN))
+
+
+def generateForUser(
+    userId: str,
+    data: dict,
+    platforms: list[Platform],
+    lastN: int,
+    storage: Storage,
+    tokenManager: TokenManager,
+    generate: Callable[[User, Platform, int], str] = generatePlaylist,
+) -> list[Generation]:
+    """
+    Generates playlists of the user on every authorized platform of `platforms`.
+    User is skipped if the generation lease is held, e.g. user is generating a playlist in Telegram right now.
+    """
+    user = User(**data)
+    authorized: list[Platform] = [x for x in platforms if x.isAuthorized(user)]
+    lease = GenerationLease(userId, storage.transactLease, ttl=BATCH_LEASE_TTL)
+    if not lease.acquire():
+        return [Generation(userId, platform, SKIPPED, 0) for platform in authorized]
+
+    generations: list[Generation] = []
+    try:
+        tokenManager.ensureFresh(user)
+        mainYoutubePlaylist: str | None = user.mainYoutubePlaylist
+        for platform in authorized:
+            startedAt: float = time.perf_counter()
+            try:
+                generate(user, platform, lastN)
+            except Exception as err:
+                logger.error(
+                    f"Failed to generate {platform} playlist of {userId}: {traceback.format_exc()}"
+                )
+                status, error = FAILED, type(err).__name__
+            else:
+                status, error = DONE, None
+            generations.append(
+                Generation(
+                    userId, platform, status, time.perf_counter() - startedAt, error
+                )
+            )
+
+        storeMainYoutubePlaylist(user, mainYoutubePlaylist, storage.updateUser)
+    finally:
+        lease.release()
+
+    return generations
+
+
+def generateShard(
+    users: list[tuple[str, dict]],
+    platforms: list[Platform],
+    lastN: int = BATCH_LAST_N,
+    concurrency: int = BATCH_CONCURRENCY,
+    generate: Callable[[User, Platform, int], str] = generatePlaylist,
+) -> list[Generation]:
+    """Generates playlists of the `users`, `concurrency` users at a time. Runs in a worker process."""
+    storage: Storage = getStorage()
+    # Refreshed tokens are written back, so the bot starts with them too.
+    tokenManager = TokenManager(persist=storage.updateUser)
+
+    def generateUser(userId: str, data: dict) -> list[Generation]:
+        try:
+            return generateForUser(
+                userId, data, platforms, lastN, storage, tokenManager, generate
+            )
+        except Exception as err:
+            # E.g. storage is unavailable, so the lease can't be taken.
+            logger.error(f"Failed to generate for {userId}: {traceback.format_exc()}")
+            return [Generation(userId, "-", FAILED, 0, type(err).__name__)]
+
+    with ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="batch"
+    ) as executor:
+        results = executor.map(lambda x: generateUser(*x), users)
+        return [generation for result in results for generation in result]
+
+
+def runBatch(
+    users: list[tuple[str, dict]],
+    work: Callable[[list[tuple[str, dict]]], list[Generation]],
+    processes: int = BATCH_PROCESSES,
+    shardSize: int = BATCH_SHARD_SIZE,
+) -> BatchReport:
+    """
+    Runs `work(shard)` for shards of `users` on `processes` processes & reports all generations.
+    `work` is sent to the processes, so it has to be picklable, e.g. `functools.partial()` of `generateShard()`.
+    """
+    startedAt: float = time.perf_counter()
+    generations: list[Generation] = []
+    usersDone: int = 0
+
+    # Spawned processes don't inherit parent's connections(e.g. storage's HTTP session), which aren't fork-safe.
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=setShare,
+        initargs=(1 / processes,),
+    ) as executor:
+        futures: dict[Future, list[tuple[str, dict]]] = {
+            executor.submit(work, shard): shard for shard in chunked(users, shardSize)
+        }
+        for future in as_completed(futures):
+            shard: list[tuple[str, dict]] = futures[future]
+            try:
+                generations += future.result()
+            except Exception as err:
+                # E.g. worker process died, all users of the shard are failed.
+                logger.error(
+                    f"Shard of {len(shard)} users failed: {traceback.format_exc()}"
+                )
+                generations += [
+                    Generation(userId, "-", FAILED, 0, type(err).__name__)
+                    for userId, _ in shard
+                ]
+
+            usersDone += len(shard)
+            took: float = time.perf_counter() - startedAt
+            logger.info(
+                f"Generated for {usersDone}/{len(users)} users, {usersDone / took * 60:.1f} users/min"
+            )
+
+    return BatchReport(generations, time.perf_counter() - startedAt)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--platforms", nargs="+", type=Platform, default=list(Platform))
+    parser.add_argument("--lastN", type=int, default=BATCH_LAST_N)
+    parser.add_argument("--processes", type=int, default=BATCH_PROCESSES)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help="Users generated at a time by each process",
+    )
+    args = parser.parse_args()
+
+    users: list[tuple[str, dict]] = listAuthorizedUsers(getStorage(), args.platforms)
+    logger.info(
+        f"Generating playlists of {len(users)} users on {args.processes} processes"
+    )
+    report: BatchReport = runBatch(
+        users,
+        functools.partial(
+            generateShard,
+            platforms=args.platforms,
+            lastN=args.lastN,
+            concurrency=args.concurrency,
+        ),
+        args.processes,
+    )
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+
+async def runInExecutor(executor: Executor, method: Callable, *args) -> Any:
+    """Runs blocking `method` on the `executor` within a copy of the current context."""
+    context: contextvars.Context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, functools.partial(context.run, method, *args)
+    )
+
+
+class WriteBatcher:
+    """
+    Merges concurrent partial updates of the same key into a single `write(key, values)`.
+    Writes of a key are never run concurrently: updates that arrive while the previous write is in flight
+    are merged into the next one, so slow storage results in fewer, not more, round-trips.
+    """
+
+    def __init__(self, write: Callable[[str, dict], None], executor: Executor) -> None:
+        self.write = write
+        self.executor = executor
+        # Values waiting for the write & future resolved once they're written: `{key: (values, future)}`.
+        self._pending: dict[str, tuple[dict, asyncio.Future]] = {}
+        # Last scheduled flush per key, next flush waits for it.
+        self._flushes: dict[str, asyncio.Task] = {}
+
+    async def update(self, key: str, values: dict) -> None:
+        """Schedules `values` to be written, returns once they're stored."""
+        if key in self._pending:
+            batch, future = self._pending[key]
+            batch.update(values)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = (dict(values), future)
+            self._scheduleFlush(key)
+
+        # Cancellation of one writer must not cancel the write of the others.
+        await asyncio.shield(future)
+
+    def _scheduleFlush(self, key: str) -> None:
+        flush = asyncio.create_task(self._flush(key, self._flushes.get(key)))
+        self._flushes[key] = flush
+        flush.add_done_callback(
+            lambda x: self._flushes.pop(key) if self._flushes.get(key) is x else None
+        )
+
+    async def _flush(self, key: str, previous: asyncio.Task | None) -> None:
+        if previous:
+            await asyncio.wait([previous])
+        else:
+            # Let writers of the same loop iteration join the batch.
+            await asyncio.sleep(0)
+
+        values, future = self._pending.pop(key)
+        try:
+            await runInExecutor(self.executor, self.write, key, values)
+            future.set_result(None)
+        except Exception as err:
+            future.set_exception(err)
@@ -18,14 +18,28 @@ try:
 except ModuleNotFoundError:
     from model import User
 
+import database
 from handlers import (
+    GENERATION_JOB,
+    runGenerationJob,
     startCommand,
     handleGETRequest,
     handleChoice,
     handleAuthCommand,
     handleGeneratePlaylistCommand,
 )
-from constants import GENERATE_PLAYLIST, AUTH_SPOTIFY, AUTH_YOUTUBE
+from jobs import WorkerPool, getJobQueue
+from server import Server
+from constants import (
+    GENERATE_PLAYLIST,
+    AUTH_SPOTIFY,
+    AUTH_YOUTUBE,
+    SERVER_MODE,
+    SERVER_HOST,
+    SERVER_PORT,
+    JOB_QUEUE,
+    JOB_WORKERS,
+)
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -36,6 +50,14 @@ logger = logging.getLogger(__name__)
 
 async def wrapper(request) -> str:
     """Docstring for wrapper"""
+    await application.initialize()
+    return await handleRequest(request)
+
+
+async def handleRequest(request) -> str:
+    """Handles redirects & web-pages(GET) and Telegram updates(POST), `application` must be initialized."""
+    # Every request(i.e. update) reads its user at most once.
+    database.startRequest()
 
     if request.method == "GET":
         return await handleGETRequest(request)
@@ -50,13 +72,17 @@ async def wrapper(request) -> str:
 
     # Assume that update is always parsed correctly.
     update: Update = Update.de_json(rawRequest, bot)
-
-    await application.initialize()
     await application.process_update(update)
 
     return "ok"
 
 
+async def serve() -> None:
+    """Runs long-lived asyncio server: `application` is initialized once & requests are handled concurrently."""
+    async with application:
+        await Server(handleRequest).serve(SERVER_HOST, SERVER_PORT)
+
+
 import cherrypy
 
 
@@ -93,8 +119,24 @@ application.add_handler(conversation_handler)
 application.add_handler(CallbackQueryHandler(handleChoice))
 
 
+def startWorkers() -> WorkerPool:
+    """Starts threads that run queued generations."""
+    return WorkerPool(
+        getJobQueue(), {GENERATION_JOB: runGenerationJob}, JOB_WORKERS
+    ).start()
+
+
 if __name__ == "__main__":
-    cherrypy.server.socket_port = 8081
-    cherrypy.tree.mount(entryPoint)
-    cherrypy.engine.start()
-    cherrypy.engine.block()
+    # Dedicated worker process, webhook is served by other processes.
+    if SERVER_MODE == "worker":
+        startWorkers().join()
+    elif JOB_QUEUE and JOB_WORKERS:
+        startWorkers()
+
+    if SERVER_MODE == "asyncio":
+        eventLoop.run_until_complete(serve())
+    elif SERVER_MODE == "cherrypy":
+        cherrypy.server.socket_port = SERVER_PORT
+        cherrypy.tree.mount(entryPoint)
+        cherrypy.engine.start()
+        cherrypy.engine.block()
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from datetime import date
+from typing import Any, Callable
+
+try:
+    from playlist.core.cache import SqliteCache
+    from playlist.constants import (
+        CACHE_PATH,
+        GENERATION_CALL_BUDGET,
+        DAILY_USER_CALL_BUDGET,
+    )
+except ModuleNotFoundError:
+    from cache import SqliteCache
+    from constants import CACHE_PATH, GENERATION_CALL_BUDGET, DAILY_USER_CALL_BUDGET
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class Usage:
+    """Upstream calls of a single generation per `(provider, endpoint)`, `budget` is max amount of calls."""
+
+    def __init__(self, budget: int | None = None) -> None:
+        self.budget = budget
+        self.calls: Counter[tuple[str, str]] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, endpoint: str) -> None:
+        with self._lock:
+            self.calls[(provider, endpoint)] += 1
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(self.calls.values())
+
+    @property
+    def isExhausted(self) -> bool:
+        """Whether optional work(e.g. extra LastFM lookups) should be skipped."""
+        return self.budget is not None and self.total >= self.budget
+
+    def summary(self) -> dict[str, int]:
+        """Calls per `provider endpoint`, most called first."""
+        with self._lock:
+            return {f"{p} {e}": x for (p, e), x in self.calls.most_common()}
+
+
+# Usage of the current generation, propagated into generation threads together with the context.
+currentUsage: ContextVar[Usage | None] = ContextVar("currentUsage", default=None)
+
+
+def recordCall(provider: str, endpoint: str) -> None:
+    """Accounts the call in the current generation, if there is one."""
+    if usage := currentUsage.get():
+        usage.record(provider, endpoint)
+
+
+def isOverBudget() -> bool:
+    """Whether current generation has spent its budget."""
+    usage: Usage | None = currentUsage.get()
+    return bool(usage and usage.isExhausted)
+
+
+class UsageStore(SqliteCache):
+    """Amount of upstream calls per user per day, shared by all processes using the cache file."""
+
+    schema: str = (
+        "CREATE TABLE IF NOT EXISTS usage ("
+        "userId TEXT NOT NULL, day TEXT NOT NULL, calls INTEGER NOT NULL, "
+        "PRIMARY KEY (userId, day))"
+    )
+
+    def get(self, userId: str, day: date) -> int:
+        rows = self._execute(
+            "SELECT calls FROM usage WHERE userId = ? AND day = ?",
+            (userId, day.isoformat()),
+        )
+        return rows[0][0] if rows else 0
+
+    def add(self, userId: str, day: date, calls: int) -> None:
+        self._execute(
+            "INSERT INTO usage VALUES (?, ?, ?) "
+            "ON CONFLICT (userId, day) DO UPDATE SET calls = calls + excluded.calls",
+            (userId, day.isoformat(), calls),
+        )
+
+
+_usageStore: UsageStore | None = None
+_usageStoreLock = threading.Lock()
+
+
+def getUsageStore() -> UsageStore | None:
+    """Returns process-wide `UsageStore`, or `None` if cache file cannot be opened."""
+    global _usageStore
+
+    with _usageStoreLock:
+        if _usageStore is None:
+            try:
+                _usageStore = UsageStore()
+            except Exception as err:
+                logger.error(f"Failed to open usage store at {CACHE_PATH}: {err}")
+                return None
+
+    return _usageStore
+
+
+def metered(method: Callable) -> Callable:
+    """
+    Decorator for generation methods: accounts all upstream calls made within the generation.
+    Budget is the smallest of `GENERATION_CALL_BUDGET` & what's left of user's `DAILY_USER_CALL_BUDGET`.
+    Daily usage is read from & added to `self.usageStore`, resulting `Usage` is stored in `self.usage` & logged.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs) -> Any:
+        userId: str = self.user.userId or ""
+        store: UsageStore | None = self.usageStore
+        today: date = date.today()
+
+        budgets: list[int] = []
+        if GENERATION_CALL_BUDGET:
+            budgets.append(GENERATION_CALL_BUDGET)
+        if DAILY_USER_CALL_BUDGET and store:
+            budgets.append(max(DAILY_USER_CALL_BUDGET - store.get(userId, today), 0))
+
+        self.usage = Usage(budget=min(budgets) if budgets else None)
+        token = currentUsage.set(self.usage)
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            currentUsage.reset(token)
+            logger.info(
+                f"{method.__name__}() made {self.usage.total} calls"
+                f"(budget {self.usage.budget}): {self.usage.summary()}"
+            )
+            if store:
+                store.add(userId, today, self.usage.total)
+
+    return wrapper
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple
+
+try:
+    from playlist.model.Track import Track
+    from playlist.model.Platform import Platform
+    from playlist.constants import (
+        CACHE_PATH,
+        MATCH_CACHE_TTL,
+        MATCH_CACHE_NEGATIVE_TTL,
+        RESPONSE_CACHE_TTL,
+        RESPONSE_CACHE_MEMORY_SIZE,
+    )
+except ModuleNotFoundError:
+    from model import Track, Platform
+    from constants import (
+        CACHE_PATH,
+        MATCH_CACHE_TTL,
+        MATCH_CACHE_NEGATIVE_TTL,
+        RESPONSE_CACHE_TTL,
+        RESPONSE_CACHE_MEMORY_SIZE,
+    )
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class TrackMatch(NamedTuple):
+    """Track id & artist ids of the matched track on the other platform."""
+
+    trackId: str
+    artistIds: list[str] | None
+
+
+class SqliteCache:
+    """
+    Base class for caches stored in a single SQLite file.
+    WAL mode allows several processes(& threads) to read & write the same file simultaneously.
+    """
+
+    schema: str = ""
+
+    def __init__(self, path: str = CACHE_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(self.schema)
+
+    def _execute(self, query: str, params: tuple = ()) -> list[tuple]:
+        """Executes `query` under the lock, since connection is shared between threads."""
+        with self._lock:
+            return self._connection.execute(query, params).fetchall()
+
+    def _transaction(self, method: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Runs `method` in a write transaction, other writers(incl. other processes) wait for it."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = method(self._connection)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+        return result
+
+    def close(self) -> None:
+        """Closes underlying connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class MatchCache(SqliteCache):
+    """
+    Persistent cache of cross-platform matches: `track signature -> track id on the platform`.
+    Negative entries(i.e. track was not found) are stored as well, but with a shorter TTL.
+    """
+
+    schema: str = (
+        "CREATE TABLE IF NOT EXISTS matches ("
+        "platform TEXT NOT NULL, signature TEXT NOT NULL, trackId TEXT, artistIds TEXT, expiresAt REAL NOT NULL, "
+        "PRIMARY KEY (platform, signature))"
+    )
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: int = MATCH_CACHE_TTL,
+        negativeTtl: int = MATCH_CACHE_NEGATIVE_TTL,
+    ) -> None:
+        super().__init__(path)
+        self.ttl = ttl
+        self.negativeTtl = negativeTtl
+
+    def lookup(
+        self, track: Track, platform: Platform
+    ) -> tuple[bool, TrackMatch | None]:
+        """
+        Returns `(isHit, match)`.
+        `(True, None)` means that track is already known to be missing on the `platform`.
+        """
+        rows = self._execute(
+            "SELECT trackId, artistIds FROM matches WHERE platform = ? AND signature = ? AND expiresAt > ?",
+            (str(platform), track.signature, time.time()),
+        )
+        if not rows:
+            return False, None
+
+        trackId, artistIds = rows[0]
+        if trackId is None:
+            return True, None
+
+        return True, TrackMatch(trackId, json.loads(artistIds))
+
+    def store(self, track: Track, platform: Platform, match: TrackMatch | None) -> None:
+        """Stores `match` of the `track` on the `platform`, `None` stores a negative entry."""
+        ttl = self.ttl if match else self.negativeTtl
+        self._execute(
+            "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?)",
+            (
+                str(platform),
+                track.signature,
+                match.trackId if match else None,
+                json.dumps(match.artistIds) if match else None,
+                time.time() + ttl,
+            ),
+        )
+
+
+class ResponseCache(SqliteCache):
+    """
+    Two-tier cache of raw provider responses: in-memory LRU on top of the on-disk table.
+    Full upstream payload is stored, so it could serve calls with different `limit`s.
+    """
+
+    schema: str = (
+        "CREATE TABLE IF NOT EXISTS responses ("
+        "endpoint TEXT NOT NULL, key TEXT NOT NULL, payload TEXT NOT NULL, expiresAt REAL NOT NULL, "
+        "PRIMARY KEY (endpoint, key))"
+    )
+
+    def __init__(
+        self,
+        path: str = CACHE_PATH,
+        ttl: dict[str, int] | None = None,
+        memorySize: int = RESPONSE_CACHE_MEMORY_SIZE,
+    ) -> None:
+        super().__init__(path)
+        self.ttl: dict[str, int] = ttl or RESPONSE_CACHE_TTL
+        self.memorySize = memorySize
+        self._memory: OrderedDict[tuple[str, str], tuple[float, dict]] = OrderedDict()
+        self._memoryLock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    @property
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hit/miss counters per endpoint: `{endpoint: {"memoryHits": .., "diskHits": .., "misses": ..}}`."""
+        with self._memoryLock:
+            return {endpoint: dict(x) for endpoint, x in self._stats.items()}
+
+    def fetch(
+        self,
+        endpoint: str,
+        key: str,
+        fetchMethod: Callable[[], dict],
+        isSufficient: Callable[[dict], bool] | None = None,
+        isCacheable: Callable[[dict], bool] | None = None,
+    ) -> dict:
+        """
+        Returns cached payload of `endpoint` for `key`, or calls `fetchMethod` and caches its result.
+        Cached payload is ignored if `isSufficient(payload)` is falsy, e.g. when it has less tracks than requested.
+        Fetched payload is not stored if `isCacheable(payload)` is falsy, e.g. when it's an error.
+        """
+        payload: dict | None = self.get(endpoint, key)
+        if payload is not None and (not isSufficient or isSufficient(payload)):
+            return payload
+
+        self._count(endpoint, "misses")
+        payload = fetchMethod()
+        if not isCacheable or isCacheable(payload):
+            self.set(endpoint, key, payload)
+
+        return payload
+
+    def get(self, endpoint: str, key: str) -> dict | None:
+        """Returns non-expired payload from memory, then from disk."""
+        now = time.time()
+        with self._memoryLock:
+            if (cached := self._memory.get((endpoint, key))) and cached[0] > now:
+                self._memory.move_to_end((endpoint, key))
+                self._countUnlocked(endpoint, "memoryHits")
+                return cached[1]
+
+        rows = self._execute(
+            "SELECT payload, expiresAt FROM responses WHERE endpoint = ? AND key = ? AND expiresAt > ?",
+            (endpoint, key, now),
+        )
+        if not rows:
+            return None
+
+        payload: dict = json.loads(rows[0][0])
+        self._remember(endpoint, key, payload, rows[0][1])
+        self._count(endpoint, "diskHits")
+
+        return payload
+
+    def set(self, endpoint: str, key: str, payload: dict) -> None:
+        """Stores `payload` in both tiers, with TTL of the `endpoint`."""
+        expiresAt: float = time.time() + self.ttl.get(endpoint, 0)
+        self._remember(endpoint, key, payload, expiresAt)
+        self._execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+            (endpoint, key, json.dumps(payload), expiresAt),
+        )
+
+    def _remember(self, endpoint: str, key: str, payload: dict, expiresAt: float):
+        """Puts `payload` into memory tier & evicts least recently used entries."""
+        with self._memoryLock:
+            self._memory[(endpoint, key)] = (expiresAt, payload)
+            self._memory.move_to_end((endpoint, key))
+            while len(self._memory) > self.memorySize:
+                self._memory.popitem(last=False)
+
+    def _count(self, endpoint: str, counter: str) -> None:
+        with self._memoryLock:
+            self._countUnlocked(endpoint, counter)
+
+    def _countUnlocked(self, endpoint: str, counter: str) -> None:
+        endpointStats = self._stats.setdefault(
+            endpoint, {"memoryHits": 0, "diskHits": 0, "misses": 0}
+        )
+        endpointStats[counter] += 1
+
+
+_matchCache: MatchCache | None = None
+_matchCacheLock = threading.Lock()
+
+
+def getMatchCache() -> MatchCache | None:
+    """Returns process-wide `MatchCache`, or `None` if cache file cannot be opened."""
+    global _matchCache
+
+    with _matchCacheLock:
+        if _matchCache is None:
+            try:
+                _matchCache = MatchCache()
+            except sqlite3.Error as err:
+                logger.error(f"Failed to open match cache at {CACHE_PATH}: {err}")
+                return None
+
+    return _matchCache
+
+
+_responseCache: ResponseCache | None = None
+_responseCacheLock = threading.Lock()
+
+
+def getResponseCache() -> ResponseCache | None:
+    """Returns process-wide `ResponseCache`, or `None` if cache file cannot be opened."""
+    global _responseCache
+
+    with _responseCacheLock:
+        if _responseCache is None:
+            try:
+                _responseCache = ResponseCache()
+            except sqlite3.Error as err:
+                logger.error(f"Failed to open response cache at {CACHE_PATH}: {err}")
+                return None
+
+    return _responseCache
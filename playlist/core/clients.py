@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import spotipy
+from spotipy import CacheFileHandler, MemoryCacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+from ytmusicapi.ytmusic import YTMusic
+from ytmusicapi.auth.oauth import OAuthCredentials
+
+try:
+    from playlist.core.sessions import OAUTH, getSession
+    from playlist.model.User import User
+    from playlist.model.Platform import Platform
+    from playlist.constants import (
+        SPOTIFY_SCOPES,
+        CLIENT_POOL_SIZE,
+        CLIENT_POOL_IDLE_TTL,
+    )
+except ModuleNotFoundError:
+    from sessions import OAUTH, getSession
+    from model import User, Platform
+    from constants import SPOTIFY_SCOPES, CLIENT_POOL_SIZE, CLIENT_POOL_IDLE_TTL
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class UserClients:
+    """Ready-to-use platform clients of a single user, plus lazily fetched Spotify user id."""
+
+    def __init__(
+        self,
+        youtube: YTMusic,
+        spotify: spotipy.Spotify,
+        spotifyUserId: str | None = None,
+        tokenKey: str = "",
+    ) -> None:
+        self.youtube = youtube
+        self.spotify = spotify
+        self.spotifyUserId = spotifyUserId
+        # Fingerprint of user's auth the clients were built with.
+        self.tokenKey = tokenKey
+        self.lastUsed: float = time.monotonic()
+
+    def getSpotifyUserId(self) -> str:
+        """Returns Spotify user id, `current_user()` is called only once per clients."""
+        if not self.spotifyUserId:
+            self.spotifyUserId = self.spotify.current_user()["id"]
+
+        return self.spotifyUserId
+
+
+def buildClients(user: User) -> UserClients:
+    """Builds YouTube & Spotify clients of the `user`, default(file based) credentials are used for missing auth."""
+    # Init youtube.
+    if user.youtubeAuth:
+        customOAuth = OAuthCredentials(
+            client_id=os.getenv("YOUTUBE_CLIENT_ID"),
+            client_secret=os.getenv("YOUTUBE_CLIENT_SECRET"),
+            session=getSession(OAUTH),
+        )
+        youtube = YTMusic(
+            auth=user.youtubeAuth,
+            oauth_credentials=customOAuth,
+            requests_session=getSession(Platform.YOUTUBE),
+        )
+    else:
+        myPath = Platform.YOUTUBE.defaultConfigPath
+        if "workspace" in myPath:
+            os.system(f"cp {myPath} {myPath.replace('workspace', 'tmp')}")
+            myPath = myPath.replace("workspace", "tmp")
+        youtube = YTMusic(auth=myPath, requests_session=getSession(Platform.YOUTUBE))
+
+    # Init spotify.
+    if user.spotifyAuth:
+        cache = MemoryCacheHandler(
+            token_info={**user.spotifyAuth, "scope": " ".join(SPOTIFY_SCOPES)}
+        )
+    else:
+        myPath = Platform.SPOTIFY.defaultConfigPath
+        if "workspace" in myPath:
+            os.system(f"cp {myPath} {myPath.replace('workspace', 'tmp')}")
+            myPath = myPath.replace("workspace", "tmp")
+        cache = CacheFileHandler(cache_path=myPath)
+
+    spotify = spotipy.Spotify(
+        auth_manager=SpotifyOAuth(
+            open_browser=False,
+            scope=SPOTIFY_SCOPES,
+            cache_handler=cache,
+            requests_session=getSession(OAUTH),
+        ),
+        requests_session=getSession(Platform.SPOTIFY),
+    )
+
+    return UserClients(youtube=youtube, spotify=spotify, tokenKey=getTokenKey(user))
+
+
+def getTokenKey(user: User) -> str:
+    """Fingerprint of user's auth, changes when user re-authorizes any platform."""
+    return json.dumps([user.spotifyAuth, user.youtubeAuth], sort_keys=True, default=str)
+
+
+class ClientPool:
+    """
+    LRU pool of `UserClients` keyed by user id.
+    Clients are rebuilt when user's auth changed & dropped when they weren't used for `idleTtl` seconds.
+    """
+
+    def __init__(
+        self, maxSize: int = CLIENT_POOL_SIZE, idleTtl: int = CLIENT_POOL_IDLE_TTL
+    ) -> None:
+        self.maxSize = maxSize
+        self.idleTtl = idleTtl
+        self._clients: OrderedDict[str, UserClients] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def get(self, user: User) -> UserClients:
+        """Returns pooled clients of the `user`, builds new ones if there are none or auth has changed."""
+        userId: str = user.userId or ""
+        tokenKey: str = getTokenKey(user)
+
+        with self._lock:
+            self._evictIdle()
+            clients: UserClients | None = self._clients.get(userId)
+            if clients and clients.tokenKey == tokenKey:
+                clients.lastUsed = time.monotonic()
+                self._clients.move_to_end(userId)
+                return clients
+
+        # Building is slow, so it's done outside the lock.
+        logger.info(f"Building clients for user {userId or 'default'}")
+        clients = buildClients(user)
+
+        with self._lock:
+            self._clients[userId] = clients
+            self._clients.move_to_end(userId)
+            while len(self._clients) > self.maxSize:
+                self._clients.popitem(last=False)
+
+        return clients
+
+    def invalidate(self, userId: str) -> None:
+        """Drops pooled clients of the user, e.g. after re-authorization."""
+        with self._lock:
+            self._clients.pop(userId, None)
+
+    def _evictIdle(self) -> None:
+        """Drops clients that weren't used for longer than `idleTtl`, least recently used are at the beginning."""
+        now: float = time.monotonic()
+        while self._clients:
+            userId, clients = next(iter(self._clients.items()))
+            if now - clients.lastUsed <= self.idleTtl:
+                break
+            del self._clients[userId]
+
+
+_clientPool: ClientPool | None = None
+_clientPoolLock = threading.Lock()
+
+
+def getClientPool() -> ClientPool:
+    """Returns process-wide `ClientPool`."""
+    global _clientPool
+
+    with _clientPoolLock:
+        if _clientPool is None:
+            _clientPool = ClientPool()
+
+    return _clientPool
@@ -1,69 +1,105 @@
-import os
-from datetime import datetime, timedelta
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable
 
-import firebase_admin
-from firebase_admin import db, credentials
 from telegram import Chat
 
-from constants import DB_NAME, DB_URL, DEFAULT_PATH
-
 try:
+    from playlist.core.storage import getStorage
     from playlist.model.User import User
+    from playlist.constants import USER_CACHE_TTL
 except ModuleNotFoundError:
+    from storage import getStorage
     from model import User
+    from constants import USER_CACHE_TTL
+
+
+# Raw user nodes read during the current update, see `startRequest()`.
+_requestUsers: ContextVar[dict[str, dict] | None] = ContextVar(
+    "requestUsers", default=None
+)
+# Raw user nodes shared between updates for `USER_CACHE_TTL` seconds: `{userId: (expiresAt, data)}`.
+_cachedUsers: dict[str, tuple[float, dict]] = {}
+_cachedUsersLock = threading.Lock()
+
+
+def startRequest() -> None:
+    """Starts a new request scope, so user is read from the storage at most once per update."""
+    _requestUsers.set({})
+
+
+def _readUser(userId: str) -> dict | None:
+    """Reads raw user node: from the request scope, then from the TTL cache & only then from the storage."""
+    requestUsers: dict[str, dict] | None = _requestUsers.get()
+    if requestUsers is None:
+        requestUsers = {}
+        _requestUsers.set(requestUsers)
+    if userId in requestUsers:
+        return requestUsers[userId]
 
+    with _cachedUsersLock:
+        cached: tuple[float, dict] | None = _cachedUsers.get(userId)
+    if cached and cached[0] > time.monotonic():
+        data: dict | None = cached[1]
+    else:
+        data = getStorage().getUser(userId)
+        if data:
+            with _cachedUsersLock:
+                _cachedUsers[userId] = (time.monotonic() + USER_CACHE_TTL, data)
 
-cred = credentials.Certificate(f"{DEFAULT_PATH}/_firebase.json")
-firebase_admin.initialize_app(cred, {"databaseURL": os.environ.get("DB", DB_URL)})
-database = db.reference(DB_NAME)
+    if data:
+        requestUsers[userId] = data
+    return data
+
+
+def invalidateUser(userId: str) -> None:
+    """Drops cached user node, must be called after every write to it."""
+    if (requestUsers := _requestUsers.get()) is not None:
+        requestUsers.pop(userId, None)
+    with _cachedUsersLock:
+        _cachedUsers.pop(userId, None)
 
 
 def getUser(chat: Chat) -> User:
     """Docstring for get User"""
 
     userId = str(chat.id)
-    data: object | dict | None = database.child(userId).get()
+    data: object | dict | None = _readUser(userId)
 
     # Create user if it does not exist.
     if not data:
         user = User(userId=userId, userName=chat.username)
-        database.child(userId).set(user.model_dump(mode="json"))
+        getStorage().setUser(userId, user.model_dump(mode="json"))
+        invalidateUser(userId)
 
         return user
 
     # Otherwise load it from db.
-    user = User(**data)
-
-    # Unset `inProgress` field if it wasn't updated for longer than 10min
-    if user.inProgress and (datetime.now() - user.updated) > timedelta(seconds=600):
-        user.inProgress = False
-
-    return user
-
-
-def storeUserInProgress(user: User) -> None:
-    """Docstring for"""
+    return User(**data)
 
-    user.inProgress = True
-    user.messages += 1
-    user.updated = datetime.now()
 
-    database.child(user.userId).update(
-        {
-            "inProgress": user.inProgress,
-            "messages": user.messages,
-            "_updated": str(user.updated),
-        }
-    )
+def updateUser(userId: str, values: dict) -> None:
+    """Updates given fields of the user node."""
+    getStorage().updateUser(userId, values)
+    invalidateUser(userId)
 
 
-def finishUserInProgress(user: User) -> None:
-    """Docstring for"""
-    usersReference = db.reference(DB_NAME)
+def transactLease(
+    userId: str, update: Callable[[dict | None], dict | None]
+) -> dict | None:
+    """Atomically replaces generation lease of the user with `update(currentLease)`."""
+    return getStorage().transactLease(userId, update)
 
-    user.inProgress = False
-    user.updated = datetime.now()
 
-    database.child(user.userId).update(
-        {"inProgress": user.inProgress, "_updated": str(user.updated)}
-    )
+def storeMainYoutubePlaylist(
+    user: User,
+    previous: str | None,
+    update: Callable[[str, dict], None] = updateUser,
+) -> None:
+    """
+    Stores id of the main YouTube playlist if it was (re)discovered, i.e. differs from the `previous` one,
+    so it's not looked up on every generation.
+    """
+    if user.mainYoutubePlaylist != previous:
+        update(user.userId, {"mainYoutubePlaylist": user.mainYoutubePlaylist})
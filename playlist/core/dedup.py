@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import threading
+from typing import Iterable
+
+try:
+    from playlist.model.Track import Track
+except ModuleNotFoundError:
+    from model import Track
+
+
+class TrackIndex:
+    """
+    Thread-safe index of already seen tracks, shared between generation stages.
+    Track is a duplicate if any of its `identityKeys` was seen, so Spotify & YouTube versions of the same song
+    are matched by their normalized name even before they're resolved on the other platform.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()) -> None:
+        self._keys: set[str] = set()
+        self._lock = threading.Lock()
+        self.filterNew(tracks)
+
+    def __contains__(self, track: Track) -> bool:
+        with self._lock:
+            return any(x in self._keys for x in track.identityKeys)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._keys)
+
+    def add(self, track: Track) -> bool:
+        """Adds `track` to the index, returns `False` if it was already there."""
+        keys: list[str] = track.identityKeys
+        with self._lock:
+            isNew: bool = not any(x in self._keys for x in keys)
+            self._keys.update(keys)
+
+        return isNew
+
+    def filterNew(self, tracks: Iterable[Track]) -> list[Track]:
+        """Adds `tracks` to the index & returns only the ones that weren't there(keeping the order)."""
+        return [x for x in tracks if self.add(x)]
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import os
-import json
 import logging
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
 
 
 import requests
@@ -13,29 +15,63 @@ from dotenv import load_dotenv
 
 # Integrations
 import spotipy
-from spotipy import CacheFileHandler, MemoryCacheHandler
-from spotipy.oauth2 import SpotifyOAuth
 from ytmusicapi.ytmusic import YTMusic
-from ytmusicapi.auth.oauth import OAuthCredentials
 
 # Models
 try:
+    from playlist.core.budget import (
+        Usage,
+        UsageStore,
+        getUsageStore,
+        isOverBudget,
+        metered,
+    )
+    from playlist.core.cache import (
+        MatchCache,
+        ResponseCache,
+        TrackMatch,
+        getMatchCache,
+        getResponseCache,
+    )
+    from playlist.core.clients import UserClients, buildClients
+    from playlist.core.dedup import TrackIndex
+    from playlist.core.pipeline import Pipeline
+    from playlist.core.tracing import submitInContext, traced
+    from playlist.core.writer import PlaylistWriter
+    from playlist.core.sessions import LASTFM, getSession
+    from playlist.model.LightTrack import LightTrack
     from playlist.model.Track import Track
     from playlist.model.User import User, Auth
     from playlist.model.Platform import Platform
     from playlist.constants import (
-        SPOTIFY_SCOPES,
-        MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE,
         MAX_SPOTIFY_RECOMMENDATION_CHUNK_SIZE,
+        SPOTIFY_SEARCH_CONCURRENCY,
+        YOUTUBE_SEARCH_CONCURRENCY,
+        PROGRESSIVE_BATCH_SIZE,
         lastFMUrl,
         DEFAULT_TIMEOUT,
     )
 except ModuleNotFoundError:
-    from model import Track, User, Auth, Platform
+    from budget import Usage, UsageStore, getUsageStore, isOverBudget, metered
+    from cache import (
+        MatchCache,
+        ResponseCache,
+        TrackMatch,
+        getMatchCache,
+        getResponseCache,
+    )
+    from clients import UserClients, buildClients
+    from dedup import TrackIndex
+    from pipeline import Pipeline
+    from tracing import submitInContext, traced
+    from writer import PlaylistWriter
+    from sessions import LASTFM, getSession
+    from model import Track, LightTrack, User, Auth, Platform
     from constants import (
-        SPOTIFY_SCOPES,
-        MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE,
         MAX_SPOTIFY_RECOMMENDATION_CHUNK_SIZE,
+        SPOTIFY_SEARCH_CONCURRENCY,
+        YOUTUBE_SEARCH_CONCURRENCY,
+        PROGRESSIVE_BATCH_SIZE,
         lastFMUrl,
         DEFAULT_TIMEOUT,
     )
@@ -49,6 +85,12 @@ logging.basicConfig(
 )
 logger: logging.Logger = logging.getLogger()
 
+# Process-wide limit of searches in flight per platform, shared by concurrent stages & generations.
+_searchSlots: dict[Platform, threading.BoundedSemaphore] = {
+    Platform.SPOTIFY: threading.BoundedSemaphore(SPOTIFY_SEARCH_CONCURRENCY),
+    Platform.YOUTUBE: threading.BoundedSemaphore(YOUTUBE_SEARCH_CONCURRENCY),
+}
+
 
 class PlaylistGenerator:
     # TODO:
@@ -61,43 +103,29 @@ class PlaylistGenerator:
     Also adds suggestions.
     """
 
-    def __init__(self, user: User | None = None) -> None:
+    def __init__(
+        self,
+        user: User | None = None,
+        matchCache: MatchCache | None = None,
+        responseCache: ResponseCache | None = None,
+        clients: UserClients | None = None,
+        lastFMSession: requests.Session | None = None,
+        lastTracks: dict[Platform, list[Track]] | None = None,
+        usageStore: UsageStore | None = None,
+    ) -> None:
         self.user = user or User()
-        # Init youtube.
-        if self.user.youtubeAuth:
-            customOAuth = OAuthCredentials(
-                client_id=os.getenv("YOUTUBE_CLIENT_ID"),
-                client_secret=os.getenv("YOUTUBE_CLIENT_SECRET"),
-            )
-            self.youtube: YTMusic = YTMusic(
-                auth=user.youtubeAuth, oauth_credentials=customOAuth
-            )
-        else:
-            myPath = Platform.YOUTUBE.defaultConfigPath
-            if "workspace" in myPath:
-                os.system(f"cp {myPath} {myPath.replace('workspace', 'tmp')}")
-                myPath = myPath.replace("workspace", "tmp")
-            self.youtube: YTMusic = YTMusic(auth=myPath)
-
-        # Init spotify.
-        if self.user.spotifyAuth:
-            cache = MemoryCacheHandler(
-                token_info={**user.spotifyAuth, "scope": " ".join(SPOTIFY_SCOPES)}
-            )
-        else:
-            myPath = Platform.SPOTIFY.defaultConfigPath
-            if "workspace" in myPath:
-                os.system(f"cp {myPath} {myPath.replace('workspace', 'tmp')}")
-                myPath = myPath.replace("workspace", "tmp")
-            cache = CacheFileHandler(cache_path=myPath)
-
-        self.spotify = spotipy.Spotify(
-            auth_manager=SpotifyOAuth(
-                open_browser=False,
-                scope=SPOTIFY_SCOPES,
-                cache_handler=cache,
-            )
-        )
+        self.matchCache: MatchCache | None = matchCache or getMatchCache()
+        self.responseCache: ResponseCache | None = responseCache or getResponseCache()
+        # Clients are either pooled(see `ClientPool`) or built for this generation only.
+        self.clients: UserClients = clients or buildClients(self.user)
+        self.youtube: YTMusic = self.clients.youtube
+        self.spotify: spotipy.Spotify = self.clients.spotify
+        self.lastFMSession: requests.Session = lastFMSession or getSession(LASTFM)
+        # Upstream calls of the last generation & daily calls per user, see `metered`.
+        self.usage: Usage | None = None
+        self.usageStore: UsageStore | None = usageStore or getUsageStore()
+        # Prefetched last tracks per platform(see `prefetch()`), served instead of fetching them again.
+        self.lastTracks: dict[Platform, list[Track]] = lastTracks or {}
 
     def getYoutubePlaylists(self) -> list[dict]:
         """Docstring for getYoutubePlaylists"""
@@ -107,17 +135,33 @@ class PlaylistGenerator:
             reverse=True,
         )
 
+    @traced()
     def getLastYoutubeTracks(self, lastN: int = 10) -> list[Track]:
         """
         Retrieves the last N tracks from the main YouTube playlist.
         """
         logger.info(f"Executing `getLastYoutubeTracks()`, fetching last {lastN} tracks")
+        if Platform.YOUTUBE in self.lastTracks:
+            return self.lastTracks[Platform.YOUTUBE][:lastN]
+
+        # Main playlist id is cached in the user, so library is listed only when it's unknown or became invalid.
+        mainPlaylist: dict | None = None
+        if self.user.mainYoutubePlaylist:
+            mainPlaylist = self._getYoutubePlaylist(
+                self.user.mainYoutubePlaylist, limit=lastN
+            )
 
-        # To find out main youtube playlist, get all playlists & sort playlists by tracks count.
-        allPlaylists: list[dict] = self.getYoutubePlaylists()
-        # Assume that biggest playlist is the main one.
-        playlistId = allPlaylists[0]["playlistId"]
-        mainPlaylist: dict = self.youtube.get_playlist(playlistId=playlistId)
+        if not mainPlaylist:
+            # To find out main youtube playlist, get all playlists & sort playlists by tracks count.
+            allPlaylists: list[dict] = self.getYoutubePlaylists()
+            # Assume that biggest playlist is the main one.
+            self.user.mainYoutubePlaylist = allPlaylists[0]["playlistId"]
+            logger.info(
+                f"Discovered main YouTube playlist: {self.user.mainYoutubePlaylist}"
+            )
+            mainPlaylist = self.youtube.get_playlist(
+                playlistId=self.user.mainYoutubePlaylist, limit=lastN
+            )
 
         # Get `lastN` tracks from this playlist & override spotifyArtistId, since it's youtube-only tracks.
         tracks: list[Track] = [
@@ -127,25 +171,38 @@ class PlaylistGenerator:
 
         return tracks
 
+    def _getYoutubePlaylist(self, playlistId: str, limit: int) -> dict | None:
+        """
+        Fetches first `limit` tracks of the playlist, instead of the whole playlist.
+        Returns `None` if playlist was removed or is empty now.
+        """
+        try:
+            playlist: dict = self.youtube.get_playlist(
+                playlistId=playlistId, limit=limit
+            )
+        except Exception as err:
+            logger.error(f"Failed to fetch YouTube playlist {playlistId}: {err}")
+            return None
+
+        return playlist if playlist.get("tracks") else None
+
     def parseSpotifyTrack(self, rawTrack: dict) -> Track:
         """Docstring for parseSpotifyTracks"""
-        return Track(
-            **rawTrack, image=rawTrack["album"].get("images", []), youtubeArtistId=None
-        )
+        # Raw payload is parsed directly, see `LightTrack`.
+        return LightTrack.fromSpotify(rawTrack).toTrack()
 
     def parseYoutubeTrack(self, rawTrack: dict) -> Track:
         """Docstring for parseYoutubeTracks"""
-        return Track(
-            **rawTrack,
-            image=rawTrack.get("thumbnails", []) or rawTrack.get("thumbnail", []),
-            spotifyArtistId=None,
-        )
+        return LightTrack.fromYoutube(rawTrack).toTrack()
 
+    @traced()
     def getLastSpotifyTracks(self, lastN: int = 10) -> list[Track]:
         """
         Retrieves the last N tracks from the main Spotify playlist.
         """
         logger.info(f"Executing `getLastSpotifyTracks()`, fetching last {lastN} tracks")
+        if Platform.SPOTIFY in self.lastTracks:
+            return self.lastTracks[Platform.SPOTIFY][:lastN]
 
         rawTracks = self.spotify.current_user_saved_tracks(limit=lastN)
 
@@ -157,31 +214,214 @@ class PlaylistGenerator:
 
         return tracks
 
-    def fillSpotifyId(self, tracks: list[Track]):
-        """Fills `.spotifyId` property on each track"""
+    @traced(root=True)
+    @metered
+    def prefetch(
+        self,
+        lastN: int,
+        warmUpTo: int = 0,
+        isCancelled: Callable[[], bool] = lambda: False,
+    ) -> dict[Platform, list[Track]]:
+        """
+        Speculatively fetches last tracks of authorized platforms & resolves them on the other platform.
+        Recommendations of the first `warmUpTo` tracks are requested as well, so they're in `responseCache` by the
+        time the playlist is generated. Work stops between steps once `isCancelled()`.
+        Calls count against user's budget like generation ones, warm-up is skipped once it's spent.
+        """
+        lastTracks: dict[Platform, list[Track]] = {}
+        if self._isNotDummy(self.user.spotifyAuth):
+            lastTracks[Platform.SPOTIFY] = self.getLastSpotifyTracks(lastN=lastN)
+        if self._isNotDummy(self.user.youtubeAuth) and not isCancelled():
+            lastTracks[Platform.YOUTUBE] = self.getLastYoutubeTracks(lastN=lastN)
+
+        spotifyTracks: list[Track] = lastTracks.get(Platform.SPOTIFY, [])
+        youtubeTracks: list[Track] = lastTracks.get(Platform.YOUTUBE, [])
+        if not isCancelled():
+            self.fillYoutubeId(tracks=spotifyTracks)
+        if not isCancelled():
+            self.fillSpotifyId(tracks=youtubeTracks)
+
+        seeds: list[Track] = spotifyTracks[:warmUpTo] + youtubeTracks[:warmUpTo]
+        # Same calls YouTube & Spotify playlists start their recommendations with.
+        if seeds and not isCancelled() and not isOverBudget():
+            self.getSpotifyRecommendations(tracks=seeds, recommendationChunkSize=1)
+        if seeds and not isCancelled() and not isOverBudget():
+            self.getYoutubeRecommendations(seeds)
+
+        return lastTracks
+
+    @traced()
+    def fillSpotifyId(
+        self,
+        tracks: list[Track],
+        concurrency: int = SPOTIFY_SEARCH_CONCURRENCY,
+        isOptional: bool = False,
+    ):
+        """
+        Fills `.spotifyId` property on each track.
+        Up to `concurrency` searches are running at the same time, `concurrency=1` searches one by one.
+        `isOptional` tracks(i.e. recommendations) are not searched once call budget is spent.
+        """
         logger.info(f"Executing `fillSpotifyId()` for {len(tracks)} tracks")
-        for track in tracks:
-            if not (spotifyMatch := self.searchTrackOnSpotify(track)):
+        spotifyMatches: list[TrackMatch | None] = self._resolve(
+            tracks, self._matchOnSpotify, Platform.SPOTIFY, concurrency, isOptional
+        )
+        for track, spotifyMatch in zip(tracks, spotifyMatches):
+            if not spotifyMatch:
                 logger.warning(
                     f"{track.title} / {track.artistName} were not found on Spotify"
                 )
                 continue
 
-            track.spotifyId = spotifyMatch["id"]
-            track.spotifyArtistId = [x.get("id") for x in spotifyMatch["artists"]]
+            track.spotifyId, track.spotifyArtistId = spotifyMatch
 
-    def fillYoutubeId(self, tracks: list[Track]):
-        """Fills `.youtubeId` property on each track"""
+    @traced()
+    def fillYoutubeId(
+        self,
+        tracks: list[Track],
+        concurrency: int = YOUTUBE_SEARCH_CONCURRENCY,
+        isOptional: bool = False,
+    ):
+        """
+        Fills `.youtubeId` property on each track.
+        Up to `concurrency` searches are running at the same time, `concurrency=1` searches one by one.
+        `isOptional` tracks(i.e. recommendations) are not searched once call budget is spent.
+        """
         logger.info(f"Executing `fillYoutubeId()` for {len(tracks)} tracks")
-        for track in tracks:
-            if not (youtubeMatch := self.searchTrackOnYoutube(track)):
+        youtubeMatches: list[TrackMatch | None] = self._resolve(
+            tracks, self._matchOnYoutube, Platform.YOUTUBE, concurrency, isOptional
+        )
+        for track, youtubeMatch in zip(tracks, youtubeMatches):
+            if not youtubeMatch:
                 logger.warning(
                     f"{track.title} / {track.artistName} were not found on Youtube"
                 )
                 continue
 
-            track.youtubeId = youtubeMatch.youtubeId
-            track.youtubeArtistId = youtubeMatch.youtubeArtistId
+            track.youtubeId, track.youtubeArtistId = youtubeMatch
+
+    def _matchOnSpotify(self, track: Track) -> TrackMatch | None:
+        """Searches `track` on Spotify & returns only the ids of the match."""
+        if not (spotifyMatch := self.searchTrackOnSpotify(track)):
+            return None
+
+        return TrackMatch(
+            spotifyMatch["id"], [x.get("id") for x in spotifyMatch["artists"]]
+        )
+
+    def _matchOnYoutube(self, track: Track) -> TrackMatch | None:
+        """Searches `track` on YouTube & returns only the ids of the match."""
+        if not (youtubeMatch := self.searchTrackOnYoutube(track)):
+            return None
+
+        return TrackMatch(youtubeMatch.youtubeId, youtubeMatch.youtubeArtistId)
+
+    def _resolve(
+        self,
+        tracks: list[Track],
+        matchMethod: Callable[[Track], TrackMatch | None],
+        platform: Platform,
+        concurrency: int,
+        isOptional: bool = False,
+    ) -> list[TrackMatch | None]:
+        """
+        Matches each track on the `platform`, results are returned in the same order as `tracks`.
+        Known matches(& known misses) are served from `matchCache`, only the rest is searched.
+        """
+        matches: list[TrackMatch | None] = [None] * len(tracks)
+        pendingIndexes: list[int] = []
+        for index, track in enumerate(tracks):
+            isHit, match = (
+                self.matchCache.lookup(track, platform)
+                if self.matchCache
+                else (False, None)
+            )
+            if isHit:
+                matches[index] = match
+            else:
+                pendingIndexes.append(index)
+
+        if len(pendingIndexes) < len(tracks):
+            logger.info(
+                f"{len(tracks) - len(pendingIndexes)} tracks were matched on {platform.name} from cache"
+            )
+
+        if pendingIndexes and isOptional and isOverBudget():
+            logger.warning(
+                f"Call budget is spent, skipping search of {len(pendingIndexes)} tracks on {platform.name}"
+            )
+            pendingIndexes = []
+
+        searchResults: list = self._searchConcurrently(
+            [tracks[x] for x in pendingIndexes], matchMethod, platform, concurrency
+        )
+        for index, searchResult in zip(pendingIndexes, searchResults):
+            # Failed searches are not cached, so they'll be retried next time.
+            if isinstance(searchResult, Exception):
+                continue
+
+            matches[index] = searchResult
+            if self.matchCache:
+                self.matchCache.store(tracks[index], platform, searchResult)
+
+        return matches
+
+    def _searchConcurrently(
+        self,
+        tracks: list[Track],
+        searchMethod: Callable[[Track], TrackMatch | None],
+        platform: Platform,
+        concurrency: int,
+    ) -> list:
+        """
+        Runs `searchMethod` for each track on a bounded thread pool.
+        On top of the pool, searches wait for a free slot of the `platform`, so concurrent calls stay within its limit.
+        Results are returned in the same order as `tracks`, failed searches are returned as the raised exception.
+        """
+        if len(tracks) <= 1 or concurrency <= 1:
+            return [self._safeSearch(searchMethod, track, platform) for track in tracks]
+
+        # Refresh the token upfront, so workers won't race each other refreshing the shared client.
+        self._warmUpAuth(platform)
+        with ThreadPoolExecutor(
+            max_workers=min(concurrency, len(tracks)),
+            thread_name_prefix=f"search-{platform}",
+        ) as executor:
+            # Each search runs in a copy of the current context, so it's traced within the same generation.
+            futures = [
+                submitInContext(executor, self._safeSearch, searchMethod, x, platform)
+                for x in tracks
+            ]
+            return [x.result() for x in futures]
+
+    def _safeSearch(
+        self,
+        searchMethod: Callable[[Track], TrackMatch | None],
+        track: Track,
+        platform: Platform,
+    ) -> TrackMatch | Exception | None:
+        """Runs a single search, so one failed request won't fail the whole batch."""
+        try:
+            with _searchSlots[platform]:
+                return searchMethod(track)
+        except Exception as err:
+            logger.error(f"{track.title} / {track.artistName} search failed: {err}")
+            return err
+
+    def _warmUpAuth(self, platform: Platform) -> None:
+        """Makes sure that the access token of `platform` client is fresh before it's shared between threads."""
+        try:
+            match platform:
+                case Platform.SPOTIFY:
+                    authManager = self.spotify.auth_manager
+                    authManager.validate_token(
+                        authManager.cache_handler.get_cached_token()
+                    )
+                case Platform.YOUTUBE:
+                    # Reading headers refreshes expiring OAuth token.
+                    _ = self.youtube.headers
+        except Exception as err:
+            logger.warning(f"Failed to refresh {platform.name} token upfront: {err}")
 
     def searchTrackOnSpotify(self, track: Track) -> dict | None:
         """
@@ -233,44 +473,56 @@ class PlaylistGenerator:
             else f"{track.artistName} {track.title}"
         )
 
-        # Fetch results from spotify.
-        searchResults: list[Track] = [
-            self.parseYoutubeTrack(searchResult)
-            for searchResult in self.youtube.search(
-                query=searchQuery, filter="songs", limit=5
-            )[:5]
-        ]
+        # Fetch results from youtube, they're parsed one by one, only until the match is found.
+        rawResults: list[dict] = self.youtube.search(
+            query=searchQuery, filter="songs", limit=5
+        )[:5]
 
-        for searchResult in searchResults:
+        for rawResult in rawResults:
+            searchResult: LightTrack = LightTrack.fromYoutube(rawResult)
             # LastFM is so bad it won't even return durations._.
             if not track.duration:
-                return searchResult
+                return searchResult.toTrack()
 
-            searchResultDuration: int = searchResult.duration
+            searchResultDuration: int = searchResult.duration or 0
             # If its duration is in range ±5sec - should be the same track.
             if searchResultDuration in range(track.duration - 5, track.duration + 5):
-                return searchResult
+                return searchResult.toTrack()
 
+    @traced()
     def getYoutubeRecommendations(
-        self, tracks: list[Track], limit: int = 5
+        self, tracks: list[Track], limit: int = 5, index: TrackIndex | None = None
     ) -> list[Track]:
         """
         Retrieves Youtube recommendations based on a list of input tracks.
+        Tracks already present in `index`(e.g. seeds) are skipped, new ones are added to it.
 
         In result, you'll get this many tracks:
         <...>
         """
+        return list(self.iterYoutubeRecommendations(tracks, limit=limit, index=index))
+
+    def iterYoutubeRecommendations(
+        self, tracks: list[Track], limit: int = 5, index: TrackIndex | None = None
+    ) -> Iterator[Track]:
+        """Lazy version of `getYoutubeRecommendations()`, watch playlist of the next track is fetched on demand."""
         logger.info(
             f"Executing `getYoutubeRecommendations()` with {len(tracks)} tracks"
         )
         youtubeTracksIds: list[str] = [
             track.youtubeId for track in tracks if track.youtubeId
         ]
-        recommendedTracks: list[Track] = []
+        index = index if index is not None else TrackIndex()
 
         # need to do stuff with this method. pass there `videoId` of each track.
         for trackId in youtubeTracksIds:
-            result: dict = self.youtube.get_watch_playlist(videoId=trackId)
+            result: dict = self._cachedCall(
+                "youtube.get_watch_playlist",
+                trackId,
+                lambda trackId=trackId: self.youtube.get_watch_playlist(
+                    videoId=trackId
+                ),
+            )
 
             recommendationsPerTrack: int = 0
             for rawTrack in result.get("tracks", [])[1 : limit + 1]:
@@ -280,14 +532,11 @@ class PlaylistGenerator:
                 # Override spotifyArtistId, since it's youtube-only recommendations.
                 recommendedTrack = self.parseYoutubeTrack(rawTrack=rawTrack)
 
-                if recommendedTrack.youtubeId not in [
-                    x.youtubeId for x in recommendedTracks
-                ]:
-                    recommendedTracks.append(recommendedTrack)
+                if index.add(recommendedTrack):
                     recommendationsPerTrack += 1
+                    yield recommendedTrack
 
-        return recommendedTracks
-
+    @traced()
     def getSpotifyRecommendations(
         self,
         tracks: list[Track],
@@ -300,25 +549,42 @@ class PlaylistGenerator:
         In result, you'll get this many tracks:
         ( len(tracks) / recommendationChunkSize ) * 5
         """
+        return list(
+            self.iterSpotifyRecommendations(
+                tracks, recommendationChunkSize=recommendationChunkSize, limit=limit
+            )
+        )
+
+    def iterSpotifyRecommendations(
+        self,
+        tracks: list[Track],
+        recommendationChunkSize: int = MAX_SPOTIFY_RECOMMENDATION_CHUNK_SIZE,
+        limit: int = 5,
+    ) -> Iterator[Track]:
+        """Lazy version of `getSpotifyRecommendations()`, recommendations for the next chunk are fetched on demand."""
         logger.info(
             f"Executing `getSpotifyRecommendations()` with {len(tracks)} tracks"
         )
         spotifyTracksIds: list[str] = [
             track.spotifyId for track in tracks if track.spotifyId
         ]
-        recommendedTracks: list[Track] = []
 
         # Default max chunk-size is 5 tracks(i.e. you can't ask for recommendation based on more than 5tracks).
         for tracksChunk in chunked(spotifyTracksIds, recommendationChunkSize):
             # Limit result of recommendations also to 5. It helps to reduce junk recommendations from spotify.
-            result = self.spotify.recommendations(seed_tracks=tracksChunk, limit=limit)
+            result: dict = self._cachedCall(
+                "spotify.recommendations",
+                ",".join(tracksChunk),
+                lambda tracksChunk=tracksChunk: self.spotify.recommendations(
+                    seed_tracks=tracksChunk, limit=limit
+                ),
+                # Payload cached for a smaller `limit` cannot serve a bigger one.
+                isSufficient=lambda x: len(x.get("tracks", [])) >= limit,
+            )
 
-            for rawTrack in result.get("tracks", []):
+            for rawTrack in result.get("tracks", [])[:limit]:
                 # Override youtubeArtistId, since it's spotify-only recommendations.
-                recommendedTrack = self.parseSpotifyTrack(rawTrack)
-                recommendedTracks.append(recommendedTrack)
-
-        return recommendedTracks
+                yield self.parseSpotifyTrack(rawTrack)
 
     def getLastFMRecommendationsV2(self, tracks: list[Track]) -> list[Track]:
         """
@@ -331,6 +597,7 @@ class PlaylistGenerator:
         # somehow i think it won't work out well.
         pass
 
+    @traced()
     def getLastFMRecommendations(
         self, tracks: list[Track], sameArtistMargin: int = 1, sameTrackMargin: int = 2
     ) -> list[Track]:
@@ -343,17 +610,41 @@ class PlaylistGenerator:
 
         TODO:  make sure no duplicates are returned.
         """
+        return list(
+            self.iterLastFMRecommendations(
+                tracks,
+                sameArtistMargin=sameArtistMargin,
+                sameTrackMargin=sameTrackMargin,
+            )
+        )
+
+    def iterLastFMRecommendations(
+        self, tracks: list[Track], sameArtistMargin: int = 1, sameTrackMargin: int = 2
+    ) -> Iterator[Track]:
+        """Lazy version of `getLastFMRecommendations()`, similar tracks of the next track are fetched on demand."""
         logger.info(f"Executing `getLastFMRecommendations()` with {len(tracks)} tracks")
-        recommendedTracks: list[Track] = []
 
         for track in tracks:
+            # LastFM recommendations are the least relevant ones, so they're the first to go.
+            if isOverBudget():
+                logger.warning("Call budget is spent, skipping LastFM recommendations")
+                return
+
             url: str = lastFMUrl.format(
                 artist=track.firstArtistName,
                 title=track.title,
                 apiKey=os.environ.get("LASTFM_CLIENT_ID"),
             )
             try:
-                result: dict = requests.get(url, timeout=DEFAULT_TIMEOUT).json()
+                result: dict = self._cachedCall(
+                    "lastfm.track.getsimilar",
+                    f"{track.firstArtistName}|{track.title}".lower(),
+                    lambda url=url: self.lastFMSession.get(
+                        url, timeout=DEFAULT_TIMEOUT
+                    ).json(),
+                    # Errors are not cached, so the track is looked up again next time.
+                    isCacheable=lambda x: "error" not in x,
+                )
                 if "error" in result:
                     logger.error(
                         f"{track.title} / {track.firstArtistName} was failed to find on LastFM: {result}"
@@ -373,14 +664,8 @@ class PlaylistGenerator:
                     break
 
                 sameTrackCounter += 1
-                # Override youtube & spotify artistIds, since it's lastfm-only recommendations.
-                # Also override duration, since lastFM duration is unreliable.
-                recommendedTrack = Track(
-                    **rawTrack,
-                    youtubeArtistId=None,
-                    spotifyArtistId=None,
-                    zeroDuration=True,
-                )
+                # LastFM tracks have no platform ids & zero duration, since lastFM duration is unreliable.
+                recommendedTrack: Track = LightTrack.fromLastFM(rawTrack).toTrack()
 
                 # LastFM recommendations suck, thus we allow:
                 # - Same artist only once.
@@ -389,9 +674,23 @@ class PlaylistGenerator:
                     if sameArtistCounter > sameArtistMargin:
                         continue
 
-                recommendedTracks.append(recommendedTrack)
+                yield recommendedTrack
 
-        return recommendedTracks
+    def _cachedCall(
+        self,
+        endpoint: str,
+        key: str,
+        fetchMethod: Callable[[], dict],
+        isSufficient: Callable[[dict], bool] | None = None,
+        isCacheable: Callable[[dict], bool] | None = None,
+    ) -> dict:
+        """Serves `endpoint` response from `responseCache` if possible, otherwise calls `fetchMethod`."""
+        if not self.responseCache:
+            return fetchMethod()
+
+        return self.responseCache.fetch(
+            endpoint, key, fetchMethod, isSufficient, isCacheable
+        )
 
     def geSoundCloudRecommendations(self, tracks: list[Track]) -> list[Track]:
         """
@@ -399,135 +698,557 @@ class PlaylistGenerator:
         """
         pass
 
+    @traced(root=True)
+    @metered
     def createSpotifyPlaylist(
         self,
         lastN: int = 10,
         shuffle: bool = True,
         includeOriginals: bool = True,
+        targetSize: int | None = None,
     ) -> str:
         """
-        <useful doc-string>
-        """
+        Creates Spotify playlist from last liked tracks on both platforms + YouTube & LastFM recommendations.
+        Independent stages(e.g. Spotify & YouTube seeds) are run concurrently, see `Pipeline`.
 
-        # Get last tracks from YouTube & fulfill them with `.spotifyId`
-        lastSpotifyTracks: list[Track] = self.getLastSpotifyTracks(lastN=lastN)
-        self.fillYoutubeId(tracks=lastSpotifyTracks)
+        With `targetSize`, candidates are pulled lazily & resolution stops once playlist has `targetSize` tracks.
+        """
+        # Every candidate goes through the index before it's resolved, so duplicates don't cost a search.
+        index = TrackIndex()
+
+        pipeline = Pipeline()
+        self._addSeedStages(pipeline, index, lastN, Platform.SPOTIFY)
+        pipeline.addStage("spotifyUserId", lambda _: self.clients.getSpotifyUserId())
+
+        if targetSize is None:
+            # Get youtube recommendations based on all last tracks.
+            pipeline.addStage(
+                "youtubeRecommendations",
+                lambda x: self.getYoutubeRecommendations(
+                    x["spotifySeeds"] + x["youtubeSeeds"], index=index
+                ),
+                dependsOn=("spotifySeedsOnYoutube", "youtubeSeeds"),
+            )
+            # Get lastFM recommendations based on youtube recommendations.
+            pipeline.addStage(
+                "lastFMRecommendations",
+                lambda x: index.filterNew(
+                    self.getLastFMRecommendations(
+                        tracks=x["youtubeRecommendations"]
+                        or x["spotifySeeds"] + x["youtubeSeeds"]
+                    )
+                ),
+                dependsOn=("youtubeRecommendations",),
+            )
+            # Fulfill all recommendations with `.spotifyId`, youtube ones are resolved while LastFM is queried.
+            pipeline.addStage(
+                "youtubeRecommendationsOnSpotify",
+                lambda x: self.fillSpotifyId(
+                    tracks=x["youtubeRecommendations"], isOptional=True
+                ),
+                dependsOn=("youtubeRecommendations",),
+            )
+            pipeline.addStage(
+                "lastFMRecommendationsOnSpotify",
+                lambda x: self.fillSpotifyId(
+                    tracks=x["lastFMRecommendations"], isOptional=True
+                ),
+                dependsOn=("lastFMRecommendations",),
+            )
+        results: dict = pipeline.run()
+        seeds: list[Track] = results["spotifySeeds"] + results["youtubeSeeds"]
 
-        lastYoutubeTracks: list[Track] = []
-        if self._isNotDummy(self.user.youtubeAuth):
-            lastYoutubeTracks = self.getLastYoutubeTracks(lastN=lastN)
-            self.fillSpotifyId(tracks=lastYoutubeTracks)
+        if targetSize is None:
+            recommendedTracks: list[Track] = (
+                results["youtubeRecommendations"] + results["lastFMRecommendations"]
+            )
+            # Prepare a list of spotify tracks. Include original tracks if needed.
+            if includeOriginals:
+                recommendedTracks += seeds
+
+            spotifyTracks: list[str] = [
+                x.spotifyId for x in recommendedTracks if x.spotifyId
+            ]
+            # Remove duplicates.
+            spotifyTracks = list(set(spotifyTracks))
+
+            # Shuffle tracks if needed.
+            if shuffle:
+                random.shuffle(spotifyTracks)
+        else:
+            spotifyTracks: list[str] = self._collectUpTo(
+                targetSize,
+                Platform.SPOTIFY,
+                self._iterCandidates(
+                    Platform.SPOTIFY, seeds, index, shuffle, includeOriginals
+                ),
+            )
 
-        # Get youtube recommendations based on `lastYoutubeTracks`.
-        recommendedTracks: list[Track] = self.getYoutubeRecommendations(
-            lastSpotifyTracks + lastYoutubeTracks
+        # Shuffled tracks can be written in any order, so chunks are written concurrently.
+        return self._publishSpotifyPlaylist(
+            results["spotifyUserId"], spotifyTracks, keepOrder=not shuffle
         )
 
-        # Get lastFM recommendations based on Spotify tracks.
-        recommendedTracks += self.getLastFMRecommendations(
-            tracks=recommendedTracks or lastSpotifyTracks + lastYoutubeTracks
-        )
+    @traced(root=True)
+    @metered
+    def createYoutubePlaylist(
+        self,
+        lastN: int = 10,
+        shuffle: bool = True,
+        includeOriginals: bool = True,
+        standaloneRecommendations: bool = True,
+        targetSize: int | None = None,
+    ) -> str:
+        """
+        Creates YouTube playlist from last liked tracks on both platforms + Spotify & LastFM recommendations.
+        Independent stages(e.g. YouTube & Spotify seeds) are run concurrently, see `Pipeline`.
 
-        # Fulfill all recommendations with `.youtubeId`.
-        self.fillSpotifyId(tracks=recommendedTracks)
+        With `targetSize`, candidates are pulled lazily & resolution stops once playlist has `targetSize` tracks.
+        """
+        # Every candidate goes through the index before it's resolved, so duplicates don't cost a search.
+        index = TrackIndex()
 
-        # Prepare a list of spotify tracks. Include original tracks if needed.
-        if includeOriginals:
-            recommendedTracks += lastSpotifyTracks + lastYoutubeTracks
+        pipeline = Pipeline()
+        self._addSeedStages(pipeline, index, lastN, Platform.YOUTUBE)
 
-        spotifyTracks: list[str] = [
-            f"https://open.spotify.com/track/{x.spotifyId}"
-            for x in recommendedTracks
-            if x.spotifyId
-        ]
-        # Remove duplicates.
-        spotifyTracks = list(set(spotifyTracks))
+        # Get spotify recommendations based on all last tracks.
+        getSpotifyRecommendationsParams: dict = {}
+        if standaloneRecommendations:
+            getSpotifyRecommendationsParams["recommendationChunkSize"] = 1
 
-        # Shuffle tracks if needed.
-        if shuffle:
-            random.shuffle(spotifyTracks)
+        if targetSize is None:
+            pipeline.addStage(
+                "spotifyRecommendations",
+                lambda x: index.filterNew(
+                    self.getSpotifyRecommendations(
+                        tracks=x["youtubeSeeds"] + x["spotifySeeds"],
+                        **getSpotifyRecommendationsParams,
+                    )
+                ),
+                dependsOn=("youtubeSeedsOnSpotify", "spotifySeeds"),
+            )
+            # Get lastFM recommendations based on Spotify recommendations.
+            pipeline.addStage(
+                "lastFMRecommendations",
+                lambda x: index.filterNew(
+                    self.getLastFMRecommendations(
+                        tracks=x["spotifyRecommendations"]
+                        or x["youtubeSeeds"] + x["spotifySeeds"]
+                    )
+                ),
+                dependsOn=("spotifyRecommendations",),
+            )
+            # Fulfill all recommendations with `.youtubeId`, spotify ones are resolved while LastFM is queried.
+            pipeline.addStage(
+                "spotifyRecommendationsOnYoutube",
+                lambda x: self.fillYoutubeId(
+                    tracks=x["spotifyRecommendations"], isOptional=True
+                ),
+                dependsOn=("spotifyRecommendations",),
+            )
+            pipeline.addStage(
+                "lastFMRecommendationsOnYoutube",
+                lambda x: self.fillYoutubeId(
+                    tracks=x["lastFMRecommendations"], isOptional=True
+                ),
+                dependsOn=("lastFMRecommendations",),
+            )
+        results: dict = pipeline.run()
+        seeds: list[Track] = results["youtubeSeeds"] + results["spotifySeeds"]
 
-        # Create playlist with last tracks + recommendations on YouTube.
-        logger.info(f"Creating playlist with {len(spotifyTracks)} tracks")
+        if targetSize is None:
+            recommendedTracks: list[Track] = (
+                results["spotifyRecommendations"] + results["lastFMRecommendations"]
+            )
+            # Include original tracks if needed.
+            if includeOriginals:
+                recommendedTracks += seeds
 
-        # First create a playlist
-        playlistName: str = datetime.now().strftime("%d %b %H:%M")
-        playlist: dict = self.spotify.user_playlist_create(
-            user=self.spotify.current_user()["id"],
-            name=playlistName,
-            description="Created by Playlist Generator Bot, @spotify_youtube_playlist_bot",
-        )
-        # Then fill it with tracks, 100tracks at a time.
-        for tracksChunk in chunked(spotifyTracks, MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE):
-            self.spotify.playlist_add_items(
-                playlist_id=playlist["id"], items=tracksChunk
+            # Prepare a list of youtube track ids.
+            youtubeTracks: list[str] = [
+                x.youtubeId for x in recommendedTracks if x.youtubeId
+            ]
+
+            # Remove duplicates.
+            youtubeTracks = list(set(youtubeTracks))
+
+            # Shuffle tracks if needed.
+            if shuffle:
+                random.shuffle(youtubeTracks)
+        else:
+            youtubeTracks: list[str] = self._collectUpTo(
+                targetSize,
+                Platform.YOUTUBE,
+                self._iterCandidates(
+                    Platform.YOUTUBE,
+                    seeds,
+                    index,
+                    shuffle,
+                    includeOriginals,
+                    **getSpotifyRecommendationsParams,
+                ),
             )
 
-        return f"https://open.spotify.com/playlist/{playlist['id']}"
+        return self._publishYoutubePlaylist(youtubeTracks)
 
-    def createYoutubePlaylist(
+    @traced(root=True)
+    @metered
+    def streamSpotifyPlaylist(
+        self,
+        lastN: int = 10,
+        shuffle: bool = True,
+        includeOriginals: bool = True,
+        targetSize: int | None = None,
+        onCreated: Callable[[str], None] | None = None,
+        onProgress: Callable[[int], None] | None = None,
+    ) -> str:
+        """
+        Progressive version of `createSpotifyPlaylist()`.
+        Playlist is created as soon as seeds are known(`onCreated(url)` is called), then recommendations are appended
+        in batches while they're resolved, `onProgress(tracksCount)` is called after every batch.
+        """
+        index = TrackIndex()
+
+        pipeline = Pipeline()
+        self._addSeedStages(pipeline, index, lastN, Platform.SPOTIFY)
+        pipeline.addStage("spotifyUserId", lambda _: self.clients.getSpotifyUserId())
+        results: dict = pipeline.run()
+        seeds: list[Track] = self._sample(
+            results["spotifySeeds"] + results["youtubeSeeds"], shuffle
+        )
+
+        trackIds: list[str] = []
+        if includeOriginals:
+            trackIds = list(dict.fromkeys(x.spotifyId for x in seeds if x.spotifyId))
+        trackIds = trackIds[:targetSize]
+
+        playlistId: str = self._createSpotifyPlaylist(
+            results["spotifyUserId"], trackIds
+        )
+        playlistUrl: str = f"https://open.spotify.com/playlist/{playlistId}"
+        if onCreated:
+            onCreated(playlistUrl)
+
+        self._appendProgressively(
+            Platform.SPOTIFY,
+            lambda x: self._addToSpotifyPlaylist(playlistId, x),
+            self._iterCandidates(Platform.SPOTIFY, seeds, index, shuffle, False),
+            trackIds,
+            targetSize,
+            onProgress,
+        )
+
+        return playlistUrl
+
+    @traced(root=True)
+    @metered
+    def streamYoutubePlaylist(
         self,
         lastN: int = 10,
         shuffle: bool = True,
         includeOriginals: bool = True,
         standaloneRecommendations: bool = True,
+        targetSize: int | None = None,
+        onCreated: Callable[[str], None] | None = None,
+        onProgress: Callable[[int], None] | None = None,
     ) -> str:
         """
-        <useful doc-string>
+        Progressive version of `createYoutubePlaylist()`.
+        Playlist is created as soon as seeds are known(`onCreated(url)` is called), then recommendations are appended
+        in batches while they're resolved, `onProgress(tracksCount)` is called after every batch.
         """
-        # Get last tracks from YouTube & fulfill them with `.spotifyId`
-        lastYoutubeTracks: list[Track] = self.getLastYoutubeTracks(lastN=lastN)
-        self.fillSpotifyId(tracks=lastYoutubeTracks)
+        index = TrackIndex()
 
-        lastSpotifyTracks: list[Track] = []
-        if self._isNotDummy(self.user.spotifyAuth):
-            lastSpotifyTracks = self.getLastSpotifyTracks(lastN=lastN)
-            self.fillYoutubeId(tracks=lastSpotifyTracks)
-
-        # Get spotify recommendations based on `lastYoutubeTracks`.
-        recommendedTracks = []
-        # if self.user.spotifyAuth:
-        getSpotifyRecommendationsParams: dict = {
-            "tracks": lastYoutubeTracks + lastSpotifyTracks
-        }
+        pipeline = Pipeline()
+        self._addSeedStages(pipeline, index, lastN, Platform.YOUTUBE)
+        results: dict = pipeline.run()
+        seeds: list[Track] = self._sample(
+            results["youtubeSeeds"] + results["spotifySeeds"], shuffle
+        )
+
+        trackIds: list[str] = []
+        if includeOriginals:
+            trackIds = list(dict.fromkeys(x.youtubeId for x in seeds if x.youtubeId))
+        trackIds = trackIds[:targetSize]
+
+        playlistId: str = self._createYoutubePlaylist(trackIds)
+        playlistUrl: str = f"https://music.youtube.com/playlist?list={playlistId}"
+        if onCreated:
+            onCreated(playlistUrl)
+
+        recommendationParams: dict = {}
         if standaloneRecommendations:
-            getSpotifyRecommendationsParams["recommendationChunkSize"] = 1
-        recommendedTracks: list[Track] = self.getSpotifyRecommendations(
-            **getSpotifyRecommendationsParams
+            recommendationParams["recommendationChunkSize"] = 1
+        self._appendProgressively(
+            Platform.YOUTUBE,
+            lambda x: self._addToYoutubePlaylist(playlistId, x),
+            self._iterCandidates(
+                Platform.YOUTUBE, seeds, index, shuffle, False, **recommendationParams
+            ),
+            trackIds,
+            targetSize,
+            onProgress,
         )
 
-        # Get lastFM recommendations based on Spotify tracks.
-        recommendedTracks += self.getLastFMRecommendations(
-            tracks=recommendedTracks or lastYoutubeTracks + lastSpotifyTracks
+        return playlistUrl
+
+    def _appendProgressively(
+        self,
+        platform: Platform,
+        addMethod: Callable[[list[str]], None],
+        candidates: Iterator[Track],
+        trackIds: list[str],
+        targetSize: int | None,
+        onProgress: Callable[[int], None] | None,
+    ) -> None:
+        """
+        Resolves candidates & appends them via `addMethod` every `PROGRESSIVE_BATCH_SIZE` tracks.
+        `trackIds` are ids already in the playlist, it's extended in place.
+        """
+        if targetSize is not None and len(trackIds) >= targetSize:
+            return
+
+        pending: list[str] = []
+
+        def flush() -> None:
+            addMethod(pending)
+            trackIds.extend(pending)
+            pending.clear()
+            if onProgress:
+                onProgress(len(trackIds))
+
+        for resolvedIds in self._iterResolved(platform, candidates, set(trackIds)):
+            pending.extend(resolvedIds)
+            if targetSize is not None and len(trackIds) + len(pending) >= targetSize:
+                del pending[targetSize - len(trackIds) :]
+                break
+            if len(pending) >= PROGRESSIVE_BATCH_SIZE:
+                flush()
+
+        if pending:
+            flush()
+
+    def _addSeedStages(
+        self, pipeline: Pipeline, index: TrackIndex, lastN: int, platform: Platform
+    ) -> None:
+        """
+        Adds stages that fetch last tracks from both platforms & resolve them on the other platform.
+        Tracks of the `platform` playlist is created on are always fetched, other platform - only if it's authorized.
+        Tracks liked on both platforms are dropped, the `platform` ones are kept.
+        """
+        includeSpotify: bool = platform == Platform.SPOTIFY or self._isNotDummy(
+            self.user.spotifyAuth
         )
-        # Fulfill all recommendations with `.youtubeId`.
-        self.fillYoutubeId(tracks=recommendedTracks)
-        # Include original tracks if needed.
-        if includeOriginals:
-            recommendedTracks += lastSpotifyTracks + lastYoutubeTracks
+        includeYoutube: bool = platform == Platform.YOUTUBE or self._isNotDummy(
+            self.user.youtubeAuth
+        )
+
+        pipeline.addStage(
+            "rawSpotifySeeds",
+            lambda _: self.getLastSpotifyTracks(lastN=lastN) if includeSpotify else [],
+        )
+        pipeline.addStage(
+            "rawYoutubeSeeds",
+            lambda _: self.getLastYoutubeTracks(lastN=lastN) if includeYoutube else [],
+        )
+        # `{seedStage: rawSeedStage}`, seeds of the `platform` go first, so they're kept on duplicates.
+        seedStages: dict[str, str] = {
+            "spotifySeeds": "rawSpotifySeeds",
+            "youtubeSeeds": "rawYoutubeSeeds",
+        }
+        primary, secondary = list(seedStages)[
+            :: 1 if platform == Platform.SPOTIFY else -1
+        ]
+        pipeline.addStage(
+            primary,
+            lambda x: index.filterNew(x[seedStages[primary]]),
+            dependsOn=("rawSpotifySeeds", "rawYoutubeSeeds"),
+        )
+        pipeline.addStage(
+            secondary,
+            lambda x: index.filterNew(x[seedStages[secondary]]),
+            dependsOn=(primary,),
+        )
+
+        # Fulfill spotify seeds with `.youtubeId` & youtube seeds with `.spotifyId`.
+        pipeline.addStage(
+            "spotifySeedsOnYoutube",
+            lambda x: self.fillYoutubeId(tracks=x["spotifySeeds"]),
+            dependsOn=("spotifySeeds",),
+        )
+        pipeline.addStage(
+            "youtubeSeedsOnSpotify",
+            lambda x: self.fillSpotifyId(tracks=x["youtubeSeeds"]),
+            dependsOn=("youtubeSeeds",),
+        )
+
+    def _collectUpTo(
+        self, targetSize: int, platform: Platform, candidates: Iterator[Track]
+    ) -> list[str]:
+        """Resolves candidates on the `platform` until there are `targetSize` unique ids."""
+        trackIds: list[str] = []
+        for resolvedIds in self._iterResolved(platform, candidates):
+            trackIds += resolvedIds
+            if len(trackIds) >= targetSize:
+                logger.info(f"Collected {targetSize} tracks, stopping resolution")
+                return trackIds[:targetSize]
+
+        return trackIds
 
-        # Prepare a list of youtube track ids.
-        youtubeTracks: list[str] = [
-            x.youtubeId for x in recommendedTracks if x.youtubeId
+    def _iterResolved(
+        self,
+        platform: Platform,
+        candidates: Iterator[Track],
+        seen: set[str] | None = None,
+    ) -> Iterator[list[str]]:
+        """
+        Pulls candidates in batches, resolves them on the `platform` & yields ids that weren't `seen` yet.
+        Batch size equals to search concurrency, so each batch is a single round of parallel searches.
+        """
+        idKey, fillMethod, batchSize = {
+            Platform.SPOTIFY: (
+                "spotifyId",
+                self.fillSpotifyId,
+                SPOTIFY_SEARCH_CONCURRENCY,
+            ),
+            Platform.YOUTUBE: (
+                "youtubeId",
+                self.fillYoutubeId,
+                YOUTUBE_SEARCH_CONCURRENCY,
+            ),
+        }[platform]
+        seen = seen if seen is not None else set()
+
+        for batch in chunked(candidates, max(batchSize, 1)):
+            if unresolved := [x for x in batch if not getattr(x, idKey)]:
+                fillMethod(tracks=unresolved, isOptional=True)
+
+            resolvedIds: list[str] = []
+            for track in batch:
+                if (trackId := getattr(track, idKey)) and trackId not in seen:
+                    seen.add(trackId)
+                    resolvedIds.append(trackId)
+
+            yield resolvedIds
+
+    def _iterCandidates(
+        self,
+        platform: Platform,
+        seeds: list[Track],
+        index: TrackIndex,
+        shuffle: bool,
+        includeOriginals: bool,
+        **recommendationParams,
+    ) -> Iterator[Track]:
+        """
+        Lazy stream of playlist candidates: seeds(if `includeOriginals`), other platform & LastFM recommendations.
+        Recommendations are fetched only when the stream gets to them.
+        """
+        # Other platform recommendations need its ids of the seeds, LastFM ones - just names.
+        if platform == Platform.SPOTIFY:
+            platformRecommendations: Iterator[Track] = self.iterYoutubeRecommendations(
+                self._sample(seeds, shuffle), index=index
+            )
+        else:
+            platformRecommendations: Iterator[Track] = self._iterNew(
+                self.iterSpotifyRecommendations(
+                    self._sample(seeds, shuffle), **recommendationParams
+                ),
+                index,
+            )
+        sources: list[Iterator[Track]] = [
+            platformRecommendations,
+            self._iterNew(
+                self.iterLastFMRecommendations(self._sample(seeds, shuffle)), index
+            ),
         ]
+        if includeOriginals:
+            sources.insert(0, iter(self._sample(seeds, shuffle)))
+
+        return self._interleave(sources, shuffle)
+
+    @staticmethod
+    def _sample(tracks: list[Track], shuffle: bool) -> list[Track]:
+        """Returns `tracks` in random order if `shuffle`, as is otherwise."""
+        return random.sample(tracks, len(tracks)) if shuffle else list(tracks)
+
+    @staticmethod
+    def _interleave(sources: list[Iterator[Track]], shuffle: bool) -> Iterator[Track]:
+        """
+        Merges candidate sources lazily.
+        With `shuffle` next candidate is taken from a random source, otherwise sources are exhausted one by one.
+        """
+        sources = list(sources)
+        while sources:
+            source: Iterator[Track] = random.choice(sources) if shuffle else sources[0]
+            try:
+                yield next(source)
+            except StopIteration:
+                sources.remove(source)
+
+    @staticmethod
+    def _iterNew(tracks: Iterator[Track], index: TrackIndex) -> Iterator[Track]:
+        """Lazily drops tracks that are already in the `index`."""
+        return (x for x in tracks if index.add(x))
+
+    def _publishSpotifyPlaylist(
+        self, spotifyUserId: str, spotifyTracks: list[str], keepOrder: bool = True
+    ) -> str:
+        """Creates Spotify playlist with `spotifyTracks` ids & returns its url."""
+        # Create playlist with last tracks + recommendations on Spotify.
+        logger.info(f"Creating playlist with {len(spotifyTracks)} tracks")
+        playlistId: str = self._createSpotifyPlaylist(
+            spotifyUserId, spotifyTracks, keepOrder=keepOrder
+        )
+
+        return f"https://open.spotify.com/playlist/{playlistId}"
 
-        # Remove duplicates.
-        youtubeTracks = list(set(youtubeTracks))
+    @traced("createSpotifyPlaylist")
+    def _createSpotifyPlaylist(
+        self, spotifyUserId: str, spotifyTracks: list[str], keepOrder: bool = True
+    ) -> str:
+        """Creates Spotify playlist, fills it with `spotifyTracks` & returns its id."""
+        # First create a playlist
+        playlistName: str = datetime.now().strftime("%d %b %H:%M")
+        playlist: dict = self.spotify.user_playlist_create(
+            user=spotifyUserId,
+            name=playlistName,
+            description="Created by Playlist Generator Bot, @spotify_youtube_playlist_bot",
+        )
+        # Then fill it with tracks.
+        PlaylistWriter(spotify=self.spotify).addToSpotify(
+            playlist["id"], spotifyTracks, keepOrder=keepOrder
+        )
+
+        return playlist["id"]
 
-        # Shuffle tracks if needed.
-        if shuffle:
-            random.shuffle(youtubeTracks)
+    @traced("addToSpotifyPlaylist")
+    def _addToSpotifyPlaylist(self, playlistId: str, spotifyTracks: list[str]) -> None:
+        """Appends `spotifyTracks` ids to the end of the playlist."""
+        PlaylistWriter(spotify=self.spotify).addToSpotify(playlistId, spotifyTracks)
 
+    def _publishYoutubePlaylist(self, youtubeTracks: list[str]) -> str:
+        """Creates YouTube playlist with `youtubeTracks` ids & returns its url."""
         # Create playlist with last tracks + recommendations on YouTube.
         logger.info(f"Creating playlist with {len(youtubeTracks)} tracks")
+        playlistId: str = self._createYoutubePlaylist(youtubeTracks)
+
+        return f"https://music.youtube.com/playlist?list={playlistId}"
+
+    @traced("createYoutubePlaylist")
+    def _createYoutubePlaylist(self, youtubeTracks: list[str]) -> str:
+        """Creates YouTube playlist with `youtubeTracks` & returns its id."""
         playlistName: str = datetime.now().strftime("%d %b %H:%M")
-        playlistId: str = self.youtube.create_playlist(
-            video_ids=youtubeTracks,
+        return PlaylistWriter(youtube=self.youtube).createOnYoutube(
             title=playlistName,
             description="Created by Playlist Generator Bot, @spotify_youtube_playlist_bot",
+            videoIds=youtubeTracks,
         )
 
-        return f"https://music.youtube.com/playlist?list={playlistId}"
+    @traced("addToYoutubePlaylist")
+    def _addToYoutubePlaylist(self, playlistId: str, youtubeTracks: list[str]) -> None:
+        """Appends `youtubeTracks` ids to the end of the playlist."""
+        PlaylistWriter(youtube=self.youtube).addToYoutube(playlistId, youtubeTracks)
 
     def _isNotDummy(self, auth: Auth | None) -> bool:
         """
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
 # Stdlib
+import asyncio
+import functools
 import os
+import threading
 import time
 import traceback
+from typing import Awaitable, Callable, Coroutine
 
 # External
 import requests
@@ -25,6 +29,14 @@ try:
         SEPARATOR,
         EXTRA_SETTINGS,
         AUTH,
+        DEFAULT_TIMEOUT,
+        PROGRESSIVE_PUBLISHING,
+        JOB_QUEUE,
+        JOB_LEASE_TTL,
+        GENERATION_LEASE_TTL,
+        PREFETCH,
+        PREFETCH_LAST_N,
+        PREFETCH_WAIT,
     )
 except ModuleNotFoundError:
     from model import User, Platform, Track
@@ -36,14 +48,38 @@ except ModuleNotFoundError:
         SEPARATOR,
         EXTRA_SETTINGS,
         AUTH,
+        DEFAULT_TIMEOUT,
+        PROGRESSIVE_PUBLISHING,
+        JOB_QUEUE,
+        JOB_LEASE_TTL,
+        GENERATION_LEASE_TTL,
+        PREFETCH,
+        PREFETCH_LAST_N,
+        PREFETCH_WAIT,
     )
 
+import asyncdb
 import database
+from clients import UserClients, getClientPool
 from generator import PlaylistGenerator
+from jobs import Job
+from lease import GenerationLease
+from prefetch import getPrefetcher
+from sessions import OAUTH, getSession
+from tokens import TokenManager
+from tracing import metrics
 
 
 bot = telegram.Bot(token=os.environ["BOT_TOKEN"])
 
+# Refreshed tokens are written back, so next generations(incl. other processes) start with them too.
+tokenManager = TokenManager(persist=database.updateUser)
+# Background tasks are referenced, so they're not garbage collected before they're done.
+_backgroundTasks: set[asyncio.Task] = set()
+
+# Kind of the queued generation job, see `runGenerationJob()`.
+GENERATION_JOB: str = "generation"
+
 
 async def startCommand(update: Update, _: CallbackContext) -> None:
     startMessage = (
@@ -51,7 +87,7 @@ async def startCommand(update: Update, _: CallbackContext) -> None:
         "Please note: generation works MUCH better if you authorize both.\n"
     )
     await update.effective_message.reply_text(startMessage)
-    user: User = database.getUser(update.effective_chat)
+    user: User = await asyncdb.getUser(update.effective_chat)
 
     spotifyButton = InlineKeyboardButton(
         **Platform.SPOTIFY.getAuthButtonParams(user, update)
@@ -82,7 +118,7 @@ async def handleAuthCommand(
         platform = Platform(update.effective_message.text.split("_")[1])
 
     # Fetch the user from db.
-    user: User = database.getUser(update.effective_chat)
+    user: User = await asyncdb.getUser(update.effective_chat)
 
     # Prepare button metadata.
     authUrl: str = platform.getAuthUrlMethod()(update, user)
@@ -99,7 +135,12 @@ async def handleAuthCommand(
 
 async def handleGeneratePlaylistCommand(update: Update, _: CallbackContext) -> None:
     """Docstring for handleGeneratePlaylistCommand()"""
-    user: User = database.getUser(update.effective_chat)
+    user: User = await asyncdb.getUser(update.effective_chat)
+    # User is about to generate: tokens are refreshed & last tracks are fetched while they're choosing options.
+    if PREFETCH:
+        _startPrefetch(user, warmUpTo=0)
+    else:
+        _runInBackground(asyncio.to_thread(tokenManager.ensureFresh, user))
 
     buttons = [
         [Platform.SPOTIFY.getGeneratePlaylistButton(user)],
@@ -184,36 +225,206 @@ async def generatePlaylist(
     update: Update, context: CallbackContext, platform: Platform | None = None
 ) -> str | None:
     """Handles playlist generation(and publishing) for both Spotify and YouTube"""
-    user: User = database.getUser(update.effective_chat)
-
-    # Early exit in case if:
-    # 1. Generation is already in progress
-    if user.inProgress:
-        await update.effective_message.reply_text("Generating, please wait...")
-        return "ok"
+    user: User = await asyncdb.getUser(update.effective_chat)
 
-    # 2. User requested generate & publish to unauthorized platform
-    elif not getattr(user, platform.authKey):
+    # Early exit in case if user requested generate & publish to unauthorized platform.
+    if not getattr(user, platform.authKey):
         errorMessage: str = f"You have to authorize {platform.name} to publish generated playlists there!"
         await update.effective_message.reply_text(errorMessage)
         return await handleAuthCommand(update, context, platform)
 
-    playlistGenerator = PlaylistGenerator(user=user)
-    lastN: int = _getLastN(update.effective_message.reply_markup.inline_keyboard)
-
-    database.storeUserInProgress(user)
-    await update.effective_message.reply_text("Generating, please wait...")
-    await update.effective_message.reply_chat_action(action=ChatAction.TYPING)
+    # Only one generation per user at a time, even across several server instances.
+    lease: GenerationLease = asyncdb.newLease(
+        user.userId, ttl=JOB_LEASE_TTL if JOB_QUEUE else GENERATION_LEASE_TTL
+    )
+    if not await asyncdb.acquireLease(lease):
+        await update.effective_message.reply_text("Generating, please wait...")
+        return "ok"
 
     try:
-        playlistUrl = await platform.createPlaylist(playlistGenerator, lastN)
-        await update.effective_message.reply_text(
-            f"Done! Link to playlist: {playlistUrl}"
+        lastN: int = _getLastN(update.effective_message.reply_markup.inline_keyboard)
+        await asyncdb.storeUserMessage(user)
+        progressMessage = await update.effective_message.reply_text(
+            "Generating, please wait..."
         )
-        database.finishUserInProgress(user)
+        await update.effective_message.reply_chat_action(action=ChatAction.TYPING)
+
+        # Worker takes the lease over, so the webhook is answered right away.
+        if JOB_QUEUE:
+            payload: dict = {
+                "userId": user.userId,
+                "userName": user.userName,
+                "platform": platform.value,
+                "lastN": lastN,
+                "messageId": progressMessage.message_id,
+                "leaseOwner": lease.owner,
+            }
+            await asyncdb.enqueueJob(GENERATION_JOB, payload)
+            return "ok"
     except Exception:
-        traceback.print_exc()
-        database.finishUserInProgress(user)
+        # Otherwise user can't generate until the lease expires.
+        await asyncdb.releaseLease(lease)
+        raise
+
+    async with lease.held():
+        try:
+            await _generate(
+                context.bot, user, platform, lastN, progressMessage.message_id
+            )
+        except Exception:
+            traceback.print_exc()
+            await update.effective_message.reply_text(
+                "Failed to generate playlist, please try again in a minute."
+            )
+
+
+async def _generate(
+    bot: telegram.Bot, user: User, platform: Platform, lastN: int, messageId: int
+) -> str:
+    """Generates & publishes playlist, progress is shown in the message `messageId`."""
+    clients: UserClients = await asyncio.to_thread(_getClients, user)
+    # Seeds prefetched while the user was in the menu, see `_startPrefetch()`.
+    lastTracks: dict | None = (
+        await asyncio.to_thread(getPrefetcher().take, user.userId, PREFETCH_WAIT)
+        if PREFETCH
+        else None
+    )
+    playlistGenerator = PlaylistGenerator(
+        user=user, clients=clients, lastTracks=lastTracks
+    )
+    mainYoutubePlaylist: str | None = user.mainYoutubePlaylist
+
+    if PROGRESSIVE_PUBLISHING:
+
+        async def editText(text: str) -> None:
+            await bot.edit_message_text(text, chat_id=user.userId, message_id=messageId)
+
+        playlistUrl = await platform.streamPlaylist(
+            playlistGenerator, lastN, **_getProgressCallbacks(editText)
+        )
+    else:
+        playlistUrl = await platform.createPlaylist(playlistGenerator, lastN)
+    await bot.send_message(
+        chat_id=user.userId, text=f"Done! Link to playlist: {playlistUrl}"
+    )
+
+    await asyncdb.storeMainYoutubePlaylist(user, mainYoutubePlaylist)
+
+    return playlistUrl
+
+
+def runGenerationJob(job: Job) -> str:
+    """Runs queued generation on the worker's own event loop & with its own bot, results are sent to the user."""
+    return asyncio.run(_runGenerationJob(job))
+
+
+async def _runGenerationJob(job: Job) -> str:
+    payload: dict = job.payload
+    lease: GenerationLease = asyncdb.newLease(
+        payload["userId"], owner=payload["leaseOwner"]
+    )
+    # Lease might have expired while the job was queued & another generation could be running already.
+    if not await asyncdb.acquireLease(lease):
+        try:
+            async with telegram.Bot(token=os.environ["BOT_TOKEN"]) as jobBot:
+                await jobBot.edit_message_text(
+                    "Another playlist is being generated right now, please try again later.",
+                    chat_id=payload["userId"],
+                    message_id=payload["messageId"],
+                )
+        except telegram.error.TelegramError:
+            # Skipped job isn't retried because of the message.
+            traceback.print_exc()
+        return "skipped"
+
+    chat = telegram.Chat(
+        id=int(payload["userId"]), type="private", username=payload["userName"]
+    )
+    user: User = await asyncdb.getUser(chat)
+    async with telegram.Bot(token=os.environ["BOT_TOKEN"]) as jobBot, lease.held():
+        try:
+            return await _generate(
+                jobBot,
+                user,
+                Platform(payload["platform"]),
+                payload["lastN"],
+                payload["messageId"],
+            )
+        except Exception:
+            # Retried attempt reports its own result.
+            if job.attempts >= job.maxAttempts:
+                await jobBot.send_message(
+                    chat_id=user.userId,
+                    text="Failed to generate playlist, please try again in a minute.",
+                )
+            raise
+
+
+def _getClients(user: User) -> UserClients:
+    """Pooled clients of the `user`, built with tokens that won't expire during the generation."""
+    tokenManager.ensureFresh(user)
+    return getClientPool().get(user)
+
+
+def _startPrefetch(user: User, warmUpTo: int) -> None:
+    """
+    Speculatively prefetches last tracks of the `user` & warms recommendations of the first `warmUpTo` of them up.
+    Prefetch of the same user with another `warmUpTo`(e.g. user picked another `lastN`) replaces the running one.
+    """
+    if not user.spotifyAuth and not user.youtubeAuth:
+        return
+
+    getPrefetcher().start(
+        user.userId, warmUpTo, functools.partial(_prefetch, user, warmUpTo)
+    )
+
+
+def _prefetch(
+    user: User, warmUpTo: int, cancelled: threading.Event
+) -> dict[Platform, list[Track]]:
+    mainYoutubePlaylist: str | None = user.mainYoutubePlaylist
+    playlistGenerator = PlaylistGenerator(user=user, clients=_getClients(user))
+    lastTracks: dict[Platform, list[Track]] = playlistGenerator.prefetch(
+        PREFETCH_LAST_N, warmUpTo=warmUpTo, isCancelled=cancelled.is_set
+    )
+    database.storeMainYoutubePlaylist(user, mainYoutubePlaylist)
+
+    return lastTracks
+
+
+def _runInBackground(coroutine: Coroutine) -> None:
+    task: asyncio.Task = asyncio.create_task(coroutine)
+    _backgroundTasks.add(task)
+    task.add_done_callback(_backgroundTasks.discard)
+
+
+def _getProgressCallbacks(editText: Callable[[str], Awaitable]) -> dict:
+    """
+    Builds `onCreated` & `onProgress` callbacks that show generation progress with `editText`.
+    Callbacks are called from the generation thread, so edits are scheduled on the bot's event loop.
+    """
+    loop = asyncio.get_running_loop()
+    state: dict = {"url": None}
+
+    def editMessage(text: str) -> None:
+        future = asyncio.run_coroutine_threadsafe(editText(text), loop)
+        try:
+            # Wait for the edit, so progress messages don't overtake each other.
+            future.result(timeout=DEFAULT_TIMEOUT)
+        except Exception:
+            traceback.print_exc()
+
+    def onCreated(url: str) -> None:
+        state["url"] = url
+        editMessage(f"Playlist is ready, adding recommendations: {url}")
+
+    def onProgress(tracksCount: int) -> None:
+        editMessage(
+            f"Playlist is ready, adding recommendations: {state['url']}\n"
+            f"Tracks added: {tracksCount}"
+        )
+
+    return {"onCreated": onCreated, "onProgress": onProgress}
 
 
 async def handleLastNChoice(update: Update, _: CallbackContext) -> None:
@@ -251,6 +462,11 @@ async def handleLastNChoice(update: Update, _: CallbackContext) -> None:
                 button.text.replace(SELECTOR, ""), callback_data=button.callback_data
             )
 
+    # Recommendations of the newly selected tracks are warmed up, while user is choosing the platform.
+    if PREFETCH and not alreadySelected:
+        user: User = await asyncdb.getUser(update.effective_chat)
+        _startPrefetch(user, warmUpTo=int(selectedNumber))
+
     # Get track names & store them below `lastN` row.
     # user: User = database.getUser(update.effective_chat)
     # trackButtons: list = getTrackButtons(lastN=10, user=user)
@@ -275,11 +491,17 @@ def getTrackButtons(lastN: int, user: User) -> list:
         return []
 
     tracks: list[Track] = []
-    playlistGenerator = PlaylistGenerator(user=user)
+    playlistGenerator = PlaylistGenerator(
+        user=user,
+        clients=_getClients(user),
+        lastTracks=getPrefetcher().peek(user.userId),
+    )
     if user.spotifyAuth:
         tracks += playlistGenerator.getLastSpotifyTracks(lastN=lastN)
     if user.youtubeAuth:
+        mainYoutubePlaylist: str | None = user.mainYoutubePlaylist
         tracks += playlistGenerator.getLastYoutubeTracks(lastN=lastN)
+        database.storeMainYoutubePlaylist(user, mainYoutubePlaylist)
 
     import json
 
@@ -317,6 +539,9 @@ async def handleGETRequest(request) -> str:
 
     # Serve HTML web-page, if it's not a redirect from Spotify / YouTube.
     if "state" not in allParams and "code" not in allParams:
+        # Latency histograms & counters in Prometheus text format.
+        if "metrics" in allParams:
+            return metrics.render()
         if "privacyPolicy" in allParams:
             return open("privacyPolicy.html").read()
 
@@ -332,9 +557,13 @@ async def handleGETRequest(request) -> str:
     if platform == Platform.SPOTIFY:
         from spotipy.oauth2 import SpotifyOAuth
 
-        creds = SpotifyOAuth().get_access_token(code=allParams["code"])
+        # Token exchange is blocking, so it's run off the loop.
+        creds = await asyncio.to_thread(
+            SpotifyOAuth(requests_session=getSession(OAUTH)).get_access_token,
+            code=allParams["code"],
+        )
 
-        database.database.child(allParams["state"]).update({platform.value: creds})
+        await asyncdb.storeAuth(allParams["state"], platform.value, creds)
         await bot.sendMessage(
             chat_id=allParams["state"], text=platform.successfulAuthText
         )
@@ -353,12 +582,14 @@ async def handleGETRequest(request) -> str:
     }
 
     # Make the POST request to exchange the authorization code for tokens
-    response: request.Response = requests.post(token_url, data=token_payload)
+    response: requests.Response = await asyncio.to_thread(
+        getSession(OAUTH).post, token_url, data=token_payload, timeout=DEFAULT_TIMEOUT
+    )
     creds: dict = response.json()
 
     userId: str = allParams["state"].split("_")[0]
     creds["expires_at"] = int(time.time()) + creds["expires_in"]
-    database.database.child(userId).update({platform: creds})
+    await asyncdb.storeAuth(userId, platform.value, creds)
     await bot.sendMessage(chat_id=userId, text=platform.successfulAuthText)
     return platform.successfulAuthText
 
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Callable, NamedTuple
+
+try:
+    from playlist.core.cache import SqliteCache
+    from playlist.core.tracing import metrics
+    from playlist.constants import (
+        JOBS_PATH,
+        JOB_MAX_ATTEMPTS,
+        JOB_RETRY_DELAY,
+        JOB_TIMEOUT,
+        JOB_POLL_INTERVAL,
+    )
+except ModuleNotFoundError:
+    from cache import SqliteCache
+    from tracing import metrics
+    from constants import (
+        JOBS_PATH,
+        JOB_MAX_ATTEMPTS,
+        JOB_RETRY_DELAY,
+        JOB_TIMEOUT,
+        JOB_POLL_INTERVAL,
+    )
+
+
+logger: logging.Logger = logging.getLogger()
+
+# Job statuses.
+QUEUED: str = "queued"
+RUNNING: str = "running"
+DONE: str = "done"
+FAILED: str = "failed"
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    payload: dict
+    status: str
+    attempts: int
+    maxAttempts: int
+    result: str | None
+    error: str | None
+    createdAt: float
+    startedAt: float | None
+    finishedAt: float | None
+
+    @property
+    def waited(self) -> float | None:
+        """Seconds job spent in the queue before its last attempt started."""
+        return self.startedAt - self.createdAt if self.startedAt else None
+
+    @property
+    def took(self) -> float | None:
+        """Seconds the last attempt took."""
+        if self.startedAt and self.finishedAt:
+            return self.finishedAt - self.startedAt
+        return None
+
+
+class JobQueue(SqliteCache):
+    """
+    Persistent queue of background jobs, shared by all processes using the same file.
+    Failed jobs are retried with a delay up to `maxAttempts` times, jobs which worker died
+    (i.e. running for longer than `timeout`) are picked up again.
+    """
+
+    schema: str = (
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+        "status TEXT NOT NULL, attempts INTEGER NOT NULL, maxAttempts INTEGER NOT NULL, "
+        "result TEXT, error TEXT, createdAt REAL NOT NULL, startedAt REAL, finishedAt REAL, "
+        "availableAt REAL NOT NULL);"
+        "CREATE INDEX IF NOT EXISTS jobsByStatus ON jobs (status, availableAt);"
+    )
+    columns: str = "id, kind, payload, status, attempts, maxAttempts, result, error, createdAt, startedAt, finishedAt"
+
+    def __init__(
+        self,
+        path: str = JOBS_PATH,
+        retryDelay: float = JOB_RETRY_DELAY,
+        timeout: float = JOB_TIMEOUT,
+    ) -> None:
+        super().__init__(path)
+        self.retryDelay = retryDelay
+        self.timeout = timeout
+
+    def enqueue(
+        self, kind: str, payload: dict, maxAttempts: int = JOB_MAX_ATTEMPTS
+    ) -> int:
+        """Adds a job & returns its id."""
+        now: float = time.time()
+        return self._transaction(
+            lambda connection: connection.execute(
+                "INSERT INTO jobs (kind, payload, status, attempts, maxAttempts, createdAt, availableAt) "
+                "VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (kind, json.dumps(payload), QUEUED, maxAttempts, now, now),
+            ).lastrowid
+        )
+
+    def claim(self) -> Job | None:
+        """Marks the oldest available job as running & returns it, `None` if there are no jobs."""
+
+        def claim(connection: sqlite3.Connection) -> Job | None:
+            now: float = time.time()
+            rows = connection.execute(
+                f"SELECT {self.columns} FROM jobs "
+                "WHERE (status = ? AND availableAt <= ?) OR (status = ? AND startedAt < ?) "
+                "ORDER BY availableAt LIMIT 1",
+                (QUEUED, now, RUNNING, now - self.timeout),
+            ).fetchall()
+            if not rows:
+                return None
+
+            job: Job = self._toJob(rows[0])
+            connection.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, startedAt = ?, finishedAt = NULL "
+                "WHERE id = ?",
+                (RUNNING, now, job.id),
+            )
+            return job._replace(
+                status=RUNNING, attempts=job.attempts + 1, startedAt=now
+            )
+
+        return self._transaction(claim)
+
+    def finish(self, jobId: int, result: str | None = None) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, finishedAt = ? WHERE id = ?",
+            (DONE, result, time.time(), jobId),
+        )
+
+    def fail(self, jobId: int, error: str) -> bool:
+        """Records failed attempt, returns `True` if the job will be retried."""
+
+        def fail(connection: sqlite3.Connection) -> bool:
+            now: float = time.time()
+            attempts, maxAttempts = connection.execute(
+                "SELECT attempts, maxAttempts FROM jobs WHERE id = ?", (jobId,)
+            ).fetchone()
+            isRetried: bool = attempts < maxAttempts
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finishedAt = ?, availableAt = ? WHERE id = ?",
+                (
+                    QUEUED if isRetried else FAILED,
+                    error,
+                    now,
+                    now + self.retryDelay * attempts,
+                    jobId,
+                ),
+            )
+            return isRetried
+
+        return self._transaction(fail)
+
+    def get(self, jobId: int) -> Job | None:
+        rows = self._execute(f"SELECT {self.columns} FROM jobs WHERE id = ?", (jobId,))
+        return self._toJob(rows[0]) if rows else None
+
+    def counts(self) -> dict[str, int]:
+        """Amount of jobs per status."""
+        return dict(self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    @staticmethod
+    def _toJob(row: tuple) -> Job:
+        return Job(row[0], row[1], json.loads(row[2]), *row[3:])
+
+
+class WorkerPool:
+    """
+    Threads that run jobs of the `queue` with `handlers[job.kind](job)`.
+    Several pools(e.g. in separate worker processes) can serve the same queue.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handlers: dict[str, Callable[[Job], str | None]],
+        workers: int,
+        pollInterval: float = JOB_POLL_INTERVAL,
+    ) -> None:
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.pollInterval = pollInterval
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> WorkerPool:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} job workers")
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stops taking new jobs & waits for the running ones."""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def join(self) -> None:
+        """Blocks until the pool is stopped, e.g. in a dedicated worker process."""
+        for thread in self._threads:
+            thread.join()
+
+    def runOnce(self) -> Job | None:
+        """Runs next job, if there is one, & returns it as it was claimed."""
+        if not (job := self.queue.claim()):
+            return None
+
+        startedAt: float = time.perf_counter()
+        try:
+            result: str | None = self.handlers[job.kind](job)
+        except Exception as err:
+            isRetried: bool = self.queue.fail(job.id, f"{type(err).__name__}: {err}")
+            status: str = QUEUED if isRetried else FAILED
+            logger.error(
+                f"Job {job.id}({job.kind}) attempt {job.attempts}/{job.maxAttempts} failed"
+                f"{', retrying' if isRetried else ''}: {traceback.format_exc()}"
+            )
+        else:
+            self.queue.finish(job.id, result)
+            status = DONE
+
+        took: float = time.perf_counter() - startedAt
+        logger.info(
+            f"Job {job.id}({job.kind}) {status} in {took:.2f}s, waited {job.waited:.2f}s"
+        )
+        metrics.observe("playlist_job_seconds", took, kind=job.kind, status=status)
+        metrics.observe("playlist_job_wait_seconds", job.waited, kind=job.kind)
+
+        return job
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self.runOnce():
+                    continue
+            except Exception:
+                # E.g. queue file is locked for too long, next poll might succeed.
+                traceback.print_exc()
+            self._stopped.wait(self.pollInterval)
+
+
+_jobQueue: JobQueue | None = None
+_jobQueueLock = threading.Lock()
+
+
+def getJobQueue() -> JobQueue:
+    """Returns process-wide `JobQueue`."""
+    global _jobQueue
+
+    with _jobQueueLock:
+        if _jobQueue is None:
+            _jobQueue = JobQueue()
+
+    return _jobQueue
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Callable
+
+try:
+    from playlist.constants import GENERATION_LEASE_TTL, GENERATION_LEASE_HEARTBEAT
+except ModuleNotFoundError:
+    from constants import GENERATION_LEASE_TTL, GENERATION_LEASE_HEARTBEAT
+
+
+logger: logging.Logger = logging.getLogger()
+
+# Atomically replaces stored lease of the key with `update(currentLease)` & returns the stored result,
+# e.g. Firebase transaction or compare-and-set on the local store.
+Transact = Callable[[str, Callable[[dict | None], dict | None]], dict | None]
+
+
+def newOwner() -> str:
+    """Unique id of the lease owner, host & pid make it readable in the database."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquireUpdate(
+    current: dict | None, owner: str, ttl: float, now: float
+) -> dict | None:
+    """Takes the lease if it's free or expired, otherwise keeps the current one."""
+    if current and current.get("owner") != owner and current.get("expiresAt", 0) > now:
+        return current
+
+    return {"owner": owner, "expiresAt": now + ttl}
+
+
+def renewUpdate(
+    current: dict | None, owner: str, ttl: float, now: float
+) -> dict | None:
+    """Extends the lease only if it's still held by the `owner`."""
+    if not current or current.get("owner") != owner:
+        return current
+
+    return {"owner": owner, "expiresAt": now + ttl}
+
+
+def releaseUpdate(current: dict | None, owner: str) -> dict | None:
+    """Drops the lease only if it's still held by the `owner`."""
+    if current and current.get("owner") == owner:
+        return None
+
+    return current
+
+
+class GenerationLease:
+    """
+    Exclusive right of a single process to generate a playlist for the user.
+    Lease expires after `ttl` seconds unless it's renewed by the heartbeat, so leases of crashed processes
+    are reclaimed right after they expire, while long generations keep theirs.
+    Heartbeat & release of the async API run on the `executor`, the loop's default one if it's not given.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        transact: Transact,
+        ttl: float = GENERATION_LEASE_TTL,
+        heartbeat: float = GENERATION_LEASE_HEARTBEAT,
+        owner: str | None = None,
+        executor: Executor | None = None,
+    ) -> None:
+        self.key = key
+        self.transact = transact
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.owner: str = owner or newOwner()
+        self.executor = executor
+        self.isHeld: bool = False
+
+    def acquire(self) -> bool:
+        """Returns `True` if the lease was taken(or already held) by this owner."""
+        lease: dict | None = self.transact(
+            self.key, lambda x: acquireUpdate(x, self.owner, self.ttl, time.time())
+        )
+        self.isHeld = bool(lease and lease["owner"] == self.owner)
+        return self.isHeld
+
+    def renew(self) -> bool:
+        """Extends the lease, returns `False` if it was lost(i.e. expired & taken by someone else)."""
+        lease: dict | None = self.transact(
+            self.key, lambda x: renewUpdate(x, self.owner, self.ttl, time.time())
+        )
+        self.isHeld = bool(lease and lease["owner"] == self.owner)
+        return self.isHeld
+
+    def release(self) -> None:
+        self.transact(self.key, lambda x: releaseUpdate(x, self.owner))
+        self.isHeld = False
+
+    async def keepAlive(self) -> None:
+        """Renews the lease every `heartbeat` seconds until cancelled or lost."""
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                if not await self._runBlocking(self.renew):
+                    logger.warning(f"Generation lease of {self.key} was lost")
+                    return
+            except Exception as err:
+                # Lease is still valid until it expires, so next heartbeat might succeed.
+                logger.error(f"Failed to renew generation lease of {self.key}: {err}")
+
+    @contextlib.asynccontextmanager
+    async def held(self) -> AsyncIterator[GenerationLease]:
+        """Keeps acquired lease alive within the block & releases it afterwards."""
+        heartbeat = asyncio.create_task(self.keepAlive())
+        try:
+            yield self
+        finally:
+            heartbeat.cancel()
+            await self._runBlocking(self.release)
+
+    async def _runBlocking(self, method: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, method)
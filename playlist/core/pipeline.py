@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, NamedTuple
+
+try:
+    from playlist.core.tracing import span, submitInContext
+    from playlist.constants import PIPELINE_MAX_WORKERS
+except ModuleNotFoundError:
+    from tracing import span, submitInContext
+    from constants import PIPELINE_MAX_WORKERS
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class Stage(NamedTuple):
+    """Single step of the `Pipeline`, `method` receives results of all finished stages."""
+
+    name: str
+    method: Callable[[dict[str, Any]], Any]
+    dependsOn: tuple[str, ...] = ()
+
+
+class Pipeline:
+    """
+    Small DAG of stages.
+    Each stage starts as soon as all of its dependencies are done, so independent branches run concurrently
+    and total time is close to the slowest(critical) path instead of the sum of all stages.
+    """
+
+    def __init__(self, maxWorkers: int = PIPELINE_MAX_WORKERS) -> None:
+        self.maxWorkers = maxWorkers
+        self.stages: dict[str, Stage] = {}
+        # Seconds each stage took, filled by `run()`.
+        self.timings: dict[str, float] = {}
+
+    def addStage(
+        self,
+        name: str,
+        method: Callable[[dict[str, Any]], Any],
+        dependsOn: tuple[str, ...] = (),
+    ) -> Pipeline:
+        """Registers a stage, dependencies have to be registered before the stage itself."""
+        if name in self.stages:
+            raise ValueError(f"Stage `{name}` is already registered")
+        if missing := [x for x in dependsOn if x not in self.stages]:
+            raise ValueError(f"Stage `{name}` depends on unknown stages: {missing}")
+
+        self.stages[name] = Stage(name, method, tuple(dependsOn))
+        return self
+
+    def run(self) -> dict[str, Any]:
+        """
+        Runs all stages & returns `{stageName: result}`.
+        First failed stage stops scheduling of new stages & its exception is re-raised.
+        """
+        results: dict[str, Any] = {}
+        pending: dict[str, Stage] = dict(self.stages)
+        running: dict[Future, str] = {}
+        startedAt: float = time.perf_counter()
+
+        with ThreadPoolExecutor(
+            max_workers=self.maxWorkers, thread_name_prefix="stage"
+        ) as executor:
+            while pending or running:
+                # Submit every stage which dependencies are done.
+                for stage in [
+                    x
+                    for x in pending.values()
+                    if all(y in results for y in x.dependsOn)
+                ]:
+                    del pending[stage.name]
+                    # Pass a snapshot, since `results` is updated here while the stage is running.
+                    future = submitInContext(
+                        executor, self._runStage, stage, dict(results)
+                    )
+                    running[future] = stage.name
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stageName: str = running.pop(future)
+                    if error := future.exception():
+                        for x in running:
+                            x.cancel()
+                        raise error
+
+                    results[stageName] = future.result()
+
+        logger.info(
+            f"Pipeline finished in {time.perf_counter() - startedAt:.2f}s, stages: "
+            + ", ".join(f"{name}={took:.2f}s" for name, took in self.timings.items())
+        )
+        return results
+
+    def _runStage(self, stage: Stage, results: dict[str, Any]) -> Any:
+        """Runs the stage & records its timing."""
+        startedAt: float = time.perf_counter()
+        try:
+            with span(f"stage.{stage.name}"):
+                return stage.method(results)
+        finally:
+            self.timings[stage.name] = time.perf_counter() - startedAt
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable
+
+try:
+    from playlist.core.tracing import metrics, submitInContext
+    from playlist.constants import (
+        PREFETCH_MAX_WORKERS,
+        PREFETCH_MAX_USERS,
+        PREFETCH_TTL,
+    )
+except ModuleNotFoundError:
+    from tracing import metrics, submitInContext
+    from constants import PREFETCH_MAX_WORKERS, PREFETCH_MAX_USERS, PREFETCH_TTL
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class Prefetch:
+    """Speculative work started for a user, `key` describes what's prefetched(e.g. selected `lastN`)."""
+
+    def __init__(self, key: Any, future: Future, cancelled: threading.Event) -> None:
+        self.key = key
+        self.future = future
+        self.cancelled = cancelled
+        self.startedAt: float = time.monotonic()
+
+    def cancel(self) -> None:
+        """Drops queued work, running one stops at its next check of `cancelled`."""
+        self.cancelled.set()
+        self.future.cancel()
+
+
+class Prefetcher:
+    """
+    Runs speculative work(e.g. fetching seeds while the user is still in the menu) on a bounded pool.
+    There is at most one prefetch per user: starting a new one cancels the previous, results live for `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        maxWorkers: int = PREFETCH_MAX_WORKERS,
+        maxUsers: int = PREFETCH_MAX_USERS,
+        ttl: float = PREFETCH_TTL,
+    ) -> None:
+        self.maxUsers = maxUsers
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(
+            max_workers=maxWorkers, thread_name_prefix="prefetch"
+        )
+        self._prefetches: OrderedDict[str, Prefetch] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(
+        self, userId: str, key: Any, work: Callable[[threading.Event], Any]
+    ) -> None:
+        """Runs `work(cancelled)` for the user, unless prefetch with the same `key` is already running or done."""
+        with self._lock:
+            self._evict()
+            current: Prefetch | None = self._prefetches.pop(userId, None)
+            if current and current.key == key and not current.cancelled.is_set():
+                self._prefetches[userId] = current
+                return
+            if current:
+                current.cancel()
+
+            cancelled = threading.Event()
+            future: Future = submitInContext(self._executor, work, cancelled)
+            self._prefetches[userId] = Prefetch(key, future, cancelled)
+            while len(self._prefetches) > self.maxUsers:
+                self._prefetches.popitem(last=False)[1].cancel()
+
+    def cancel(self, userId: str) -> None:
+        with self._lock:
+            if prefetch := self._prefetches.pop(userId, None):
+                prefetch.cancel()
+
+    def peek(self, userId: str) -> Any | None:
+        """Returns result of the finished prefetch, keeping it for the next caller."""
+        with self._lock:
+            prefetch: Prefetch | None = self._prefetches.get(userId)
+        if not prefetch or not prefetch.future.done():
+            return None
+
+        return self._result(prefetch, timeout=0)
+
+    def take(self, userId: str, timeout: float = 0) -> Any | None:
+        """
+        Pops prefetched result of the user, running prefetch is awaited up to `timeout` seconds.
+        `None` means there's nothing usable: no prefetch, it failed, was cancelled, expired or is still running.
+        """
+        with self._lock:
+            self._evict()
+            prefetch: Prefetch | None = self._prefetches.pop(userId, None)
+        if not prefetch:
+            metrics.increment("playlist_prefetch_total", result="miss")
+            return None
+
+        result: Any | None = self._result(prefetch, timeout)
+        metrics.increment(
+            "playlist_prefetch_total", result="hit" if result is not None else "miss"
+        )
+        if result is None:
+            prefetch.cancel()
+        return result
+
+    def _result(self, prefetch: Prefetch, timeout: float) -> Any | None:
+        if prefetch.cancelled.is_set():
+            return None
+        try:
+            result: Any = prefetch.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as err:
+            logger.error(f"Prefetch failed: {err}")
+            return None
+
+        return None if prefetch.cancelled.is_set() else result
+
+    def _evict(self) -> None:
+        """Drops expired prefetches, oldest are at the beginning."""
+        now: float = time.monotonic()
+        while self._prefetches:
+            userId, prefetch = next(iter(self._prefetches.items()))
+            if now - prefetch.startedAt <= self.ttl:
+                break
+            del self._prefetches[userId]
+            prefetch.cancel()
+
+
+_prefetcher: Prefetcher | None = None
+_prefetcherLock = threading.Lock()
+
+
+def getPrefetcher() -> Prefetcher:
+    """Returns process-wide `Prefetcher`."""
+    global _prefetcher
+
+    with _prefetcherLock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher()
+
+    return _prefetcher
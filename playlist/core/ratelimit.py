@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+try:
+    from playlist.constants import RATE_LIMITS, DEFAULT_RETRY_AFTER
+except ModuleNotFoundError:
+    from constants import RATE_LIMITS, DEFAULT_RETRY_AFTER
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, up to `capacity` tokens for bursts.
+    `pause()` stops the whole bucket, so all callers wait for the provider's `Retry-After` together.
+    """
+
+    def __init__(self, name: str, rate: float, capacity: int) -> None:
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens: float = capacity
+        self._updatedAt: float = time.monotonic()
+        self._pausedUntil: float = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for it if needed. Returns seconds spent waiting."""
+        startedAt: float = time.monotonic()
+        with self._condition:
+            while True:
+                now: float = time.monotonic()
+                self._refill(now)
+                if now < self._pausedUntil:
+                    waitFor: float = self._pausedUntil - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - startedAt
+                else:
+                    waitFor = (1 - self._tokens) / self.rate
+
+                # Lock is released while waiting, so `pause()` is not blocked.
+                self._condition.wait(waitFor)
+
+    def pause(self, seconds: float) -> None:
+        """Stops issuing tokens for `seconds`, e.g. after provider responded with 429."""
+        with self._condition:
+            pausedUntil: float = time.monotonic() + seconds
+            if pausedUntil > self._pausedUntil:
+                logger.warning(
+                    f"Rate limited by {self.name}, pausing for {seconds:.1f}s"
+                )
+                self._pausedUntil = pausedUntil
+            self._tokens = 0
+            self._condition.notify_all()
+
+    def resize(self, rate: float, capacity: int) -> None:
+        """Changes rate & burst size, tokens above the new `capacity` are dropped."""
+        with self._condition:
+            self._refill(time.monotonic())
+            self.rate = rate
+            self.capacity = capacity
+            self._tokens = min(self._tokens, capacity)
+            self._condition.notify_all()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updatedAt) * self.rate
+        )
+        self._updatedAt = now
+
+
+def parseRetryAfter(value: str | None, default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Parses `Retry-After` header, which is either amount of seconds or HTTP date."""
+    if not value:
+        return default
+
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    try:
+        retryAt: datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+
+    return max((retryAt - datetime.now(timezone.utc)).total_seconds(), 0)
+
+
+_buckets: dict[str, TokenBucket] = {}
+_bucketsLock = threading.Lock()
+# Share of every provider's quota this process may use, see `setShare()`.
+_share: float = 1
+
+
+def getBucket(name: str) -> TokenBucket | None:
+    """Returns process-wide bucket of the provider `name`, `None` if it's not rate limited(see `RATE_LIMITS`)."""
+    if name not in RATE_LIMITS:
+        return None
+
+    with _bucketsLock:
+        if name not in _buckets:
+            rate, capacity = RATE_LIMITS[name]
+            _buckets[name] = TokenBucket(
+                name, rate * _share, max(int(capacity * _share), 1)
+            )
+
+        return _buckets[name]
+
+
+def setShare(share: float) -> None:
+    """
+    Limits this process to `share` of every provider's quota, e.g. `1 / N` in each of N processes using the same
+    credentials: buckets are process-wide, while providers limit the app as a whole. Existing buckets are scaled too.
+    """
+    global _share
+
+    with _bucketsLock:
+        _share = share
+        for name, bucket in _buckets.items():
+            rate, capacity = RATE_LIMITS[name]
+            bucket.resize(rate * share, max(int(capacity * share), 1))
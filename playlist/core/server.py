@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import traceback
+from http import HTTPStatus
+from typing import Awaitable, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+from aiohttp import web
+
+try:
+    from playlist.constants import SERVER_MAX_BODY_SIZE, SERVER_KEEP_ALIVE
+except ModuleNotFoundError:
+    from constants import SERVER_MAX_BODY_SIZE, SERVER_KEEP_ALIVE
+
+
+logger: logging.Logger = logging.getLogger()
+
+Handler = Callable[["Request"], Awaitable[str]]
+
+
+class Request:
+    """Read request, exposes the same attributes the handlers read from cherrypy's & flask's requests."""
+
+    def __init__(
+        self, method: str, target: str, headers: dict[str, str], body: bytes
+    ) -> None:
+        self.method = method
+        self.path: str = urlsplit(target).path
+        # Blank values are kept, routes are picked by bare keys, e.g. `/?metrics`.
+        self.args: dict[str, str] = dict(
+            parse_qsl(urlsplit(target).query, keep_blank_values=True)
+        )
+        self.headers = headers
+        self.body = io.BytesIO(body)
+
+    def get_json(self, silent: bool = False) -> dict | None:
+        try:
+            return json.loads(self.body.getvalue())
+        except ValueError:
+            if silent:
+                return None
+            raise
+
+
+class Server:
+    """
+    aiohttp server: every request is served by its own task on the running loop,
+    so slow requests(e.g. playlist generation) don't hold the others.
+    HTTP parsing(incl. malformed & oversized requests) is left to aiohttp.
+    Same as the cherrypy entry point, every `GET` & `POST` is passed to `handler` & errors are answered with "ok",
+    so Telegram doesn't re-deliver updates that failed.
+    """
+
+    def __init__(self, handler: Handler) -> None:
+        self.handler = handler
+        self.app = web.Application(client_max_size=SERVER_MAX_BODY_SIZE)
+        self.app.router.add_route("*", "/{path:.*}", self.respond)
+
+    async def start(self, host: str, port: int) -> web.AppRunner:
+        """Starts serving in the background, returned runner has to be cleaned up."""
+        runner = web.AppRunner(self.app, keepalive_timeout=SERVER_KEEP_ALIVE)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Serving on {runner.addresses}")
+        return runner
+
+    async def serve(self, host: str, port: int) -> None:
+        runner: web.AppRunner = await self.start(host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def respond(self, request: web.Request) -> web.Response:
+        if request.method not in ("GET", "POST"):
+            return web.Response(
+                status=HTTPStatus.METHOD_NOT_ALLOWED, text="not allowed"
+            )
+        # Raises `HTTPRequestEntityTooLarge` over `SERVER_MAX_BODY_SIZE`, which is answered with 413.
+        body: bytes = await request.read()
+        try:
+            text: str = (
+                await self.handler(
+                    Request(
+                        request.method,
+                        request.path_qs,
+                        {k.lower(): v for k, v in request.headers.items()},
+                        body,
+                    )
+                )
+                or ""
+            )
+        except Exception:
+            print(traceback.format_exc())
+            text = "ok"
+
+        contentType: str = (
+            "text/html" if text.lstrip().startswith("<") else "text/plain"
+        )
+        return web.Response(text=text, content_type=contentType)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import re
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+try:
+    from playlist.core.budget import recordCall
+    from playlist.core.ratelimit import TokenBucket, getBucket, parseRetryAfter
+    from playlist.core.tracing import metrics, span
+    from playlist.constants import (
+        HTTP_POOL_CONNECTIONS,
+        HTTP_POOL_MAXSIZE,
+        HTTP_MAX_RETRIES,
+    )
+except ModuleNotFoundError:
+    from budget import recordCall
+    from ratelimit import TokenBucket, getBucket, parseRetryAfter
+    from tracing import metrics, span
+    from constants import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES
+
+
+# Session names, on top of `Platform` values.
+LASTFM: str = "lastfm"
+OAUTH: str = "oauth"
+
+_sessions: dict[str, requests.Session] = {}
+_sessionsLock = threading.Lock()
+
+
+class TracedAdapter(HTTPAdapter):
+    """Adapter that records every request as a `provider` span & counts responses per status."""
+
+    def __init__(self, provider: str = "", **kwargs) -> None:
+        self.provider = provider
+        super().__init__(**kwargs)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: float | tuple | None = None,
+        verify: bool | str = True,
+        cert: str | tuple | None = None,
+        proxies: dict | None = None,
+    ) -> requests.Response:
+        endpoint: str = getEndpoint(request.url)
+        recordCall(self.provider, endpoint)
+        with span("provider", provider=self.provider, endpoint=endpoint):
+            response: requests.Response = super().send(
+                request, stream, timeout, verify, cert, proxies
+            )
+
+        metrics.increment(
+            "playlist_provider_responses_total",
+            provider=self.provider,
+            endpoint=endpoint,
+            status=str(response.status_code),
+        )
+        return response
+
+
+def getEndpoint(url: str) -> str:
+    """
+    Low-cardinality name of the called endpoint: path with ids replaced by `:id`.
+    LastFM has a single path, so its `method` parameter is used instead.
+    """
+    parts = urlsplit(url)
+    if method := parse_qs(parts.query).get("method"):
+        return method[0]
+
+    # User ids are arbitrary strings, other ids are long & contain digits(unlike `v1` and such).
+    return re.sub(
+        r"(/users)/[^/]+|/(?=[\w-]*\d)[\w-]{10,}",
+        lambda x: f"{x.group(1) or ''}/:id",
+        parts.path,
+    )
+
+
+class RateLimitedAdapter(TracedAdapter):
+    """
+    Adapter that takes a token from the `bucket` before every request.
+    429 responses pause the whole bucket for `Retry-After` & the request is retried once the bucket is resumed.
+    """
+
+    def __init__(
+        self, bucket: TokenBucket, maxRetries: int = HTTP_MAX_RETRIES, **kwargs
+    ) -> None:
+        self.bucket = bucket
+        self.maxRetries = maxRetries
+        super().__init__(**kwargs)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: float | tuple | None = None,
+        verify: bool | str = True,
+        cert: str | tuple | None = None,
+        proxies: dict | None = None,
+    ) -> requests.Response:
+        for attempt in range(self.maxRetries + 1):
+            self.bucket.acquire()
+            response: requests.Response = super().send(
+                request, stream, timeout, verify, cert, proxies
+            )
+            if response.status_code != 429 or attempt == self.maxRetries:
+                return response
+
+            self.bucket.pause(parseRetryAfter(response.headers.get("Retry-After")))
+            response.close()
+
+
+def buildSession(
+    poolConnections: int = HTTP_POOL_CONNECTIONS,
+    poolMaxSize: int = HTTP_POOL_MAXSIZE,
+    maxRetries: int = HTTP_MAX_RETRIES,
+    bucket: TokenBucket | None = None,
+    name: str = "",
+) -> requests.Session:
+    """
+    Builds keep-alive session with a connection pool.
+    `poolMaxSize` is a per-host limit: once it's reached, requests wait for a free connection instead of opening new ones.
+    With `bucket`, requests are rate limited & 429s are handled by the bucket instead of urllib3.
+    """
+    # Unsent requests are retried on connection errors, 5xx responses only for idempotent methods:
+    # every ytmusicapi call is a POST, retrying writes could duplicate playlists & tracks.
+    # Write retries are left to `PlaylistWriter`.
+    retry = urllib3.Retry(
+        total=maxRetries,
+        connect=None,
+        read=False,
+        allowed_methods=urllib3.Retry.DEFAULT_ALLOWED_METHODS,
+        status=maxRetries,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504) if bucket else (429, 500, 502, 503, 504),
+    )
+    adapterParams: dict = {
+        "pool_connections": poolConnections,
+        "pool_maxsize": poolMaxSize,
+        "pool_block": True,
+        "max_retries": retry,
+        "provider": name,
+    }
+    adapter = (
+        RateLimitedAdapter(bucket, maxRetries, **adapterParams)
+        if bucket
+        else TracedAdapter(**adapterParams)
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+    )
+
+    return session
+
+
+def getSession(name: str) -> requests.Session:
+    """
+    Returns process-wide session for `name`(i.e. `Platform.SPOTIFY`, `Platform.YOUTUBE`, `LASTFM` or `OAUTH`).
+    Sessions are shared between generations, so TCP+TLS connections are reused, same for rate limits.
+    """
+    with _sessionsLock:
+        if name not in _sessions:
+            _sessions[name] = buildSession(bucket=getBucket(name), name=name)
+
+        return _sessions[name]
+
+
+def closeSessions() -> None:
+    """Closes all pooled connections."""
+    with _sessionsLock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
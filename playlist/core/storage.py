@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator
+
+try:
+    from playlist.core.cache import SqliteCache
+    from playlist.constants import (
+        DB_NAME,
+        DB_URL,
+        DEFAULT_PATH,
+        STORAGE_BACKEND,
+        STORAGE_PATH,
+    )
+except ModuleNotFoundError:
+    from cache import SqliteCache
+    from constants import DB_NAME, DB_URL, DEFAULT_PATH, STORAGE_BACKEND, STORAGE_PATH
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+class Storage(ABC):
+    """
+    Interface of the user storage.
+    User is stored as a raw dict: profile, auth blobs of every platform(under platform keys) & so on.
+    Generation lease is stored separately, since it's changed atomically.
+    """
+
+    @abstractmethod
+    def getUser(self, userId: str) -> dict | None:
+        """Returns raw user, `None` if there's no such user."""
+
+    @abstractmethod
+    def setUser(self, userId: str, data: dict) -> None:
+        """Replaces the whole user."""
+
+    @abstractmethod
+    def updateUser(self, userId: str, values: dict) -> None:
+        """Updates given top-level fields of the user, the rest are kept."""
+
+    @abstractmethod
+    def iterUsers(self) -> Iterator[tuple[str, dict]]:
+        """Yields `(userId, data)` of every user, e.g. for batch generation."""
+
+    @abstractmethod
+    def transactLease(
+        self, userId: str, update: Callable[[dict | None], dict | None]
+    ) -> dict | None:
+        """Atomically replaces generation lease of the user with `update(currentLease)` & returns the result."""
+
+
+class FirebaseStorage(Storage):
+    """Firebase Realtime Database, credentials are read from `_firebase.json`."""
+
+    def __init__(
+        self,
+        url: str = os.environ.get("DB", DB_URL),
+        credentialsPath: str = f"{DEFAULT_PATH}/_firebase.json",
+    ) -> None:
+        import firebase_admin
+        from firebase_admin import credentials, db
+
+        firebase_admin.initialize_app(
+            credentials.Certificate(credentialsPath), {"databaseURL": url}
+        )
+        self.reference = db.reference(DB_NAME)
+
+    def getUser(self, userId: str) -> dict | None:
+        return self.reference.child(userId).get()
+
+    def setUser(self, userId: str, data: dict) -> None:
+        self.reference.child(userId).set(data)
+
+    def updateUser(self, userId: str, values: dict) -> None:
+        self.reference.child(userId).update(values)
+
+    def iterUsers(self, pageSize: int = 500) -> Iterator[tuple[str, dict]]:
+        # Users are read in pages ordered by key, so the whole tree isn't downloaded in a single response.
+        lastKey: str | None = None
+        while True:
+            query = self.reference.order_by_key()
+            if lastKey is not None:
+                query = query.start_at(lastKey)
+            page: dict = query.limit_to_first(pageSize + 1).get() or {}
+            for userId, data in page.items():
+                if userId != lastKey:
+                    yield userId, data
+            if len(page) <= pageSize:
+                return
+            lastKey = list(page)[-1]
+
+    def transactLease(
+        self, userId: str, update: Callable[[dict | None], dict | None]
+    ) -> dict | None:
+        # Firebase re-runs `update` with the fresh value if the lease was changed concurrently.
+        return self.reference.child(userId).child("lease").transaction(update)
+
+
+class SqliteStorage(SqliteCache, Storage):
+    """
+    Local storage for single-node deployments & load tests without network access.
+    Read-modify-write operations run in `BEGIN IMMEDIATE` transactions, so they're atomic across processes too.
+    """
+
+    schema: str = (
+        "CREATE TABLE IF NOT EXISTS users (userId TEXT PRIMARY KEY, data TEXT NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS leases (userId TEXT PRIMARY KEY, lease TEXT NOT NULL);"
+    )
+
+    def getUser(self, userId: str) -> dict | None:
+        rows = self._execute("SELECT data FROM users WHERE userId = ?", (userId,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def setUser(self, userId: str, data: dict) -> None:
+        self._execute(
+            "INSERT OR REPLACE INTO users VALUES (?, ?)", (userId, json.dumps(data))
+        )
+
+    def updateUser(self, userId: str, values: dict) -> None:
+        def update(connection: sqlite3.Connection) -> None:
+            rows = connection.execute(
+                "SELECT data FROM users WHERE userId = ?", (userId,)
+            ).fetchall()
+            data: dict = json.loads(rows[0][0]) if rows else {}
+            data.update(values)
+            connection.execute(
+                "INSERT OR REPLACE INTO users VALUES (?, ?)",
+                (userId, json.dumps(data)),
+            )
+
+        self._transaction(update)
+
+    def iterUsers(self) -> Iterator[tuple[str, dict]]:
+        for userId, data in self._execute(
+            "SELECT userId, data FROM users ORDER BY userId"
+        ):
+            yield userId, json.loads(data)
+
+    def transactLease(
+        self, userId: str, update: Callable[[dict | None], dict | None]
+    ) -> dict | None:
+        def transact(connection: sqlite3.Connection) -> dict | None:
+            rows = connection.execute(
+                "SELECT lease FROM leases WHERE userId = ?", (userId,)
+            ).fetchall()
+            lease: dict | None = update(json.loads(rows[0][0]) if rows else None)
+            if lease is None:
+                connection.execute("DELETE FROM leases WHERE userId = ?", (userId,))
+            else:
+                connection.execute(
+                    "INSERT OR REPLACE INTO leases VALUES (?, ?)",
+                    (userId, json.dumps(lease)),
+                )
+            return lease
+
+        return self._transaction(transact)
+
+
+_storage: Storage | None = None
+_storageLock = threading.Lock()
+
+
+def getStorage() -> Storage:
+    """Returns process-wide storage of the `STORAGE_BACKEND` type."""
+    global _storage
+
+    with _storageLock:
+        if _storage is None:
+            match STORAGE_BACKEND:
+                case "firebase":
+                    _storage = FirebaseStorage()
+                case "sqlite":
+                    _storage = SqliteStorage(STORAGE_PATH)
+                case _:
+                    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+            logger.info(f"Using {STORAGE_BACKEND} storage")
+
+    return _storage
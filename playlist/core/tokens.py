@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from spotipy import MemoryCacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+from ytmusicapi.auth.oauth import OAuthCredentials
+
+try:
+    from playlist.core.sessions import OAUTH, getSession
+    from playlist.model.User import Auth, User
+    from playlist.model.Platform import Platform
+    from playlist.constants import SPOTIFY_SCOPES, TOKEN_REFRESH_MARGIN
+except ModuleNotFoundError:
+    from sessions import OAUTH, getSession
+    from model import Auth, User, Platform
+    from constants import SPOTIFY_SCOPES, TOKEN_REFRESH_MARGIN
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+def refreshSpotifyToken(auth: dict) -> dict:
+    """
+    Exchanges refresh token for a new access token, spotipy sets `expires_at` itself.
+    Token is kept in memory, it's persisted by `TokenManager` instead of spotipy's shared `.cache` file.
+    """
+    oauth = SpotifyOAuth(
+        open_browser=False,
+        scope=SPOTIFY_SCOPES,
+        requests_session=getSession(OAUTH),
+        cache_handler=MemoryCacheHandler(),
+    )
+    return oauth.refresh_access_token(auth["refresh_token"])
+
+
+def refreshYoutubeToken(auth: dict) -> dict:
+    """Exchanges refresh token for a new access token, Google doesn't return the refresh token again."""
+    oauth = OAuthCredentials(
+        client_id=os.getenv("YOUTUBE_CLIENT_ID"),
+        client_secret=os.getenv("YOUTUBE_CLIENT_SECRET"),
+        session=getSession(OAUTH),
+    )
+    token: dict = oauth.refresh_token(auth["refresh_token"])
+    return {**token, "expires_at": int(time.time()) + token["expires_in"]}
+
+
+class TokenManager:
+    """
+    Refreshes OAuth tokens of the user `margin` seconds before they expire & persists them with
+    `persist(userId, {platform: auth})`, so clients are built with ready tokens & don't refresh them on the first call.
+    Concurrent refreshes of the same token are done once.
+    Per-token state is dropped once it isn't needed: locks when nobody waits on them,
+    refreshed auths when they're expiring again.
+    """
+
+    def __init__(
+        self,
+        persist: Callable[[str, dict], None],
+        margin: int = TOKEN_REFRESH_MARGIN,
+        refreshers: dict[Platform, Callable[[dict], dict]] | None = None,
+    ) -> None:
+        self.persist = persist
+        self.margin = margin
+        self.refreshers: dict[Platform, Callable[[dict], dict]] = refreshers or {
+            Platform.SPOTIFY: refreshSpotifyToken,
+            Platform.YOUTUBE: refreshYoutubeToken,
+        }
+        # Lock per `(userId, platform)` with the amount of callers holding or waiting on it.
+        self._locks: dict[tuple[str, Platform], tuple[threading.Lock, int]] = {}
+        self._locksLock = threading.Lock()
+        # Last refreshed auth per `(userId, platform)`, for callers holding user loaded before the refresh.
+        self._refreshed: dict[tuple[str, Platform], dict] = {}
+
+    def isExpiring(self, auth: dict | None) -> bool:
+        if not auth or getattr(auth, "isDummy", False) or "refresh_token" not in auth:
+            return False
+        return auth.get("expires_at", 0) - time.time() < self.margin
+
+    def ensureFresh(self, user: User) -> list[Platform]:
+        """Refreshes expiring tokens of the `user` in place, returns platforms which tokens were refreshed."""
+        refreshed: list[Platform] = []
+        for platform in self.refreshers:
+            try:
+                if self._ensureFresh(user, platform):
+                    refreshed.append(platform)
+            except Exception as err:
+                # Client will refresh the token lazily, as it did before.
+                logger.error(
+                    f"Failed to refresh {platform} token of {user.userId}: {err}"
+                )
+
+        return refreshed
+
+    def _ensureFresh(self, user: User, platform: Platform) -> bool:
+        if not self.isExpiring(getattr(user, platform.authKey)):
+            return False
+
+        key: tuple[str, Platform] = (user.userId, platform)
+        lock: threading.Lock = self._acquireLock(key)
+        try:
+            with lock:
+                # Token could have been refreshed by a concurrent call, while we were waiting.
+                if (auth := self._refreshed.get(key)) and not self.isExpiring(auth):
+                    setattr(user, platform.authKey, Auth(auth))
+                    return True
+
+                auth = getattr(user, platform.authKey)
+                startedAt: float = time.perf_counter()
+                # Keep fields that aren't returned on refresh, e.g. Google's refresh token.
+                freshAuth: dict = {**auth, **self.refreshers[platform](auth)}
+                self.persist(user.userId, {platform.value: freshAuth})
+                with self._locksLock:
+                    self._evictExpiring()
+                    self._refreshed[key] = freshAuth
+                setattr(user, platform.authKey, Auth(freshAuth))
+        finally:
+            self._releaseLock(key)
+
+        logger.info(
+            f"Refreshed {platform} token of {user.userId} in {time.perf_counter() - startedAt:.2f}s"
+        )
+        return True
+
+    def _acquireLock(self, key: tuple[str, Platform]) -> threading.Lock:
+        """Returns lock of the `key`, it's kept until the matching `_releaseLock()`."""
+        with self._locksLock:
+            lock, holders = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, holders + 1)
+            return lock
+
+    def _releaseLock(self, key: tuple[str, Platform]) -> None:
+        """Drops lock of the `key` when it was the last caller holding or waiting on it."""
+        with self._locksLock:
+            lock, holders = self._locks[key]
+            if holders > 1:
+                self._locks[key] = (lock, holders - 1)
+            else:
+                del self._locks[key]
+
+    def _evictExpiring(self) -> None:
+        """Drops refreshed auths which are expiring again, they're refreshed from the user on the next call."""
+        for key in [k for k, auth in self._refreshed.items() if self.isExpiring(auth)]:
+            del self._refreshed[key]
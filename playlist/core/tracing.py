@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Iterator
+
+try:
+    from playlist.constants import METRICS_BUCKETS
+except ModuleNotFoundError:
+    from constants import METRICS_BUCKETS
+
+
+logger: logging.Logger = logging.getLogger()
+
+# Id of the current generation, attached to every span of it.
+correlationId: ContextVar[str | None] = ContextVar("correlationId", default=None)
+
+
+class Metrics:
+    """
+    Process-wide latency histograms & counters, rendered in Prometheus text format.
+    Series are identified by metric name & sorted label pairs.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = METRICS_BUCKETS) -> None:
+        self.buckets = buckets
+        # `{(name, labels): [bucket counts..., sum, count]}`
+        self._histograms: dict[tuple[str, tuple], list[float]] = {}
+        self._counters: dict[tuple[str, tuple], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Records `value` in the histogram `name`."""
+        key: tuple[str, tuple] = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram: list[float] = self._histograms.setdefault(
+                key, [0] * (len(self.buckets) + 2)
+            )
+            # Buckets are cumulative, so every bucket from the first fitting one is incremented.
+            for indx in range(bisect_left(self.buckets, value), len(self.buckets)):
+                histogram[indx] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        """Increments counter `name` by `value`."""
+        key: tuple[str, tuple] = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        """Renders all metrics in Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted({x[0] for x in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (_, labels), histogram in sorted(
+                    x for x in self._histograms.items() if x[0][0] == name
+                ):
+                    for bound, count in zip(self.buckets, histogram):
+                        lines.append(
+                            f"{name}_bucket{self._labels(labels, le=str(bound))} {count:g}"
+                        )
+                    lines.append(
+                        f"{name}_bucket{self._labels(labels, le='+Inf')} {histogram[-1]:g}"
+                    )
+                    lines.append(
+                        f"{name}_sum{self._labels(labels)} {histogram[-2]:.6f}"
+                    )
+                    lines.append(
+                        f"{name}_count{self._labels(labels)} {histogram[-1]:g}"
+                    )
+
+            for name in sorted({x[0] for x in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (_, labels), value in sorted(
+                    x for x in self._counters.items() if x[0][0] == name
+                ):
+                    lines.append(f"{name}{self._labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels: tuple, **extra: str) -> str:
+        pairs: list[tuple[str, str]] = list(labels) + list(extra.items())
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def span(name: str, **labels: str) -> Iterator[None]:
+    """
+    Times the block & records it as `playlist_span_seconds{span=name}`, failures are counted separately.
+    Span is logged together with the correlation id of the current generation.
+    """
+    startedAt: float = time.perf_counter()
+    status: str = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        metrics.increment("playlist_span_errors_total", span=name, **labels)
+        raise
+    finally:
+        took: float = time.perf_counter() - startedAt
+        metrics.observe("playlist_span_seconds", took, span=name, **labels)
+        logger.debug(f"[{correlationId.get()}] span {name} {status} in {took:.3f}s")
+
+
+def traced(name: str | None = None, root: bool = False) -> Callable:
+    """
+    Decorator that wraps the method into a `span`.
+    `root` methods start a new generation(i.e. correlation id), unless they're called within one.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        spanName: str = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs) -> Any:
+            if root and correlationId.get() is None:
+                with generation():
+                    return wrapper(*args, **kwargs)
+
+            with span(spanName):
+                return method(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def generation(generationId: str | None = None) -> Iterator[str]:
+    """Sets correlation id of the generation for the block, so spans in it(and its threads) can be grouped."""
+    token = correlationId.set(generationId or uuid.uuid4().hex[:12])
+    try:
+        yield correlationId.get()
+    finally:
+        correlationId.reset(token)
+
+
+def submitInContext(executor: Executor, method: Callable, *args) -> Future:
+    """`executor.submit()` that runs `method` in a copy of the current context, so correlation id is kept."""
+    return executor.submit(copy_context().run, method, *args)
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import requests
+import spotipy
+from more_itertools import chunked
+from urllib3.exceptions import NewConnectionError
+from ytmusicapi.ytmusic import YTMusic
+
+try:
+    from playlist.core.tracing import span, submitInContext
+    from playlist.constants import (
+        MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE,
+        MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE,
+        PLAYLIST_WRITE_CONCURRENCY,
+        PLAYLIST_WRITE_RETRIES,
+    )
+except ModuleNotFoundError:
+    from tracing import span, submitInContext
+    from constants import (
+        MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE,
+        MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE,
+        PLAYLIST_WRITE_CONCURRENCY,
+        PLAYLIST_WRITE_RETRIES,
+    )
+
+
+logger: logging.Logger = logging.getLogger()
+
+
+def isNotSent(err: Exception) -> bool:
+    """Whether request failed before it was sent, so retrying a non-idempotent write can't apply it twice."""
+    if isinstance(err, requests.ConnectTimeout):
+        return True
+    if isinstance(err, requests.ConnectionError) and err.args:
+        # urllib3 reports failed connection attempts as `MaxRetryError(reason=NewConnectionError)`.
+        reason = getattr(err.args[0], "reason", err.args[0])
+        return isinstance(reason, NewConnectionError)
+
+    return False
+
+
+class PlaylistWriter:
+    """
+    Writes tracks into Spotify & YouTube playlists in chunks.
+    Every chunk is retried independently & its timing is recorded in `timings`.
+    Non-idempotent writes(Spotify add, YouTube create) are retried only if the request wasn't sent,
+    otherwise retry after e.g. a timed out but applied request would duplicate the tracks.
+    """
+
+    def __init__(
+        self,
+        spotify: spotipy.Spotify | None = None,
+        youtube: YTMusic | None = None,
+        maxWorkers: int = PLAYLIST_WRITE_CONCURRENCY,
+        retries: int = PLAYLIST_WRITE_RETRIES,
+    ) -> None:
+        self.spotify = spotify
+        self.youtube = youtube
+        self.maxWorkers = maxWorkers
+        self.retries = retries
+        # Seconds each chunk took(including retries), e.g. `{"spotify#0": 0.31}`.
+        self.timings: dict[str, float] = {}
+
+    def addToSpotify(
+        self, playlistId: str, trackIds: list[str], keepOrder: bool = True
+    ) -> None:
+        """
+        Appends `trackIds` to the Spotify playlist, 100tracks per request.
+        Spotify rejects insert position beyond current playlist length, so chunk N can't be positioned before chunk N-1
+        is written. Thus chunks are written concurrently only if order doesn't matter(i.e. tracks are shuffled).
+        """
+        uris: list[str] = [f"https://open.spotify.com/track/{x}" for x in trackIds]
+        chunks: list[list[str]] = list(chunked(uris, MAX_SPOTIFY_PLAYLIST_CHUNK_SIZE))
+
+        def addChunk(chunk: list[str]) -> dict:
+            return self.spotify.playlist_add_items(playlist_id=playlistId, items=chunk)
+
+        if keepOrder:
+            for indx, chunk in enumerate(chunks):
+                self._writeChunk(f"spotify#{indx}", addChunk, chunk)
+        else:
+            self._writeConcurrently("spotify", addChunk, [(x,) for x in chunks])
+
+        self._logTimings("spotify")
+
+    def createOnYoutube(self, title: str, description: str, videoIds: list[str]) -> str:
+        """
+        Creates YouTube playlist with the first chunk of `videoIds`, then appends the rest chunk by chunk.
+        Returns id of the playlist.
+        """
+        chunks: list[list[str]] = list(
+            chunked(videoIds, MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE)
+        )
+        playlistId: str = self._writeChunk(
+            "youtube#0",
+            lambda chunk: self.youtube.create_playlist(
+                title=title, description=description, video_ids=chunk or None
+            ),
+            chunks[0] if chunks else [],
+        )
+        self.addToYoutube(
+            playlistId, videoIds[MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE:], firstChunk=1
+        )
+
+        return playlistId
+
+    def addToYoutube(
+        self, playlistId: str, videoIds: list[str], firstChunk: int = 0
+    ) -> None:
+        """
+        Appends `videoIds` to the YouTube playlist chunk by chunk.
+        YouTube has no insert position, so chunks have to be written sequentially to keep the order.
+        """
+        for indx, chunk in enumerate(
+            chunked(videoIds, MAX_YOUTUBE_PLAYLIST_CHUNK_SIZE), start=firstChunk
+        ):
+            # Adding with `duplicates=False` again is harmless, so any failure is retried.
+            self._writeChunk(
+                f"youtube#{indx}",
+                self._addYoutubeChunk,
+                playlistId,
+                chunk,
+                isIdempotent=True,
+            )
+
+        self._logTimings("youtube")
+
+    def _addYoutubeChunk(self, playlistId: str, chunk: list[str]) -> dict:
+        """Adds `chunk` to the playlist, raises if YouTube reports failure."""
+        result = self.youtube.add_playlist_items(
+            playlistId=playlistId, videoIds=chunk, duplicates=False
+        )
+        if (
+            isinstance(result, dict)
+            and result.get("status", "STATUS_SUCCEEDED") != "STATUS_SUCCEEDED"
+        ):
+            raise RuntimeError(
+                f"Failed to add tracks to YouTube playlist {playlistId}: {result}"
+            )
+
+        return result
+
+    def _writeConcurrently(
+        self, prefix: str, method: Callable, argsList: list[tuple]
+    ) -> None:
+        """Writes chunks concurrently, first failed chunk is re-raised."""
+        with ThreadPoolExecutor(
+            max_workers=self.maxWorkers, thread_name_prefix="writer"
+        ) as executor:
+            futures = [
+                submitInContext(
+                    executor, self._writeChunk, f"{prefix}#{indx}", method, *args
+                )
+                for indx, args in enumerate(argsList)
+            ]
+            for future in futures:
+                future.result()
+
+    def _writeChunk(
+        self, name: str, method: Callable, *args, isIdempotent: bool = False
+    ) -> Any:
+        """Calls `method(*args)`, retrying with exponential backoff(see `isNotSent()` for non-idempotent ones)."""
+        startedAt: float = time.perf_counter()
+        try:
+            with span(f"write.{name.split('#')[0]}"):
+                for attempt in range(1, self.retries + 1):
+                    try:
+                        return method(*args)
+                    except Exception as err:
+                        if attempt == self.retries or not (
+                            isIdempotent or isNotSent(err)
+                        ):
+                            raise
+                        logger.error(
+                            f"Failed to write chunk {name}(attempt {attempt}): {err}"
+                        )
+                        time.sleep(0.5 * 2 ** (attempt - 1))
+        finally:
+            self.timings[name] = time.perf_counter() - startedAt
+
+    def _logTimings(self, prefix: str) -> None:
+        """Logs timings of the chunks written to `prefix` platform."""
+        if timings := {k: v for k, v in self.timings.items() if k.startswith(prefix)}:
+            logger.info(
+                f"Wrote {len(timings)} chunks to {prefix}: "
+                + ", ".join(f"{name}={took:.2f}s" for name, took in timings.items())
+            )
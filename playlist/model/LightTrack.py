@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+try:
+    from playlist.model.Track import Track
+except ModuleNotFoundError:
+    from model import Track
+
+
+class LightTrack:
+    """
+    Lightweight track parsed straight from raw provider payloads, without pydantic validation.
+    Used on hot paths(e.g. search results), converted to the `Track` only when it's actually needed.
+    """
+
+    __slots__ = (
+        "title",
+        "artists",
+        "duration",
+        "youtubeId",
+        "youtubeArtistId",
+        "spotifyId",
+        "spotifyArtistId",
+        "image",
+    )
+
+    def __init__(
+        self,
+        title: str | None,
+        artists: list[str] | None,
+        duration: int | None = None,
+        youtubeId: str | None = None,
+        youtubeArtistId: list[str] | None = None,
+        spotifyId: str | None = None,
+        spotifyArtistId: list[str] | None = None,
+        image: str | None = None,
+    ) -> None:
+        self.title = title
+        self.artists = artists
+        self.duration = duration
+        self.youtubeId = youtubeId
+        self.youtubeArtistId = youtubeArtistId
+        self.spotifyId = spotifyId
+        self.spotifyArtistId = spotifyArtistId
+        self.image = image
+
+    def __repr__(self) -> str:
+        return f"LightTrack(title={self.title!r}, artists={self.artists!r}, duration={self.duration!r})"
+
+    @classmethod
+    def fromSpotify(cls, rawTrack: dict) -> LightTrack:
+        """Parses track from Spotify payload(e.g. search result, saved track, recommendation)."""
+        artists: list[dict] = rawTrack.get("artists") or []
+        return cls(
+            title=rawTrack.get("name"),
+            artists=[x.get("name") for x in artists],
+            duration=cls._seconds(rawTrack.get("duration_ms")),
+            spotifyId=rawTrack.get("id"),
+            spotifyArtistId=[x.get("id") for x in artists],
+            image=cls._smallestImage(rawTrack.get("album", {}).get("images")),
+        )
+
+    @classmethod
+    def fromYoutube(cls, rawTrack: dict) -> LightTrack:
+        """Parses track from YouTube payload(e.g. search result, playlist item, watch playlist item)."""
+        artists: list[dict] = rawTrack.get("artists") or []
+        return cls(
+            title=rawTrack.get("title"),
+            artists=[x.get("name") for x in artists],
+            duration=cls._seconds(rawTrack.get("duration_seconds")),
+            youtubeId=rawTrack.get("videoId"),
+            youtubeArtistId=[x.get("id") for x in artists],
+            image=cls._smallestImage(
+                rawTrack.get("thumbnails") or rawTrack.get("thumbnail")
+            ),
+        )
+
+    @classmethod
+    def fromLastFM(cls, rawTrack: dict) -> LightTrack:
+        """Parses track from LastFM `track.getsimilar` payload, its duration is unreliable, so it's always `0`."""
+        artist: dict | str = rawTrack.get("artist") or {}
+        return cls(
+            title=rawTrack.get("name"),
+            artists=[artist.get("name") if isinstance(artist, dict) else artist],
+            duration=0,
+            image=cls._smallestImage(rawTrack.get("image")),
+        )
+
+    @classmethod
+    def fromTrack(cls, track: Track) -> LightTrack:
+        return cls(**{x: getattr(track, x) for x in cls.__slots__})
+
+    def toTrack(self) -> Track:
+        """
+        Converts to the pydantic `Track`, values are already normalized, so validation is skipped.
+        Same as `Track.model_construct()`, but without per-field default handling, since all fields are set here.
+        """
+        track: Track = Track.__new__(Track)
+        object.__setattr__(
+            track, "__dict__", {x: getattr(self, x) for x in self.__slots__}
+        )
+        object.__setattr__(track, "__pydantic_fields_set__", set(self.__slots__))
+        object.__setattr__(track, "__pydantic_extra__", None)
+        object.__setattr__(track, "__pydantic_private__", None)
+
+        return track
+
+    @staticmethod
+    def _seconds(duration: int | None) -> int | None:
+        """Same as `Track.duration` validator: milliseconds are converted to seconds."""
+        if duration is None:
+            return None
+        return round(duration / 1000) if duration > 1000 else duration
+
+    @staticmethod
+    def _smallestImage(images: list[dict] | None) -> str | None:
+        """Same as `Track.image` validator: url of the smallest image."""
+        if not images:
+            return None
+        image: dict = min(images, key=lambda x: x.get("width", 0))
+        return image.get("url") or image.get("#text")
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from enum import StrEnum
 
@@ -117,15 +118,36 @@ class Platform(StrEnum):
 
     async def createPlaylist(
         self, playlistGenerator: PlaylistGenerator, lastN: int
+    ) -> str:
+        """Generates & publishes the playlist in a worker thread, so event loop isn't blocked."""
+        match self:
+            case Platform.SPOTIFY:
+                createMethod = playlistGenerator.createSpotifyPlaylist
+            case Platform.YOUTUBE:
+                createMethod = playlistGenerator.createYoutubePlaylist
+
+        return await asyncio.to_thread(createMethod, lastN=lastN)
+
+    async def streamPlaylist(
+        self,
+        playlistGenerator: PlaylistGenerator,
+        lastN: int,
+        onCreated: Callable[[str], None] | None = None,
+        onProgress: Callable[[int], None] | None = None,
     ) -> str:
         """
-        <useful doc-string>
+        Progressive version of `createPlaylist()`, generation runs in a worker thread so event loop isn't blocked.
+        Callbacks are called from that thread.
         """
         match self:
             case Platform.SPOTIFY:
-                return playlistGenerator.createSpotifyPlaylist(lastN=lastN)
+                streamMethod = playlistGenerator.streamSpotifyPlaylist
             case Platform.YOUTUBE:
-                return playlistGenerator.createYoutubePlaylist(lastN=lastN)
+                streamMethod = playlistGenerator.streamYoutubePlaylist
+
+        return await asyncio.to_thread(
+            streamMethod, lastN=lastN, onCreated=onCreated, onProgress=onProgress
+        )
 
 
 def getSpotifyAuthUrl(update: Update, user: User) -> str:
@@ -1,3 +1,6 @@
+import re
+import unicodedata
+
 from pydantic import BaseModel, Field, ConfigDict, AliasChoices, computed_field
 from pydantic.fields import FieldInfo
 
@@ -15,6 +18,13 @@ def artistNameValidator(value) -> list:
         return [value.get("name")]
 
 
+def normalize(value: str | None) -> str:
+    """Lowercases `value`, strips accents & punctuation, so same strings from different platforms are equal."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(x for x in value if not unicodedata.combining(x)).lower()
+    return " ".join(re.sub(r"[^\w]+", " ", value).split())
+
+
 ArtistName = Annotated[list, BeforeValidator(artistNameValidator)]
 
 ArtistId = Annotated[
@@ -47,7 +57,6 @@ class Track(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
 
     # TODO:
-    #  - needs a __hash__ method, so you could quickly check `if track is in list of tracks`.
     #  - think whether it make sense splitting youtube & spotify Tracks in separate classes and introducing
     #  new unitied one.
 
@@ -98,3 +107,35 @@ class Track(BaseModel):
     def firstArtistName(self) -> str:
         """Docstring for artistName"""
         return self.artists[0]
+
+    @property
+    def signature(self) -> str:
+        """Normalized `artist|title|duration` signature, that identifies track regardless of platform."""
+        return (
+            f"{normalize(self.artistName)}|{normalize(self.title)}|{self.duration or 0}"
+        )
+
+    @property
+    def identityKeys(self) -> list[str]:
+        """
+        All keys the track is known by: platform ids(when known) & normalized `artist|title` name.
+        Name doesn't include duration, since it differs slightly between platforms & LastFM doesn't have it at all.
+        """
+        keys: list[str] = []
+        if self.spotifyId:
+            keys.append(f"spotify:{self.spotifyId}")
+        if self.youtubeId:
+            keys.append(f"youtube:{self.youtubeId}")
+        keys.append(f"name:{normalize(self.artistName)}|{normalize(self.title)}")
+
+        return keys
+
+    @property
+    def identity(self) -> str:
+        """Canonical identity key: platform id when known, normalized `artist|title` name otherwise."""
+        return self.identityKeys[0]
+
+    def __hash__(self) -> int:
+        # Platform ids are filled during generation, so hash only fields that don't change. Use `TrackIndex` to
+        # match the same song across platforms.
+        return hash(self.signature)
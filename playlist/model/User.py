@@ -29,9 +29,12 @@ class User(BaseModel):
     userId: str | None = Field(alias="userId", default=None)
     userName: str | None = Field(alias="username", default=None)
     messages: int | None = Field(alias="messages", default=0)
+    # Legacy flag, concurrent generations are prevented by `GenerationLease` now.
     inProgress: bool = Field(alias="inProgress", default=False)
     spotifyAuth: Auth | dict | None = Field(alias=Platform.SPOTIFY, default=None)
     youtubeAuth: Auth | dict | None = Field(alias=Platform.YOUTUBE, default=None)
+    # Id of the `main` YouTube playlist(where all liked songs are), discovered on first generation.
+    mainYoutubePlaylist: str | None = Field(alias="mainYoutubePlaylist", default=None)
     created: datetime | None = Field(alias="_created", default=datetime.now())
     updated: datetime | None = Field(alias="_updated", default=datetime.now())
 
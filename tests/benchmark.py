@@ -0,0 +1,162 @@
+"""
+Offline benchmark of playlist generation against fake providers(see `tests/fakes.py`).
+Reports wall time(p50/p95) & API calls per scenario, so hot path regressions are caught without network access.
+
+Usage:
+    python -m tests.benchmark --runs 5 --latency 0.05 --errorRate 0.01
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import time
+from functools import partial
+from typing import NamedTuple
+
+from playlist.core.budget import UsageStore
+from playlist.core.cache import MatchCache, ResponseCache
+from playlist.core.clients import UserClients
+from playlist.core.generator import PlaylistGenerator
+from playlist.model.Platform import Platform
+from playlist.model.User import User
+from tests.fakes import (
+    Catalog,
+    FakeLastFMSession,
+    FakeSpotify,
+    FakeYTMusic,
+    gaussLatency,
+)
+
+
+class Scenario(NamedTuple):
+    platform: Platform
+    lastN: int
+    fanOut: int
+    concurrency: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.platform}/lastN={self.lastN}/fanOut={self.fanOut}/concurrency={self.concurrency}"
+
+
+class Result(NamedTuple):
+    scenario: Scenario
+    timings: list[float]
+    apiCalls: dict[str, int]
+    tracksCount: int
+
+    @property
+    def p50(self) -> float:
+        return statistics.median(self.timings)
+
+    @property
+    def p95(self) -> float:
+        if len(self.timings) < 2:
+            return self.timings[0]
+        return statistics.quantiles(self.timings, n=20, method="inclusive")[-1]
+
+
+# Generator asks every source for at most 5 recommendations per seed, so only fan-outs up to 5 change the workload.
+SCENARIOS: list[Scenario] = [
+    Scenario(platform, lastN, fanOut, concurrency)
+    for platform in (Platform.SPOTIFY, Platform.YOUTUBE)
+    for lastN, fanOut in ((10, 5), (25, 3), (25, 5))
+    for concurrency in (1, 8)
+]
+
+
+def buildGenerator(
+    scenario: Scenario, latency: float, errorRate: float, seed: int
+) -> tuple[PlaylistGenerator, dict]:
+    """Builds generator on top of fresh fakes, empty in-memory caches & usage store."""
+    catalog = Catalog(fanOut=scenario.fanOut)
+    providerParams: dict = {
+        "catalog": catalog,
+        "latency": gaussLatency(latency, latency / 4),
+        "errorRate": errorRate,
+        "seed": seed,
+    }
+    providers: dict = {
+        "spotify": FakeSpotify(**providerParams),
+        "youtube": FakeYTMusic(**providerParams),
+        "lastfm": FakeLastFMSession(**providerParams),
+    }
+
+    generator = PlaylistGenerator(
+        user=User(userId="benchmark", spotify={"token": "x"}, youtube={"token": "y"}),
+        matchCache=MatchCache(path=":memory:"),
+        responseCache=ResponseCache(path=":memory:"),
+        clients=UserClients(youtube=providers["youtube"], spotify=providers["spotify"]),
+        lastFMSession=providers["lastfm"],
+        # Daily usage of previous runs must not cut LastFM recommendations.
+        usageStore=UsageStore(path=":memory:"),
+    )
+    generator.fillSpotifyId = partial(
+        generator.fillSpotifyId, concurrency=scenario.concurrency
+    )
+    generator.fillYoutubeId = partial(
+        generator.fillYoutubeId, concurrency=scenario.concurrency
+    )
+
+    return generator, providers
+
+
+def runScenario(
+    scenario: Scenario,
+    runs: int = 5,
+    latency: float = 0.02,
+    errorRate: float = 0,
+) -> Result:
+    """Generates `runs` playlists with cold caches & collects timings and API calls."""
+    timings: list[float] = []
+    apiCalls: dict[str, int] = {}
+    tracksCount: int = 0
+    for run in range(runs):
+        generator, providers = buildGenerator(scenario, latency, errorRate, seed=run)
+
+        startedAt: float = time.perf_counter()
+        match scenario.platform:
+            case Platform.SPOTIFY:
+                generator.createSpotifyPlaylist(lastN=scenario.lastN)
+            case Platform.YOUTUBE:
+                generator.createYoutubePlaylist(lastN=scenario.lastN)
+        timings.append(time.perf_counter() - startedAt)
+
+        for name, provider in providers.items():
+            apiCalls[name] = apiCalls.get(name, 0) + provider.callCount
+        playlists: dict = providers[scenario.platform].playlists
+        tracksCount += sum(len(x) for x in playlists.values())
+
+    return Result(
+        scenario=scenario,
+        timings=timings,
+        apiCalls={name: round(x / runs) for name, x in apiCalls.items()},
+        tracksCount=round(tracksCount / runs),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="Mean latency of a call, seconds"
+    )
+    parser.add_argument("--errorRate", type=float, default=0)
+    args = parser.parse_args()
+
+    # Generation logs every stage, which is just noise here.
+    logging.getLogger().setLevel(logging.CRITICAL)
+
+    print(f"{'scenario':<55} {'p50':>7} {'p95':>7} {'tracks':>6}  api calls")
+    for scenario in SCENARIOS:
+        result: Result = runScenario(scenario, args.runs, args.latency, args.errorRate)
+        calls: str = ", ".join(f"{k}={v}" for k, v in result.apiCalls.items())
+        print(
+            f"{scenario.name:<55} {result.p50:>6.2f}s {result.p95:>6.2f}s {result.tracksCount:>6}  {calls}"
+        )
+
+
+if __name__ == "__main__":
+    main()
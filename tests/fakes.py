@@ -0,0 +1,255 @@
+"""
+In-process stand-ins for Spotify, YTMusic & LastFM, so generation could be run offline.
+All of them share a deterministic catalog of songs, so the same song is found on every platform.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable
+
+from playlist.core.budget import recordCall
+
+
+class FakeProviderError(Exception):
+    """Injected provider failure."""
+
+
+def constantLatency(seconds: float) -> Callable[[random.Random], float]:
+    return lambda _: seconds
+
+
+def gaussLatency(mean: float, stddev: float) -> Callable[[random.Random], float]:
+    return lambda rng: max(rng.gauss(mean, stddev), 0)
+
+
+class Catalog:
+    """Deterministic universe of songs: song `i` has the same title, artist & duration on every platform."""
+
+    def __init__(self, size: int = 10_000, fanOut: int = 5) -> None:
+        self.size = size
+        # Amount of similar songs per song, requests for more recommendations get only `fanOut` of them.
+        self.fanOut = fanOut
+
+    def title(self, songId: int) -> str:
+        return f"Song {songId}"
+
+    def artist(self, songId: int) -> str:
+        return f"Artist {songId % 97}"
+
+    def duration(self, songId: int) -> int:
+        return 150 + songId % 120
+
+    def similar(self, songId: int, limit: int | None = None) -> list[int]:
+        return [
+            (songId * 31 + x * 7) % self.size
+            for x in range(1, min(limit or self.fanOut, self.fanOut) + 1)
+        ]
+
+    def find(self, query: str) -> int | None:
+        """Returns id of the song mentioned in search `query`."""
+        if match := re.search(r"Song (\d+)", query):
+            return int(match.group(1)) % self.size
+        return None
+
+
+class FakeProvider:
+    """
+    Base class that injects latency & errors into every call & counts calls per method.
+    Calls are accounted in the current generation, just like real HTTP calls.
+    """
+
+    provider: str = ""
+
+    def __init__(
+        self,
+        catalog: Catalog | None = None,
+        latency: Callable[[random.Random], float] = constantLatency(0),
+        errorRate: float = 0,
+        seed: int = 0,
+    ) -> None:
+        self.catalog = catalog or Catalog()
+        self.latency = latency
+        self.errorRate = errorRate
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def callCount(self) -> int:
+        return sum(self.calls.values())
+
+    def _call(self, method: str) -> None:
+        recordCall(self.provider, method)
+        with self._lock:
+            self.calls[method] += 1
+            delay: float = self.latency(self._random)
+            isError: bool = self._random.random() < self.errorRate
+
+        time.sleep(delay)
+        if isError:
+            raise FakeProviderError(f"{type(self).__name__}.{method} failed")
+
+
+class FakeSpotify(FakeProvider):
+    """Subset of `spotipy.Spotify` used by `PlaylistGenerator`."""
+
+    provider: str = "spotify"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.auth_manager = None
+        self.playlists: dict[str, list[str]] = {}
+
+    def rawTrack(self, songId: int) -> dict:
+        return {
+            "id": f"spotify{songId}",
+            "name": self.catalog.title(songId),
+            "artists": [
+                {
+                    "name": self.catalog.artist(songId),
+                    "id": f"spotifyArtist{songId % 97}",
+                }
+            ],
+            "duration_ms": self.catalog.duration(songId) * 1000,
+            "explicit": False,
+            "album": {"images": [{"url": f"https://i.scdn.co/{songId}", "width": 64}]},
+        }
+
+    def current_user(self) -> dict:
+        self._call("current_user")
+        return {"id": "fake_user"}
+
+    def current_user_saved_tracks(self, limit: int = 20) -> dict:
+        self._call("current_user_saved_tracks")
+        return {"items": [{"track": self.rawTrack(x)} for x in range(limit)]}
+
+    def search(self, q: str, limit: int = 10, **_) -> dict:
+        self._call("search")
+        songId: int | None = self.catalog.find(q)
+        return {"tracks": {"items": [] if songId is None else [self.rawTrack(songId)]}}
+
+    def recommendations(self, seed_tracks: list[str], limit: int = 20, **_) -> dict:
+        self._call("recommendations")
+        songIds: list[int] = [
+            similarId
+            for seed in seed_tracks
+            for similarId in self.catalog.similar(int(seed.removeprefix("spotify")))
+        ]
+        return {"tracks": [self.rawTrack(x) for x in songIds[:limit]]}
+
+    def user_playlist_create(self, user: str, name: str, **_) -> dict:
+        self._call("user_playlist_create")
+        playlistId: str = f"playlist{len(self.playlists)}"
+        self.playlists[playlistId] = []
+        return {"id": playlistId}
+
+    def playlist_add_items(self, playlist_id: str, items: list[str], **_) -> dict:
+        self._call("playlist_add_items")
+        self.playlists[playlist_id] += items
+        return {"snapshot_id": "snapshot"}
+
+
+class FakeYTMusic(FakeProvider):
+    """Subset of `ytmusicapi.YTMusic` used by `PlaylistGenerator`."""
+
+    provider: str = "youtube"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.headers: dict = {}
+        self.playlists: dict[str, list[str]] = {}
+
+    def rawTrack(self, songId: int) -> dict:
+        return {
+            "videoId": f"youtube{songId}",
+            "title": self.catalog.title(songId),
+            "artists": [
+                {
+                    "name": self.catalog.artist(songId),
+                    "id": f"youtubeArtist{songId % 97}",
+                }
+            ],
+            "duration_seconds": self.catalog.duration(songId),
+            "thumbnails": [{"url": f"https://i.ytimg.com/{songId}", "width": 60}],
+        }
+
+    def get_library_playlists(self, limit: int = 25) -> list[dict]:
+        self._call("get_library_playlists")
+        return [{"playlistId": "LM", "count": str(self.catalog.size)}]
+
+    def get_playlist(self, playlistId: str, limit: int = 100, **_) -> dict:
+        self._call("get_playlist")
+        # Liked songs differ from the Spotify ones, but partially overlap with them.
+        return {"tracks": [self.rawTrack(x + 5) for x in range(limit)]}
+
+    def search(
+        self, query: str, filter: str | None = None, limit: int = 20, **_
+    ) -> list:
+        self._call("search")
+        songId: int | None = self.catalog.find(query)
+        return [] if songId is None else [self.rawTrack(songId)]
+
+    def get_watch_playlist(self, videoId: str, **_) -> dict:
+        self._call("get_watch_playlist")
+        songId: int = int(videoId.removeprefix("youtube"))
+        # First track of the watch playlist is the track itself.
+        return {
+            "tracks": [
+                self.rawTrack(x) for x in [songId, *self.catalog.similar(songId)]
+            ]
+        }
+
+    def create_playlist(
+        self, title: str, description: str, video_ids: list[str] | None = None, **_
+    ) -> str:
+        self._call("create_playlist")
+        playlistId: str = f"playlist{len(self.playlists)}"
+        self.playlists[playlistId] = list(video_ids or [])
+        return playlistId
+
+    def add_playlist_items(self, playlistId: str, videoIds: list[str], **_) -> dict:
+        self._call("add_playlist_items")
+        self.playlists[playlistId] += videoIds
+        return {"status": "STATUS_SUCCEEDED"}
+
+
+class FakeLastFMResponse:
+    def __init__(self, payload: dict) -> None:
+        self.payload = payload
+
+    def json(self) -> dict:
+        return self.payload
+
+
+class FakeLastFMSession(FakeProvider):
+    """Stand-in for the `requests.Session` used to call LastFM `track.getsimilar`."""
+
+    provider: str = "lastfm"
+
+    def get(self, url: str, timeout: float | None = None) -> FakeLastFMResponse:
+        self._call("track.getsimilar")
+        songId: int | None = self.catalog.find(url.replace("%20", " "))
+        if songId is None:
+            return FakeLastFMResponse({"error": 6, "message": "Track not found"})
+
+        return FakeLastFMResponse(
+            {
+                "similartracks": {
+                    "track": [
+                        {
+                            "name": self.catalog.title(x),
+                            "artist": {"name": self.catalog.artist(x)},
+                            "image": [
+                                {"#text": f"https://lastfm.freetls.fastly.net/{x}"}
+                            ],
+                        }
+                        for x in self.catalog.similar(songId)
+                    ]
+                }
+            }
+        )
@@ -0,0 +1,60 @@
+"""Builders shared by the tests."""
+
+import importlib
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+from playlist.core.budget import UsageStore
+from playlist.core.clients import UserClients
+from playlist.core.generator import PlaylistGenerator
+from playlist.model.Track import Track
+from playlist.model.User import User
+
+
+def makeGenerator() -> PlaylistGenerator:
+    """Builds `PlaylistGenerator` with mocked clients, so no network calls are made."""
+    generator = PlaylistGenerator.__new__(PlaylistGenerator)
+    generator.user = User()
+    generator.spotify = Mock()
+    generator.youtube = Mock()
+    generator.clients = UserClients(
+        youtube=generator.youtube, spotify=generator.spotify
+    )
+    generator.matchCache = None
+    generator.responseCache = None
+    generator.usageStore = UsageStore(path=":memory:")
+    generator.lastTracks = {}
+    return generator
+
+
+def makeTracks(count: int) -> list[Track]:
+    """Builds `count` tracks with unique titles & no platform ids."""
+    return [
+        Track(title=f"Track {i}", artists=[f"Artist {i}"], duration=200)
+        for i in range(count)
+    ]
+
+
+def makeLeaseStore() -> tuple[dict, callable]:
+    """Local stand-in of the database: `transact` is a compare-and-set under the lock."""
+    leases: dict = {}
+    lock = threading.Lock()
+
+    def transact(key: str, update) -> dict | None:
+        with lock:
+            leases[key] = update(leases.get(key))
+            return leases[key]
+
+    return leases, transact
+
+
+def importHandlers(monkeypatch):
+    """Imports bot handlers the way the bot does(flat imports from `playlist/core`), with a dummy bot token."""
+    monkeypatch.setenv("BOT_TOKEN", "1:token")
+    root: Path = Path(__file__).parent.parent / "playlist"
+    for path in (str(root), str(root / "core")):
+        if path not in sys.path:
+            sys.path.append(path)
+    return importlib.import_module("handlers")
@@ -0,0 +1,78 @@
+"""
+Microbenchmark of track parsing: pydantic `Track` vs `LightTrack` fast path.
+Reports parse throughput & memory per parsed track.
+
+Usage:
+    python -m tests.microbenchmark --count 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import Callable
+
+from playlist.model.LightTrack import LightTrack
+from playlist.model.Track import Track
+from tests.fakes import FakeSpotify, FakeYTMusic
+
+PARSERS: dict[str, dict[str, Callable[[dict], object]]] = {
+    "spotify": {
+        "Track": lambda x: Track(
+            **x, image=x["album"].get("images", []), youtubeArtistId=None
+        ),
+        "LightTrack": LightTrack.fromSpotify,
+        "LightTrack.toTrack": lambda x: LightTrack.fromSpotify(x).toTrack(),
+    },
+    "youtube": {
+        "Track": lambda x: Track(
+            **x, image=x.get("thumbnails", []), spotifyArtistId=None
+        ),
+        "LightTrack": LightTrack.fromYoutube,
+        "LightTrack.toTrack": lambda x: LightTrack.fromYoutube(x).toTrack(),
+    },
+}
+
+
+def measure(
+    parser: Callable[[dict], object], rawTracks: list[dict]
+) -> tuple[float, float]:
+    """Returns `(tracks per second, bytes per track)` of the `parser`."""
+    startedAt: float = time.perf_counter()
+    for rawTrack in rawTracks:
+        parser(rawTrack)
+    throughput: float = len(rawTracks) / (time.perf_counter() - startedAt)
+
+    gc.collect()
+    tracemalloc.start()
+    tracks: list = [parser(x) for x in rawTracks]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tracks
+
+    return throughput, allocated / len(rawTracks)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=20_000)
+    args = parser.parse_args()
+
+    rawTracks: dict[str, list[dict]] = {
+        "spotify": [FakeSpotify().rawTrack(x) for x in range(args.count)],
+        "youtube": [FakeYTMusic().rawTrack(x) for x in range(args.count)],
+    }
+
+    print(f"{'provider':<9} {'parser':<19} {'tracks/s':>10} {'bytes/track':>12}")
+    for provider, parsers in PARSERS.items():
+        for name, parse in parsers.items():
+            throughput, bytesPerTrack = measure(parse, rawTracks[provider])
+            print(
+                f"{provider:<9} {name:<19} {throughput:>10.0f} {bytesPerTrack:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
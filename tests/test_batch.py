@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import requests
+
+from playlist.core import ratelimit
+from playlist.core.batch import (
+    DONE as GENERATED,
+    FAILED as NOT_GENERATED,
+    SKIPPED,
+    Generation,
+    generateForUser,
+    listAuthorizedUsers,
+    runBatch,
+)
+from playlist.core.lease import GenerationLease
+from playlist.core.storage import SqliteStorage
+from playlist.core.tokens import TokenManager
+from playlist.model.Platform import Platform
+from playlist.model.User import User
+
+
+def test_batchGeneratesForAuthorizedUsers(tmp_path: Path) -> None:
+    """Test that batch generates on authorized platforms only & skips users generating right now."""
+    storage = SqliteStorage(path=str(tmp_path / "storage.sqlite"))
+    storage.setUser("1", {"userId": "1", "spotify": {"token": "x"}, "youtube": {}})
+    storage.setUser("2", {"userId": "2", "spotify": {"token": "x"}})
+    storage.setUser("3", {"userId": "3", "youtubeAuth": {"token": "x"}})
+    storage.setUser("4", {"userId": "4"})
+    assert [x for x, _ in storage.iterUsers()] == ["1", "2", "3", "4"]
+
+    users = listAuthorizedUsers(storage, Platform)
+    assert [x for x, _ in users] == ["1", "2", "3"]
+    assert GenerationLease("2", storage.transactLease, owner="bot").acquire()
+
+    def generate(user: User, platform: Platform, lastN: int) -> str:
+        if platform == Platform.YOUTUBE:
+            raise requests.HTTPError("429")
+        user.mainYoutubePlaylist = "main"
+        return "url"
+
+    tokenManager = TokenManager(persist=storage.updateUser)
+    generations = [
+        generation
+        for userId, data in users
+        for generation in generateForUser(
+            userId, data, list(Platform), 5, storage, tokenManager, generate
+        )
+    ]
+
+    assert [(x.userId, x.platform, x.status, x.error) for x in generations] == [
+        ("1", Platform.SPOTIFY, GENERATED, None),
+        ("2", Platform.SPOTIFY, SKIPPED, None),
+        ("3", Platform.YOUTUBE, NOT_GENERATED, "HTTPError"),
+    ]
+    assert storage.getUser("1")["mainYoutubePlaylist"] == "main"
+    # Lease of the batch is released, the one of the bot is kept.
+    assert GenerationLease("1", storage.transactLease).acquire()
+    assert not GenerationLease("2", storage.transactLease).acquire()
+
+
+def generateFakeShard(users: list[tuple[str, dict]]) -> list[Generation]:
+    """Stand-in of `generateShard()`, module-level so it can be sent to worker processes."""
+    assert (
+        ratelimit.getBucket("spotify").rate == ratelimit.RATE_LIMITS["spotify"][0] / 2
+    )
+    return [
+        Generation(userId, Platform.SPOTIFY, GENERATED, 0.01)
+        if int(userId) % 3
+        else Generation(userId, Platform.SPOTIFY, NOT_GENERATED, 0.01, "HTTPError")
+        for userId, _ in users
+    ]
+
+
+def test_runBatchShardsUsersAcrossProcesses() -> None:
+    """Test that every user is generated once & processes split the rate limits."""
+    users = [(str(i), {}) for i in range(25)]
+
+    report = runBatch(users, generateFakeShard, processes=2, shardSize=4)
+
+    assert sorted(x.userId for x in report.generations) == sorted(x for x, _ in users)
+    assert report.users == 25
+    assert report.usersPerMinute > 0
+    assert report.statuses == {GENERATED: 16, NOT_GENERATED: 9}
+    assert report.failures == {"spotify: HTTPError": 9}
+    assert "users/min" in report.format()
@@ -0,0 +1,31 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from playlist.core.batcher import WriteBatcher
+
+
+def test_writeBatcherMergesConcurrentUpdates() -> None:
+    """Test that concurrent updates of the same key are merged & writes of a key don't overlap."""
+    writes: list[tuple[str, dict]] = []
+
+    def write(key: str, values: dict) -> None:
+        time.sleep(0.05)
+        writes.append((key, values))
+
+    async def updateConcurrently() -> None:
+        batcher = WriteBatcher(write, ThreadPoolExecutor(max_workers=4))
+        first = asyncio.create_task(batcher.update("a", {"x": 1}))
+        await asyncio.sleep(0.01)
+        # Arrive while the first write is in flight, so they're written together.
+        await asyncio.gather(
+            batcher.update("a", {"x": 2}),
+            batcher.update("a", {"y": 3}),
+            batcher.update("b", {"z": 4}),
+        )
+        await first
+
+    asyncio.run(updateConcurrently())
+
+    assert writes[0] == ("a", {"x": 1})
+    assert sorted(writes[1:]) == [("a", {"x": 2, "y": 3}), ("b", {"z": 4})]
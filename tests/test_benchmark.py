@@ -0,0 +1,15 @@
+from playlist.model.Platform import Platform
+from tests.benchmark import Scenario, runScenario
+
+
+def test_benchmarkRunsOfflineOnFakes() -> None:
+    """Test that the whole generation runs against fake providers & their calls are counted."""
+    for platform in (Platform.SPOTIFY, Platform.YOUTUBE):
+        result = runScenario(
+            Scenario(platform, lastN=5, fanOut=3, concurrency=4), runs=2, latency=0
+        )
+
+        assert len(result.timings) == 2
+        assert result.tracksCount > 10
+        assert result.apiCalls["lastfm"] > 0
+        assert result.apiCalls["spotify"] > 0 and result.apiCalls["youtube"] > 0
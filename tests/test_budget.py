@@ -0,0 +1,41 @@
+import datetime
+from pathlib import Path
+
+from playlist.core.budget import Usage, UsageStore
+from playlist.model.Platform import Platform
+from tests.benchmark import Scenario, buildGenerator
+
+
+def test_generationStopsOptionalWorkOverBudget(monkeypatch) -> None:
+    """Test that calls are accounted per generation & optional work is skipped once budget is spent."""
+    monkeypatch.setattr("playlist.core.budget.DAILY_USER_CALL_BUDGET", 0)
+    scenario = Scenario(Platform.YOUTUBE, lastN=10, fanOut=5, concurrency=4)
+
+    generator, providers = buildGenerator(scenario, latency=0, errorRate=0, seed=0)
+    generator.createYoutubePlaylist(lastN=10)
+    unlimitedUsage: Usage = generator.usage
+    assert unlimitedUsage.total == sum(x.callCount for x in providers.values())
+    assert unlimitedUsage.summary()["lastfm track.getsimilar"] > 0
+
+    monkeypatch.setattr("playlist.core.budget.GENERATION_CALL_BUDGET", 40)
+    generator, providers = buildGenerator(scenario, latency=0, errorRate=0, seed=0)
+    playlistUrl: str = generator.createYoutubePlaylist(lastN=10)
+
+    assert playlistUrl
+    assert generator.usage.budget == 40
+    assert generator.usage.total < unlimitedUsage.total / 2
+    assert (
+        providers["lastfm"].callCount
+        < unlimitedUsage.summary()["lastfm track.getsimilar"] / 2
+    )
+
+
+def test_usageStoreSumsCallsPerDay(tmp_path: Path) -> None:
+    """Test that daily usage is accumulated per user & day."""
+    store = UsageStore(path=str(tmp_path / "cache.sqlite"))
+    today = datetime.date(2024, 1, 1)
+    store.add("user", today, 10)
+    store.add("user", today, 5)
+
+    assert store.get("user", today) == 15
+    assert store.get("user", today + datetime.timedelta(days=1)) == 0
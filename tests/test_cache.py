@@ -0,0 +1,49 @@
+from pathlib import Path
+from unittest.mock import Mock
+
+from playlist.core.cache import MatchCache, ResponseCache, TrackMatch
+from playlist.model.Platform import Platform
+from tests.helpers import makeTracks
+
+
+def test_matchCacheStoresPositiveAndNegativeEntries(tmp_path: Path) -> None:
+    """Test that matches & misses are cached per platform, and misses expire sooner."""
+    cache = MatchCache(path=str(tmp_path / "cache.sqlite"), ttl=60, negativeTtl=0)
+    found, missing = makeTracks(2)
+
+    cache.store(found, Platform.SPOTIFY, TrackMatch("spotify_id", ["artist_id"]))
+    cache.store(missing, Platform.SPOTIFY, None)
+
+    assert cache.lookup(found, Platform.SPOTIFY) == (
+        True,
+        ("spotify_id", ["artist_id"]),
+    )
+    assert cache.lookup(found, Platform.YOUTUBE) == (False, None)
+    # Negative entry is already expired, since its TTL is 0.
+    assert cache.lookup(missing, Platform.SPOTIFY) == (False, None)
+
+    cache.negativeTtl = 60
+    cache.store(missing, Platform.SPOTIFY, None)
+    assert cache.lookup(missing, Platform.SPOTIFY) == (True, None)
+
+
+def test_responseCacheTiersAndStats(tmp_path: Path) -> None:
+    """Test that responses are served from memory, then from disk, and counted."""
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path=path, ttl={"endpoint": 60}, memorySize=1)
+    fetchMethod = Mock(side_effect=lambda: {"tracks": [1, 2, 3]})
+
+    assert cache.fetch("endpoint", "a", fetchMethod) == {"tracks": [1, 2, 3]}
+    assert cache.fetch("endpoint", "a", fetchMethod) == {"tracks": [1, 2, 3]}
+    # `b` evicts `a` from memory, so `a` is read from disk.
+    cache.fetch("endpoint", "b", fetchMethod)
+    cache.fetch("endpoint", "a", fetchMethod)
+    # Insufficient payload is fetched again.
+    cache.fetch(
+        "endpoint", "a", fetchMethod, isSufficient=lambda x: len(x["tracks"]) > 3
+    )
+
+    assert fetchMethod.call_count == 3
+    assert cache.stats["endpoint"] == {"memoryHits": 2, "diskHits": 1, "misses": 3}
+    # Another process sees the same entries.
+    assert ResponseCache(path=path).get("endpoint", "b") == {"tracks": [1, 2, 3]}
@@ -0,0 +1,38 @@
+from unittest.mock import Mock
+
+from playlist.core.clients import ClientPool, UserClients, getTokenKey
+from playlist.model.User import User
+
+
+def test_clientPoolReusesClientsUntilAuthChanges(monkeypatch) -> None:
+    """Test that clients are built once per user, rebuilt on re-auth & evicted when idle or over the limit."""
+    buildClients = Mock(
+        side_effect=lambda user: UserClients(Mock(), Mock(), tokenKey=getTokenKey(user))
+    )
+    monkeypatch.setattr("playlist.core.clients.buildClients", buildClients)
+    pool = ClientPool(maxSize=2, idleTtl=60)
+    user = User(userId="1", spotify={"token": "a"})
+
+    clients: UserClients = pool.get(user)
+    assert pool.get(user) is clients
+
+    clients.spotify.current_user.return_value = {"id": "spotify_user"}
+    assert clients.getSpotifyUserId() == clients.getSpotifyUserId() == "spotify_user"
+    clients.spotify.current_user.assert_called_once()
+
+    # Re-authorized user gets new clients.
+    user.spotifyAuth = {"token": "b"}
+    assert pool.get(user) is not clients
+    assert buildClients.call_count == 2
+
+    # Least recently used user is dropped over the limit.
+    pool.get(User(userId="2"))
+    pool.get(User(userId="3"))
+    assert len(pool) == 2
+    assert pool.get(user) is not clients
+    assert buildClients.call_count == 5
+
+    # Idle clients are dropped.
+    pool.idleTtl = -1
+    pool.get(User(userId="4"))
+    assert len(pool) == 1
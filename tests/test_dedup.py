@@ -0,0 +1,31 @@
+from playlist.core.dedup import TrackIndex
+from playlist.model.Track import Track
+from tests.helpers import makeTracks
+
+
+def test_trackIdentity() -> None:
+    """Test that identity prefers platform ids & falls back to normalized name."""
+    track = Track(
+        title="Runaway (feat. Pusha T)", artists=["Kanye  West"], duration=548
+    )
+    assert track.identity == "name:kanye west|runaway feat pusha t"
+    tracks: set[Track] = {track}
+
+    track.youtubeId = "VhEoCOWUtcU"
+    assert track.identity == "youtube:VhEoCOWUtcU"
+    track.spotifyId = "3DK6m7It6Pw857FcQftMds"
+    assert track.identity == "spotify:3DK6m7It6Pw857FcQftMds"
+    # Filling ids doesn't lose the track stored in a set.
+    assert track in tracks
+
+
+def test_trackIndexDropsDuplicatesAcrossPlatforms() -> None:
+    """Test that the same song from different platforms is dropped before resolution."""
+    spotifyTrack = Track(title="Runaway", artists=["Kanye West"], id="spotify_id")
+    youtubeTrack = Track(title="RUNAWAY", artists=["Kanye West"], videoId="video_id")
+    index = TrackIndex([spotifyTrack])
+
+    assert youtubeTrack in index
+    assert index.filterNew(
+        [youtubeTrack, *makeTracks(2), *makeTracks(2)]
+    ) == makeTracks(2)
@@ -0,0 +1,315 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import Mock
+
+from playlist.core import generator as generatorModule
+from playlist.core.cache import MatchCache, ResponseCache
+from playlist.model.Platform import Platform
+from playlist.model.Track import Track
+from playlist.model.User import User
+from tests.helpers import makeGenerator, makeTracks
+
+
+def test_fillSpotifyIdKeepsOrderConcurrently() -> None:
+    """Test that concurrent resolution keeps input order & runs searches in parallel."""
+    generator = makeGenerator()
+    tracks: list[Track] = makeTracks(8)
+    activeSearches: list[int] = [0, 0]
+    lock = threading.Lock()
+
+    def searchTrackOnSpotify(track: Track) -> dict:
+        with lock:
+            activeSearches[0] += 1
+            activeSearches[1] = max(activeSearches)
+        # Finish later searches first, to make sure order is restored.
+        time.sleep(0.01 * (8 - int(track.title.split()[-1])))
+        with lock:
+            activeSearches[0] -= 1
+        return {"id": f"id_{track.title}", "artists": [{"id": f"a_{track.title}"}]}
+
+    generator.searchTrackOnSpotify = searchTrackOnSpotify
+    generator.fillSpotifyId(tracks, concurrency=4)
+
+    assert [x.spotifyId for x in tracks] == [f"id_Track {i}" for i in range(8)]
+    assert tracks[0].spotifyArtistId == ["a_Track 0"]
+    assert 1 < activeSearches[1] <= 4
+
+
+def test_fillYoutubeIdSkipsMissingAndFailedTracks() -> None:
+    """Test that not found & failed searches leave tracks untouched."""
+    generator = makeGenerator()
+    tracks: list[Track] = makeTracks(3)
+
+    def searchTrackOnYoutube(track: Track) -> Track | None:
+        if track.title == "Track 1":
+            return None
+        if track.title == "Track 2":
+            raise ValueError("boom")
+        return Track(
+            title=track.title, artists=[{"name": "x", "id": "a"}], videoId="video"
+        )
+
+    generator.searchTrackOnYoutube = searchTrackOnYoutube
+    generator.fillYoutubeId(tracks, concurrency=3)
+
+    assert tracks[0].youtubeId == "video"
+    assert tracks[0].youtubeArtistId == ["a"]
+    assert not tracks[1].youtubeId
+    assert not tracks[2].youtubeId
+
+
+def test_fillSpotifyIdUsesMatchCache(tmp_path: Path) -> None:
+    """Test that cached tracks are not searched again, including the ones known to be missing."""
+    generator = makeGenerator()
+    generator.matchCache = MatchCache(path=str(tmp_path / "cache.sqlite"))
+    generator.searchTrackOnSpotify = Mock(
+        side_effect=lambda x: {"id": x.title, "artists": [{"id": "artist"}]}
+        if x.title != "Track 1"
+        else None
+    )
+
+    generator.fillSpotifyId(makeTracks(3))
+    assert generator.searchTrackOnSpotify.call_count == 3
+
+    tracks: list[Track] = makeTracks(3)
+    generator.fillSpotifyId(tracks)
+    assert generator.searchTrackOnSpotify.call_count == 3
+    assert [x.spotifyId for x in tracks] == ["Track 0", None, "Track 2"]
+    assert tracks[0].spotifyArtistId == ["artist"]
+
+
+def test_youtubeRecommendationsAreServedFromCache(tmp_path: Path) -> None:
+    """Test that watch playlist is fetched once & cached payload serves different limits."""
+    generator = makeGenerator()
+    generator.responseCache = ResponseCache(path=str(tmp_path / "cache.sqlite"))
+    generator.youtube.get_watch_playlist.return_value = {
+        "tracks": [
+            {
+                "videoId": f"video_{i}",
+                "title": f"Track {i}",
+                "artists": [{"name": "A"}],
+                "thumbnail": [{"url": "image.url"}],
+            }
+            for i in range(25)
+        ]
+    }
+    seeds: list[Track] = makeTracks(1)
+    seeds[0].youtubeId = "video_0"
+
+    assert len(generator.getYoutubeRecommendations(seeds, limit=5)) == 5
+    assert len(generator.getYoutubeRecommendations(seeds, limit=10)) == 10
+    generator.youtube.get_watch_playlist.assert_called_once_with(videoId="video_0")
+
+
+def test_createYoutubePlaylistCombinesAllStages() -> None:
+    """Test that playlist is built from seeds of both platforms & all recommendation sources."""
+    generator = makeGenerator()
+    generator.user = User(spotify={"token": "x"}, youtube={"token": "y"})
+    youtubeSeeds, spotifySeeds, spotifyRecommended, lastFMRecommended = [
+        [x] for x in makeTracks(4)
+    ]
+    generator.getLastYoutubeTracks = Mock(return_value=youtubeSeeds)
+    generator.getLastSpotifyTracks = Mock(return_value=spotifySeeds)
+    generator.getSpotifyRecommendations = Mock(return_value=spotifyRecommended)
+    generator.getLastFMRecommendations = Mock(return_value=lastFMRecommended)
+    generator.fillSpotifyId = Mock()
+    generator.fillYoutubeId = Mock(
+        side_effect=lambda tracks, **_: [
+            setattr(x, "youtubeId", str(id(x))) for x in tracks
+        ]
+    )
+    generator.youtube.create_playlist.return_value = "playlist_id"
+
+    playlistUrl: str = generator.createYoutubePlaylist(lastN=1, shuffle=False)
+
+    assert playlistUrl == "https://music.youtube.com/playlist?list=playlist_id"
+    generator.getSpotifyRecommendations.assert_called_once_with(
+        tracks=youtubeSeeds + spotifySeeds, recommendationChunkSize=1
+    )
+    generator.getLastFMRecommendations.assert_called_once_with(
+        tracks=spotifyRecommended
+    )
+    videoIds: list[str] = generator.youtube.create_playlist.call_args.kwargs[
+        "video_ids"
+    ]
+    assert len(videoIds) == 3
+
+
+def test_createYoutubePlaylistDoesNotResolveDuplicates() -> None:
+    """Test that recommendations equal to seeds or to each other are not searched on YouTube."""
+    generator = makeGenerator()
+    seeds: list[Track] = makeTracks(2)
+    generator.getLastYoutubeTracks = Mock(return_value=seeds)
+    generator.getSpotifyRecommendations = Mock(return_value=makeTracks(3))
+    generator.getLastFMRecommendations = Mock(return_value=makeTracks(4))
+    generator.fillSpotifyId = Mock()
+    generator.fillYoutubeId = Mock()
+
+    generator.createYoutubePlaylist(lastN=2)
+
+    resolvedTracks: list[list[Track]] = [
+        x.kwargs["tracks"] for x in generator.fillYoutubeId.call_args_list
+    ]
+    assert sorted(len(x) for x in resolvedTracks) == [0, 1, 1]
+
+
+def test_createYoutubePlaylistStopsAtTargetSize() -> None:
+    """Test that with `targetSize` candidates stop being fetched & resolved once playlist is full."""
+    generator = makeGenerator()
+    seeds: list[Track] = makeTracks(2)
+    for track in seeds:
+        track.youtubeId = f"id_{track.title}"
+    generator.getLastYoutubeTracks = Mock(return_value=seeds)
+    generator.iterSpotifyRecommendations = Mock(return_value=iter(makeTracks(40)))
+    generator.iterLastFMRecommendations = Mock(return_value=iter(makeTracks(60)))
+    generator.fillSpotifyId = Mock()
+    searchedTracks: list[Track] = []
+
+    def fillYoutubeId(tracks: list[Track], **_) -> None:
+        searchedTracks.extend(tracks)
+        for track in tracks:
+            track.youtubeId = f"id_{track.title}"
+
+    generator.fillYoutubeId = fillYoutubeId
+    generator.youtube.create_playlist.return_value = "playlist_id"
+
+    generator.createYoutubePlaylist(lastN=2, shuffle=False, targetSize=10)
+
+    videoIds: list[str] = generator.youtube.create_playlist.call_args.kwargs[
+        "video_ids"
+    ]
+    assert videoIds == [f"id_Track {i}" for i in range(10)]
+    # Seeds are not searched, recommendations are searched in batches of `YOUTUBE_SEARCH_CONCURRENCY`.
+    assert len(searchedTracks) < 20
+    assert "Track 0" not in [x.title for x in searchedTracks]
+
+
+def test_getLastYoutubeTracksUsesCachedMainPlaylist() -> None:
+    """Test that main playlist is discovered once, fetched with `lastN` limit & rediscovered when it's gone."""
+    generator = makeGenerator()
+    rawTrack: dict = {
+        "title": "Track",
+        "artists": [{"name": "Artist", "id": "artist_id"}],
+        "videoId": "video_id",
+        "thumbnails": [{"url": "image.url"}],
+    }
+    generator.youtube.get_library_playlists.return_value = [
+        {"playlistId": "small", "count": "5"},
+        {"playlistId": "main", "count": "1,024"},
+    ]
+    generator.youtube.get_playlist.return_value = {"tracks": [rawTrack]}
+
+    generator.getLastYoutubeTracks(lastN=3)
+    generator.getLastYoutubeTracks(lastN=3)
+
+    assert generator.user.mainYoutubePlaylist == "main"
+    generator.youtube.get_library_playlists.assert_called_once()
+    generator.youtube.get_playlist.assert_called_with(playlistId="main", limit=3)
+
+    # Cached playlist was removed, so it's discovered again.
+    generator.user.mainYoutubePlaylist = "removed"
+    generator.youtube.get_playlist.side_effect = [
+        Exception("404"),
+        {"tracks": [rawTrack]},
+    ]
+    tracks: list[Track] = generator.getLastYoutubeTracks(lastN=3)
+
+    assert tracks[0].youtubeId == "video_id"
+    assert generator.user.mainYoutubePlaylist == "main"
+    assert generator.youtube.get_library_playlists.call_count == 2
+
+
+def test_streamYoutubePlaylistPublishesSeedsFirst(monkeypatch) -> None:
+    """Test that playlist is created with seeds right away & recommendations are appended in batches."""
+    monkeypatch.setattr("playlist.core.generator.PROGRESSIVE_BATCH_SIZE", 4)
+    generator = makeGenerator()
+    seeds: list[Track] = makeTracks(2)
+    for track in seeds:
+        track.youtubeId = f"id_{track.title}"
+    generator.getLastYoutubeTracks = Mock(return_value=seeds)
+    generator.iterSpotifyRecommendations = Mock(return_value=iter(makeTracks(7)))
+    generator.iterLastFMRecommendations = Mock(return_value=iter([]))
+    generator.fillSpotifyId = Mock()
+    generator.fillYoutubeId = lambda tracks, **_: [
+        setattr(x, "youtubeId", f"id_{x.title}") for x in tracks
+    ]
+    events: list = []
+    generator.youtube.create_playlist.side_effect = (
+        lambda **x: events.append(list(x["video_ids"])) or "playlist_id"
+    )
+    generator.youtube.add_playlist_items.side_effect = lambda **x: events.append(
+        list(x["videoIds"])
+    )
+
+    playlistUrl: str = generator.streamYoutubePlaylist(
+        lastN=2,
+        shuffle=False,
+        onCreated=lambda x: events.append(x),
+        onProgress=lambda x: events.append(x),
+    )
+
+    assert playlistUrl == "https://music.youtube.com/playlist?list=playlist_id"
+    generator.youtube.create_playlist.assert_called_once()
+    assert events == [
+        ["id_Track 0", "id_Track 1"],
+        playlistUrl,
+        [f"id_Track {i}" for i in range(2, 6)],
+        6,
+        ["id_Track 6"],
+        7,
+    ]
+
+
+def test_createPlaylistDoesNotBlockEventLoop() -> None:
+    """Test that blocking generation runs off the event loop, so other updates are handled meanwhile."""
+    generator = makeGenerator()
+    generator.createYoutubePlaylist = lambda lastN: time.sleep(0.2) or "url"
+
+    async def run() -> list:
+        ticks: list[float] = []
+
+        async def tick() -> None:
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.05)
+
+        url, _ = await asyncio.gather(
+            Platform.YOUTUBE.createPlaylist(generator, lastN=1), tick()
+        )
+        return [url, ticks]
+
+    url, ticks = asyncio.run(run())
+    assert url == "url"
+    assert ticks[-1] - ticks[0] < 0.15
+
+
+def test_searchesStayWithinPlatformLimitAcrossCalls(monkeypatch) -> None:
+    """Test that concurrent `fillSpotifyId()` calls share the per-platform search limit."""
+    monkeypatch.setitem(
+        generatorModule._searchSlots, Platform.SPOTIFY, threading.BoundedSemaphore(3)
+    )
+    generator = makeGenerator()
+    activeSearches: list[int] = [0, 0]
+    lock = threading.Lock()
+
+    def searchTrackOnSpotify(track: Track) -> dict:
+        with lock:
+            activeSearches[0] += 1
+            activeSearches[1] = max(activeSearches)
+        time.sleep(0.02)
+        with lock:
+            activeSearches[0] -= 1
+        return {"id": f"id_{track.title}", "artists": []}
+
+    generator.searchTrackOnSpotify = searchTrackOnSpotify
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        for future in [
+            executor.submit(generator.fillSpotifyId, makeTracks(6), concurrency=6)
+            for _ in range(2)
+        ]:
+            future.result()
+
+    assert activeSearches[1] == 3
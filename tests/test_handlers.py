@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from playlist.core.lease import GenerationLease
+from playlist.model.Platform import Platform
+from playlist.model.User import User
+from tests.helpers import makeLeaseStore, importHandlers
+
+
+def test_generatePlaylistReleasesLeaseOnFailure(monkeypatch) -> None:
+    """Test that lease is released if the update fails before generation starts."""
+    handlers = importHandlers(monkeypatch)
+    leases, transact = makeLeaseStore()
+    user = User(userId="1", spotify={"token": "x"})
+    threads: list[str] = []
+
+    def transactOnThread(key: str, update) -> dict | None:
+        threads.append(threading.current_thread().name)
+        return transact(key, update)
+
+    monkeypatch.setattr(handlers.database, "transactLease", transactOnThread)
+    monkeypatch.setattr(handlers.asyncdb, "getUser", AsyncMock(return_value=user))
+    monkeypatch.setattr(
+        handlers.asyncdb, "storeUserMessage", AsyncMock(side_effect=OSError)
+    )
+    monkeypatch.setattr(handlers, "_getLastN", lambda _: 5)
+    update = Mock()
+    update.effective_message.reply_text = AsyncMock()
+
+    with pytest.raises(OSError):
+        asyncio.run(handlers.generatePlaylist(update, Mock(), Platform.SPOTIFY))
+
+    assert leases["1"] is None
+    # Both acquire & release run on the bounded db executor.
+    assert len(threads) == 2 and all(x.startswith("db") for x in threads)
+
+
+def test_skippedGenerationJobUpdatesProgressMessage(monkeypatch) -> None:
+    """Test that queued job which lost its lease tells the user instead of leaving "Generating..." forever."""
+    handlers = importHandlers(monkeypatch)
+    leases, transact = makeLeaseStore()
+    monkeypatch.setattr(handlers.database, "transactLease", transact)
+    assert GenerationLease("1", transact, owner="other").acquire()
+    jobBot = AsyncMock()
+    jobBot.__aenter__.return_value = jobBot
+    monkeypatch.setattr(handlers.telegram, "Bot", lambda **_: jobBot)
+    payload: dict = {"userId": "1", "messageId": 7, "leaseOwner": "lost"}
+    job = Mock(payload=payload, attempts=1, maxAttempts=2)
+
+    assert handlers.runGenerationJob(job) == "skipped"
+    jobBot.edit_message_text.assert_awaited_once()
+    assert jobBot.edit_message_text.await_args.kwargs["message_id"] == 7
+    assert leases["1"]["owner"] == "other"
@@ -0,0 +1,56 @@
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+from playlist.core.jobs import DONE, FAILED, QUEUED, JobQueue, WorkerPool
+
+
+def test_jobQueueRetriesFailedJobs(tmp_path: Path) -> None:
+    """Test that failed jobs are retried up to `maxAttempts` & status and timing are tracked."""
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite"), retryDelay=0)
+    calls: list[dict] = []
+
+    def flaky(job) -> str:
+        calls.append(job.payload)
+        if job.attempts < 2:
+            raise RuntimeError("upstream is down")
+        return "done"
+
+    pool = WorkerPool(
+        queue, {"flaky": flaky, "broken": Mock(side_effect=ValueError)}, 1
+    )
+    flakyId: int = queue.enqueue("flaky", {"userId": "1"}, maxAttempts=2)
+    brokenId: int = queue.enqueue("broken", {}, maxAttempts=1)
+
+    assert pool.runOnce().id == flakyId
+    assert queue.get(flakyId).status == QUEUED
+    assert pool.runOnce().id == brokenId
+    assert pool.runOnce().id == flakyId
+    assert pool.runOnce() is None
+
+    flakyJob = queue.get(flakyId)
+    assert (flakyJob.status, flakyJob.attempts, flakyJob.result) == (DONE, 2, "done")
+    assert flakyJob.took is not None and flakyJob.waited >= 0
+    assert calls == [{"userId": "1"}, {"userId": "1"}]
+    assert queue.get(brokenId).status == FAILED
+    assert queue.counts() == {DONE: 1, FAILED: 1}
+
+
+def test_workerPoolRunsJobsConcurrently(tmp_path: Path) -> None:
+    """Test that worker threads pick up queued jobs in parallel & each job runs once."""
+    queue = JobQueue(path=str(tmp_path / "jobs.sqlite"))
+    ran: list[int] = []
+
+    def slow(job) -> None:
+        time.sleep(0.1)
+        ran.append(job.id)
+
+    ids: list[int] = [queue.enqueue("slow", {}) for _ in range(4)]
+    pool = WorkerPool(queue, {"slow": slow}, workers=4, pollInterval=0.01).start()
+    startedAt: float = time.monotonic()
+    while queue.counts() != {DONE: 4} and time.monotonic() - startedAt < 2:
+        time.sleep(0.01)
+    pool.stop()
+
+    assert sorted(ran) == ids
+    assert time.monotonic() - startedAt < 0.35
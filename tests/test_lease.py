@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from playlist.core.lease import GenerationLease
+from tests.helpers import makeLeaseStore
+
+
+def test_generationLeaseIsExclusiveUntilExpired() -> None:
+    """Test that only one owner holds the lease & expired leases are reclaimed."""
+    leases, transact = makeLeaseStore()
+    first = GenerationLease("user", transact, ttl=0.1, owner="first")
+    second = GenerationLease("user", transact, ttl=0.1, owner="second")
+
+    assert first.acquire()
+    assert first.acquire()
+    assert not second.acquire()
+
+    time.sleep(0.15)
+    assert second.acquire()
+    assert not first.renew()
+
+    # Release of the lost lease keeps the new owner.
+    first.release()
+    assert leases["user"]["owner"] == "second"
+    second.release()
+    assert leases["user"] is None
+
+
+def test_generationLeaseHeartbeatKeepsItAlive() -> None:
+    """Test that held lease outlives its TTL & is released afterwards."""
+    leases, transact = makeLeaseStore()
+    lease = GenerationLease("user", transact, ttl=0.1, heartbeat=0.03, owner="first")
+
+    async def generate() -> bool:
+        assert lease.acquire()
+        async with lease.held():
+            await asyncio.sleep(0.3)
+            return GenerationLease("user", transact, owner="second").acquire()
+
+    assert not asyncio.run(generate())
+    assert leases["user"] is None
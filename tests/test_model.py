@@ -6,6 +6,7 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 
 from playlist import constants
+from playlist.model.LightTrack import LightTrack
 from playlist.model.Track import Track
 from playlist.model.Config import Config
 from playlist.model.Platform import Platform, getSpotifyAuthUrl, getYoutubeAuthUrl
@@ -116,6 +117,38 @@ def test_youtubeTrackDumping() -> None:
     assert dumpedTrack["firstArtistName"] == "Seshlehem"
 
 
+def test_lightTrackMatchesTrackParsing() -> None:
+    """Test that fast-path parsers produce the same `Track` as the pydantic model does."""
+    spotifyTrack = Track(
+        **rawSpotifyTrack,
+        image=rawSpotifyTrack["album"].get("images", []),
+        youtubeArtistId=None,
+    )
+    youtubeTrack = Track(
+        **rawYoutubeTrack,
+        image=rawYoutubeTrack.get("thumbnails", []),
+        spotifyArtistId=None,
+    )
+    rawLastFMTrack: dict = {
+        "name": "Runaway",
+        "artist": {"name": "Kanye West"},
+        "image": [{"#text": "image.url", "size": "small"}],
+    }
+    lastFMTrack = Track(
+        **rawLastFMTrack, youtubeArtistId=None, spotifyArtistId=None, zeroDuration=True
+    )
+
+    # `toTrack()` sets fields directly, so every `Track` field has to be there.
+    assert set(LightTrack.__slots__) == set(Track.model_fields)
+    assert LightTrack.fromSpotify(rawSpotifyTrack).toTrack() == spotifyTrack
+    assert LightTrack.fromYoutube(rawYoutubeTrack).toTrack() == youtubeTrack
+    assert LightTrack.fromLastFM(rawLastFMTrack).toTrack() == lastFMTrack
+    assert LightTrack.fromTrack(youtubeTrack).toTrack() == youtubeTrack
+    assert LightTrack.fromYoutube(rawYoutubeTrack).toTrack().signature == (
+        youtubeTrack.signature
+    )
+
+
 def test_trackTitleFormatting() -> None:
     """TODO: Test to make sure that if the artist name is in the title - it'll be excluded & nicely formatted."""
     rawTrackWithArtistInTitle = {
@@ -0,0 +1,34 @@
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from playlist.core.pipeline import Pipeline
+
+
+def test_pipelineRunsIndependentStagesConcurrently() -> None:
+    """Test that independent branches overlap & dependent stages get results of their dependencies."""
+    pipeline = Pipeline(maxWorkers=4)
+    pipeline.addStage("a", lambda _: time.sleep(0.1) or 1)
+    pipeline.addStage("b", lambda _: time.sleep(0.1) or 2)
+    pipeline.addStage("c", lambda x: x["a"] + x["b"], dependsOn=("a", "b"))
+
+    startedAt: float = time.perf_counter()
+    results: dict = pipeline.run()
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert time.perf_counter() - startedAt < 0.19
+    assert set(pipeline.timings) == {"a", "b", "c"}
+
+
+def test_pipelineValidationAndErrors() -> None:
+    """Test that unknown dependencies are rejected & stage errors are re-raised."""
+    pipeline = Pipeline()
+    with pytest.raises(ValueError):
+        pipeline.addStage("a", lambda _: 1, dependsOn=("missing",))
+
+    pipeline.addStage("a", lambda _: 1 / 0)
+    pipeline.addStage("b", Mock(), dependsOn=("a",))
+    with pytest.raises(ZeroDivisionError):
+        pipeline.run()
+    pipeline.stages["b"].method.assert_not_called()
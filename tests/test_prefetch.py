@@ -0,0 +1,82 @@
+import datetime
+import threading
+import time
+from unittest.mock import Mock
+
+from playlist.core.prefetch import Prefetcher
+from playlist.model.Platform import Platform
+from tests.benchmark import Scenario, buildGenerator
+
+
+def test_prefetcherKeepsOnePrefetchPerUser() -> None:
+    """Test that new prefetch of the user cancels the previous one & results are taken once."""
+    prefetcher = Prefetcher(maxWorkers=2)
+    started = threading.Event()
+    stoppedEarly: list[bool] = []
+
+    def slow(cancelled: threading.Event) -> str:
+        started.set()
+        stoppedEarly.append(cancelled.wait(1))
+        return "slow"
+
+    prefetcher.start("1", 0, slow)
+    started.wait(1)
+    # Same key keeps the running prefetch, another one replaces it.
+    prefetcher.start("1", 0, Mock())
+    prefetcher.start("1", 5, lambda _: "fast")
+
+    assert prefetcher.take("1", timeout=1) == "fast"
+    assert prefetcher.take("1") is None
+    time.sleep(0.05)
+    assert stoppedEarly == [True]
+
+    prefetcher.start("2", 0, lambda _: "tracks")
+    time.sleep(0.05)
+    assert prefetcher.peek("2") == "tracks"
+    assert prefetcher.take("2") == "tracks"
+
+
+def test_generationUsesPrefetchedTracks() -> None:
+    """Test that prefetched & resolved seeds are not fetched or searched again."""
+    generator, providers = buildGenerator(
+        Scenario(Platform.YOUTUBE, lastN=5, fanOut=3, concurrency=4),
+        latency=0,
+        errorRate=0,
+        seed=0,
+    )
+    lastTracks = generator.prefetch(lastN=10, warmUpTo=5)
+    assert len(lastTracks[Platform.SPOTIFY]) == len(lastTracks[Platform.YOUTUBE]) == 10
+    # Speculative calls count against the daily budget too.
+    assert generator.usage.total == sum(x.callCount for x in providers.values())
+    assert (
+        generator.usageStore.get("benchmark", datetime.date.today())
+        == generator.usage.total
+    )
+    assert all(x.youtubeId for x in lastTracks[Platform.SPOTIFY])
+
+    fetchCalls = lambda: sum(
+        providers[x].calls[y]
+        for x, y in (
+            ("spotify", "current_user_saved_tracks"),
+            ("youtube", "get_playlist"),
+        )
+    )
+    calls: int = fetchCalls()
+    searches: int = providers["youtube"].calls["search"]
+
+    generator.lastTracks = lastTracks
+    generator.createYoutubePlaylist(lastN=5)
+    assert fetchCalls() == calls
+
+    # Same generation without prefetch, which resolves the seeds itself.
+    coldGenerator, coldProviders = buildGenerator(
+        Scenario(Platform.YOUTUBE, lastN=5, fanOut=3, concurrency=4),
+        latency=0,
+        errorRate=0,
+        seed=0,
+    )
+    coldGenerator.createYoutubePlaylist(lastN=5)
+    assert (
+        providers["youtube"].calls["search"] - searches
+        < coldProviders["youtube"].calls["search"]
+    )
@@ -0,0 +1,32 @@
+import time
+
+from playlist.core import ratelimit
+from playlist.core.ratelimit import TokenBucket, parseRetryAfter
+
+
+def test_tokenBucketLimitsRate() -> None:
+    """Test that bucket allows a burst of `capacity` & then issues `rate` tokens per second."""
+    bucket = TokenBucket("test", rate=100, capacity=5)
+
+    startedAt: float = time.monotonic()
+    for _ in range(10):
+        bucket.acquire()
+
+    assert 0.04 <= time.monotonic() - startedAt < 0.5
+    assert parseRetryAfter("2") == 2
+    assert parseRetryAfter(None, default=1) == 1
+    assert parseRetryAfter("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+
+
+def test_setShareScalesRateLimits() -> None:
+    """Test that existing & new buckets get the given share of the quota."""
+    rate, capacity = ratelimit.RATE_LIMITS["spotify"]
+    bucket = ratelimit.getBucket("spotify")
+    try:
+        ratelimit.setShare(0.25)
+        assert bucket.rate == rate / 4
+        assert bucket.capacity == max(int(capacity / 4), 1)
+        assert ratelimit.getBucket("spotify") is bucket
+    finally:
+        ratelimit.setShare(1)
+    assert (bucket.rate, bucket.capacity) == (rate, capacity)
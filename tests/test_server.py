@@ -0,0 +1,127 @@
+import asyncio
+import time
+from pathlib import Path
+
+
+from playlist.core.server import Server
+from tests.helpers import importHandlers
+
+
+async def sendRaw(port: int, raw: bytes) -> bytes:
+    """Sends raw bytes to the local server & reads the response until the connection is closed."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    response: bytes = await reader.read()
+    writer.close()
+    return response
+
+
+def serveRaw(handler, *requests: bytes) -> list[bytes]:
+    """Starts `Server(handler)` on a free port & sends `requests` concurrently."""
+
+    async def run() -> list[bytes]:
+        runner = await Server(handler).start("127.0.0.1", 0)
+        port: int = runner.addresses[0][1]
+        try:
+            return await asyncio.gather(*(sendRaw(port, x) for x in requests))
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+
+def test_serverHandlesRequestsConcurrently() -> None:
+    """Test that slow requests don't block each other & request is parsed like cherrypy/flask ones."""
+    received: list = []
+
+    async def handler(request) -> str:
+        received.append((request.method, request.args, request.get_json(silent=True)))
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    body: bytes = b'{"update_id": 1}'
+    startedAt: float = time.monotonic()
+    get, post, put = serveRaw(
+        handler,
+        b"GET /?state=1&code=2 HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n",
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: "
+        + str(len(body)).encode()
+        + b"\r\n\r\n"
+        + body,
+        b"PUT / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n",
+    )
+
+    assert time.monotonic() - startedAt < 0.35
+    assert get.startswith(b"HTTP/1.1 200") and get.endswith(b"ok")
+    assert post.startswith(b"HTTP/1.1 200")
+    assert put.startswith(b"HTTP/1.1 405")
+    assert sorted(received, key=lambda x: x[0]) == [
+        ("GET", {"state": "1", "code": "2"}, None),
+        ("POST", {}, {"update_id": 1}),
+    ]
+
+
+def test_serverAnswersMalformedRequests(monkeypatch) -> None:
+    """Test that malformed & oversized requests are answered with 4xx, chunked bodies don't desync the connection."""
+    monkeypatch.setattr("playlist.core.server.SERVER_MAX_BODY_SIZE", 16)
+    received: list = []
+
+    async def handler(request) -> str:
+        received.append(request.get_json(silent=True))
+        return "ok"
+
+    badLength, longHeader, tooLarge, chunked = serveRaw(
+        handler,
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Length: abc\r\n\r\n{}",
+        b"GET / HTTP/1.1\r\nHost: localhost\r\nX-Long: " + b"x" * 100_000 + b"\r\n\r\n",
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: 32\r\n\r\n"
+        + b"{"
+        + b" " * 30
+        + b"}",
+        # Chunk of the first request must not be parsed as the second one.
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nTransfer-Encoding: chunked\r\n\r\n"
+        b'8\r\n{"a": 1}\r\n0\r\n\r\n'
+        b'POST / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: 8\r\n\r\n{"b": 2}',
+    )
+
+    # Status line of the first response, parse errors are answered with HTTP/1.0.
+    status = lambda response: int(response.split(b" ", 2)[1])
+    assert status(badLength) == 400
+    assert status(longHeader) in (400, 431)
+    assert status(tooLarge) == 413
+    assert chunked.count(b"HTTP/1.1 200") == 2
+    assert received == [{"a": 1}, {"b": 2}]
+
+
+def test_serverAnswersFailedHandlerWithOk() -> None:
+    """Test that handler errors are answered with "ok", so Telegram doesn't re-deliver the update."""
+
+    async def handler(request) -> str:
+        raise ValueError("boom")
+
+    (response,) = serveRaw(
+        handler, b"POST / HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+    )
+
+    assert response.startswith(b"HTTP/1.1 200") and response.endswith(b"ok")
+
+
+def test_serverRoutesBareQueryKeys(monkeypatch, tmp_path: Path) -> None:
+    """Test that `/?metrics` & `/?privacyPolicy` reach their pages, not the index one."""
+    handlers = importHandlers(monkeypatch)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "index.html").write_text("<p>index</p>")
+    (tmp_path / "privacyPolicy.html").write_text("<p>privacy</p>")
+    monkeypatch.setattr(handlers.metrics, "render", lambda: "# metrics")
+
+    index, metricsPage, privacyPolicy = serveRaw(
+        handlers.handleGETRequest,
+        *(
+            f"GET /{query} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode()
+            for query in ("", "?metrics", "?privacyPolicy")
+        ),
+    )
+
+    assert index.endswith(b"<p>index</p>")
+    assert metricsPage.endswith(b"# metrics")
+    assert privacyPolicy.endswith(b"<p>privacy</p>")
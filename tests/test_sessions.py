@@ -0,0 +1,53 @@
+import time
+from unittest.mock import Mock
+
+import requests
+
+from playlist.core.ratelimit import TokenBucket
+from playlist.core.sessions import LASTFM, OAUTH, RateLimitedAdapter, getSession
+from playlist.model.Platform import Platform
+
+
+def test_getSessionIsSharedAndPooled() -> None:
+    """Test that sessions are reused per name & have keep-alive connection pool."""
+    assert getSession(LASTFM) is getSession(LASTFM)
+    assert getSession(LASTFM) is not getSession(OAUTH)
+
+    adapter = getSession(Platform.SPOTIFY).get_adapter("https://api.spotify.com")
+    assert adapter._pool_block
+    assert adapter._pool_maxsize >= 1
+    assert "gzip" in getSession(Platform.SPOTIFY).headers["Accept-Encoding"]
+
+
+def test_rateLimitedAdapterPausesBucketOnRetryAfter(monkeypatch) -> None:
+    """Test that 429 pauses the whole bucket for `Retry-After` & request is retried afterwards."""
+    responses: list[Mock] = [
+        Mock(status_code=429, headers={"Retry-After": "0.1"}),
+        Mock(status_code=200, headers={}),
+    ]
+    monkeypatch.setattr(
+        "requests.adapters.HTTPAdapter.send", lambda *_, **__: responses.pop(0)
+    )
+    bucket = TokenBucket("test", rate=100, capacity=5)
+    adapter = RateLimitedAdapter(bucket, maxRetries=3)
+
+    startedAt: float = time.monotonic()
+    request = requests.Request("GET", "https://api.spotify.com/v1/search").prepare()
+    assert adapter.send(request).status_code == 200
+    assert time.monotonic() - startedAt >= 0.1
+
+    # Other callers wait for the pause too.
+    bucket.pause(0.1)
+    assert bucket.acquire() >= 0.09
+
+
+def test_sessionRetriesServerErrorsOnlyForIdempotentMethods() -> None:
+    """Test that 5xx responses to writes(every ytmusicapi call is a POST) aren't retried by the session."""
+    retry = (
+        getSession(Platform.YOUTUBE)
+        .get_adapter("https://music.youtube.com")
+        .max_retries
+    )
+
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("POST", 503)
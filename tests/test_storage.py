@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from playlist.core.lease import GenerationLease
+from playlist.core.storage import SqliteStorage
+from playlist.model.Platform import Platform
+from playlist.model.User import User
+
+
+def test_sqliteStorageUpdatesUsersAndLeases(tmp_path: Path) -> None:
+    """Test that SQLite storage merges user updates & serves as the lease store."""
+    storage = SqliteStorage(path=str(tmp_path / "storage.sqlite"))
+    assert storage.getUser("1") is None
+
+    storage.setUser("1", {"userId": "1", "messages": 0})
+    storage.updateUser("1", {"messages": 1, Platform.SPOTIFY: {"token": "x"}})
+    assert storage.getUser("1") == {
+        "userId": "1",
+        "messages": 1,
+        "spotify": {"token": "x"},
+    }
+    assert User(**storage.getUser("1")).spotifyAuth == {"token": "x"}
+
+    first = GenerationLease("1", storage.transactLease, owner="first")
+    # Another connection, as if it was another process.
+    other = SqliteStorage(path=str(tmp_path / "storage.sqlite"))
+    second = GenerationLease("1", other.transactLease, owner="second")
+    assert first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire()
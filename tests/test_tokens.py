@@ -0,0 +1,96 @@
+import time
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import requests
+
+from playlist.core.tokens import TokenManager, refreshSpotifyToken
+from playlist.model.Platform import Platform
+from playlist.model.User import User
+
+
+def test_tokenManagerRefreshesExpiringTokensOnce() -> None:
+    """Test that only expiring tokens are refreshed, persisted & concurrent refreshes are merged."""
+    persisted: list[tuple[str, dict]] = []
+
+    def refreshSpotify(auth: dict) -> dict:
+        time.sleep(0.05)
+        return {"access_token": "new", "expires_at": time.time() + 3600}
+
+    refreshYoutube = Mock()
+    manager = TokenManager(
+        persist=lambda userId, values: persisted.append((userId, values)),
+        margin=600,
+        refreshers={Platform.SPOTIFY: refreshSpotify, Platform.YOUTUBE: refreshYoutube},
+    )
+    users: list[User] = [
+        User(
+            userId="1",
+            spotify={
+                "access_token": "old",
+                "refresh_token": "r",
+                "expires_at": time.time() + 60,
+            },
+            youtube={
+                "access_token": "y",
+                "refresh_token": "r",
+                "expires_at": time.time() + 3600,
+            },
+        )
+        for _ in range(3)
+    ]
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(manager.ensureFresh, users))
+
+    assert results == [[Platform.SPOTIFY]] * 3
+    assert [x.spotifyAuth["access_token"] for x in users] == ["new"] * 3
+    assert users[0].spotifyAuth["refresh_token"] == "r"
+    assert len(persisted) == 1 and persisted[0][0] == "1"
+    refreshYoutube.assert_not_called()
+    assert manager._locks == {}
+
+
+def test_tokenManagerDropsExpiringRefreshedAuths() -> None:
+    """Test that refreshed auths are kept only until they're expiring again."""
+    expiresIn: list[float] = [3600, 60]
+    manager = TokenManager(
+        persist=Mock(),
+        margin=600,
+        refreshers={
+            Platform.SPOTIFY: lambda auth: {"expires_at": time.time() + expiresIn.pop()}
+        },
+    )
+
+    def expiringUser(userId: str) -> User:
+        return User(
+            userId=userId,
+            spotify={"refresh_token": "r", "expires_at": time.time() + 60},
+        )
+
+    # Refreshed to an auth which is already expiring, so it's dropped on the next refresh.
+    manager.ensureFresh(expiringUser("1"))
+    assert list(manager._refreshed) == [("1", Platform.SPOTIFY)]
+    manager.ensureFresh(expiringUser("2"))
+    assert list(manager._refreshed) == [("2", Platform.SPOTIFY)]
+    assert manager._locks == {}
+
+
+def test_refreshSpotifyTokenDoesNotWriteCacheFile(monkeypatch, tmp_path: Path) -> None:
+    """Test that refreshed token isn't written to spotipy's `.cache` file in the working directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SPOTIPY_CLIENT_ID", "id")
+    monkeypatch.setenv("SPOTIPY_CLIENT_SECRET", "secret")
+    monkeypatch.setenv("SPOTIPY_REDIRECT_URI", "http://localhost")
+    session = Mock(spec=requests.Session)
+    session.post.return_value.json.return_value = {
+        "access_token": "new",
+        "expires_in": 3600,
+    }
+    monkeypatch.setattr("playlist.core.tokens.getSession", lambda _: session)
+
+    auth: dict = refreshSpotifyToken({"refresh_token": "r"})
+
+    assert auth["access_token"] == "new" and auth["refresh_token"] == "r"
+    assert not list(tmp_path.iterdir())
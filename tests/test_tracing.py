@@ -0,0 +1,50 @@
+from unittest.mock import Mock
+
+import pytest
+
+from playlist.core.tracing import Metrics, correlationId, metrics, span
+from tests.helpers import makeGenerator
+
+
+def test_spansKeepCorrelationIdAcrossStages() -> None:
+    """Test that stages running in pipeline threads are traced within the generation that started them."""
+    generationIds: list[str | None] = []
+    generator = makeGenerator()
+    generator.getLastYoutubeTracks = Mock(
+        side_effect=lambda **_: generationIds.append(correlationId.get()) or []
+    )
+    generator.getSpotifyRecommendations = Mock(return_value=[])
+    generator.getLastFMRecommendations = Mock(return_value=[])
+    generator.fillSpotifyId = Mock()
+    generator.fillYoutubeId = Mock()
+
+    generator.createYoutubePlaylist(lastN=1)
+    generator.createYoutubePlaylist(lastN=1)
+
+    assert None not in generationIds and len(set(generationIds)) == 2
+    assert correlationId.get() is None
+    assert (
+        'playlist_span_seconds_count{span="stage.rawYoutubeSeeds"}' in metrics.render()
+    )
+
+
+def test_metricsRenderPrometheusHistogram() -> None:
+    """Test that histogram buckets are cumulative & errors are counted."""
+    registry = Metrics(buckets=(0.1, 1))
+    registry.observe("latency_seconds", 0.5, span="a")
+    registry.observe("latency_seconds", 5, span="a")
+    registry.increment("errors_total", span="a")
+
+    assert registry.render().splitlines() == [
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{span="a",le="0.1"} 0',
+        'latency_seconds_bucket{span="a",le="1"} 1',
+        'latency_seconds_bucket{span="a",le="+Inf"} 2',
+        'latency_seconds_sum{span="a"} 5.500000',
+        'latency_seconds_count{span="a"} 2',
+        "# TYPE errors_total counter",
+        'errors_total{span="a"} 1',
+    ]
+    with pytest.raises(ZeroDivisionError), span("failing"):
+        1 / 0
+    assert 'playlist_span_errors_total{span="failing"} 1' in metrics.render()
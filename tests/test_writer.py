@@ -0,0 +1,55 @@
+from unittest.mock import Mock
+
+import pytest
+import requests
+import urllib3
+
+from playlist.core.writer import PlaylistWriter
+
+
+def test_playlistWriterWritesChunks(monkeypatch) -> None:
+    """Test that Spotify chunks are all written concurrently & YouTube ones are retried in order."""
+    monkeypatch.setattr("playlist.core.writer.time.sleep", lambda _: None)
+    writer = PlaylistWriter(spotify=Mock(), youtube=Mock())
+
+    writer.addToSpotify("playlist_id", [str(x) for x in range(250)], keepOrder=False)
+    writtenChunks: list[list[str]] = [
+        x.kwargs["items"] for x in writer.spotify.playlist_add_items.call_args_list
+    ]
+    assert sorted(len(x) for x in writtenChunks) == [50, 100, 100]
+    assert len(set(sum(writtenChunks, []))) == 250
+
+    writer.youtube.create_playlist.return_value = "playlist_id"
+    writer.youtube.add_playlist_items.side_effect = [
+        Exception("timeout"),
+        {"status": "STATUS_SUCCEEDED"},
+        {"status": "STATUS_SUCCEEDED"},
+    ]
+    videoIds: list[str] = [str(x) for x in range(120)]
+
+    assert writer.createOnYoutube("title", "description", videoIds) == "playlist_id"
+    assert writer.youtube.create_playlist.call_args.kwargs["video_ids"] == videoIds[:50]
+    assert [
+        x.kwargs["videoIds"] for x in writer.youtube.add_playlist_items.call_args_list
+    ] == [videoIds[50:100], videoIds[50:100], videoIds[100:]]
+    assert {"spotify#2", "youtube#0", "youtube#2"} <= set(writer.timings)
+
+
+def test_playlistWriterRetriesSpotifyOnlyIfNotSent(monkeypatch) -> None:
+    """Test that timed out Spotify add isn't retried(it might have been applied), while refused connection is."""
+    monkeypatch.setattr("playlist.core.writer.time.sleep", lambda _: None)
+    writer = PlaylistWriter(spotify=Mock())
+    notSent = requests.ConnectionError(
+        urllib3.exceptions.MaxRetryError(
+            None, "/", urllib3.exceptions.NewConnectionError(None, "refused")
+        )
+    )
+    writer.spotify.playlist_add_items.side_effect = [notSent, {}]
+    writer.addToSpotify("playlist_id", ["1"])
+    assert writer.spotify.playlist_add_items.call_count == 2
+
+    writer.spotify.playlist_add_items.reset_mock()
+    writer.spotify.playlist_add_items.side_effect = [requests.ReadTimeout(), {}]
+    with pytest.raises(requests.ReadTimeout):
+        writer.addToSpotify("playlist_id", ["1"])
+    assert writer.spotify.playlist_add_items.call_count == 1